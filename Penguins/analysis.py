@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+from Penguins.direction import DIRECTIONS
+from Penguins.geometry import OPPOSITE, get_geometry
+from Penguins.position import Position
+
+
+class BoardAnalysis:
+    """ What holds for every position of a board, given its size and water, which never change during a search:
+    the cells a sliding piece can stop on, and the dives, as the mask of the cells in front of a water and its blocker """
+
+    def __init__(self, columns: int, rows: int, water: int):
+        geometry = get_geometry(columns, rows)
+        # a sliding piece stops next to its blocker, so only on cells with a neighbour on both sides along the move
+        self.reachable = 0
+        for cell in range(geometry.cell_count):
+            rays = geometry.rays[cell]
+            if any(rays[d] and rays[OPPOSITE[d]] for d in range(len(DIRECTIONS))):
+                self.reachable |= 1 << cell
+        self.dives = []
+        for cell in range(geometry.cell_count):
+            if not water >> cell & 1:
+                continue
+            for d in range(len(DIRECTIONS)):
+                behind, in_front = geometry.rays[cell][d], geometry.ray_masks[cell][OPPOSITE[d]]
+                if behind and in_front:
+                    self.dives.append((in_front, 1 << behind[0]))
+        # cells from which a penguin may dive with its next move
+        self.diving_lines = 0
+        for in_front, _ in self.dives:
+            self.diving_lines |= in_front
+        # whether a penguin can always get to a dive, however the pieces move
+        self.always_divable = any(in_front & self.reachable and blocker & self.reachable
+                                  for in_front, blocker in self.dives)
+
+    def may_be_dead(self, position: Position) -> bool:
+        """ Whether positions of this board may be proven dead by is_dead(). If not, there is no point asking """
+        bear_count = len(position.pieces) - position.penguin_count
+        return not self.always_divable or bear_count <= 1
+
+    def is_dead(self, position: Position) -> bool:
+        """ Whether the position is proven to have no solution: no bears, a lone penguin and bear that can't dive right
+        away, or no dive possible anymore """
+        penguins = position.penguins
+        if not penguins:
+            return False
+        bears = position.bears
+        if not bears:
+            # the last penguin would have nothing left to stop it
+            return True
+        if penguins & (penguins - 1) == 0 and bears & (bears - 1) == 0:
+            # once either slides to the other, they are next to each other and neither can move again
+            piece = next(piece for piece in range(position.penguin_count) if position.pieces[piece] is not None)
+            return not any(destination is not None and position.water >> destination & 1
+                           for destination in (position.destination(piece, d) for d in range(len(DIRECTIONS))))
+        if self.always_divable:
+            return False
+        # a dive needs a penguin in front of a water and a blocker behind it, both on cells they can still get to
+        occupied = penguins | bears
+        reachable = self.reachable
+        return not any(in_front & (reachable | penguins) and blocker & (reachable | occupied)
+                       for in_front, blocker in self.dives)
+
+
+@lru_cache(maxsize=64)
+def get_analysis(columns: int, rows: int, water: int) -> BoardAnalysis:
+    return BoardAnalysis(columns, rows, water)
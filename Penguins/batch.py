@@ -0,0 +1,202 @@
+""" Move generation for many positions at once, with NumPy, for breadth-first searches that expand whole layers.
+NumPy is optional: PositionBatch raises ImportError without it """
+try:
+    import numpy
+except ImportError:  # only batches need numpy
+    numpy = None
+
+from Penguins.board import Board
+from Penguins.direction import DIRECTIONS
+from Penguins.geometry import OFFSETS, get_geometry
+from Penguins.position import MOVES_PER_PIECE, Position
+
+# destination of the moves that can't be made
+NO_DESTINATION = -1
+
+
+def require_numpy():
+    if numpy is None:
+        raise ImportError("Batches of positions need NumPy, see https://numpy.org/install/")
+
+
+def gaps_ahead(occupied):
+    """ The number of empty cells between every cell and the nearest occupied cell after it along the last axis,
+    or at least the length of the axis if there is none """
+    length = occupied.shape[-1]
+    gaps = numpy.empty(occupied.shape, dtype=numpy.int16)
+    gaps[..., -1] = 2 * length
+    for i in range(length - 2, -1, -1):
+        gaps[..., i] = numpy.where(occupied[..., i + 1], 0, gaps[..., i + 1] + 1)
+    return gaps
+
+
+def planes_of(masks, cell_count: int):
+    """ Boolean plane of shape (len(masks), cell_count) with the bits of every mask """
+    byte_count = (cell_count + 7) // 8
+    data = b"".join(mask.to_bytes(byte_count, "little") for mask in masks)
+    packed = numpy.frombuffer(data, dtype=numpy.uint8).reshape(len(masks), byte_count)
+    return numpy.unpackbits(packed, axis=1, count=cell_count, bitorder="little").astype(bool)
+
+
+def masks_of(plane) -> list[int]:
+    """ The mask of every row of a boolean plane, the inverse of planes_of() """
+    packed = numpy.packbits(plane, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+class PositionBatch:
+    """ N positions of columns x rows boards, see the module documentation. Planes are shared, not copied, so the
+    batch is only changed by replacing them """
+
+    def __init__(self, columns: int, rows: int, water, penguins, bears):
+        require_numpy()
+        self.columns = columns
+        self.rows = rows
+        self.water = water
+        self.penguins = penguins
+        self.bears = bears
+
+    @classmethod
+    def from_positions(cls, positions: list[Position]) -> 'PositionBatch':
+        """ The current positions, which must all have the same size """
+        require_numpy()
+        sizes = {(position.columns, position.rows) for position in positions}
+        if len(sizes) != 1:
+            raise ValueError(f"A batch holds positions of a single board size, got {sorted(sizes)}")
+        (columns, rows), = sizes
+        cell_count = columns * rows
+        return cls(columns, rows, planes_of([position.water for position in positions], cell_count),
+                   planes_of([position.penguins for position in positions], cell_count),
+                   planes_of([position.bears for position in positions], cell_count))
+
+    @classmethod
+    def from_boards(cls, boards: list[Board]) -> 'PositionBatch':
+        return cls.from_positions([Position.from_board(board) for board in boards])
+
+    def __len__(self):
+        return len(self.penguins)
+
+    def select(self, indices) -> 'PositionBatch':
+        """ The positions at the indices, or where a boolean array is set """
+        return PositionBatch(self.columns, self.rows, self.water[indices], self.penguins[indices], self.bears[indices])
+
+    def keys(self) -> list[tuple[int, int]]:
+        """ The (penguins, bears) masks of every position, as Position.key() """
+        return list(zip(masks_of(self.penguins), masks_of(self.bears)))
+
+    def position(self, index: int) -> Position:
+        """ The position at the index. Its pieces are the penguins on the board, then the bears, each in cell order """
+        water, = masks_of(self.water[index:index + 1])
+        penguins = numpy.flatnonzero(self.penguins[index]).tolist()
+        bears = numpy.flatnonzero(self.bears[index]).tolist()
+        return Position(self.columns, self.rows, water, penguins + bears, len(penguins))
+
+    def is_won(self):
+        """ Boolean array of the positions without penguins """
+        return ~self.penguins.any(axis=1)
+
+    def gaps(self):
+        """ Integer array of shape (N, cells, 4) with the number of empty cells between the cell and the nearest piece
+        in each direction, or at least the width or height of the board if there is none. Scanned a row or a column
+        at a time, over the occupancy planes of the whole batch """
+        grid = (self.penguins | self.bears).reshape(len(self), self.rows, self.columns)
+        gaps = numpy.empty((len(self), self.rows, self.columns, MOVES_PER_PIECE), dtype=numpy.int16)
+        for direction, d in enumerate(DIRECTIONS):
+            col_step, row_step = OFFSETS[d]
+            # along the rows for horizontal moves, down the columns for vertical ones, toward the direction
+            axis = 2 if col_step else 1
+            forward = col_step + row_step > 0
+            toward = grid if forward else numpy.flip(grid, axis)
+            direction_gaps = numpy.swapaxes(gaps_ahead(numpy.swapaxes(toward, axis, 2)), axis, 2)
+            gaps[..., direction] = direction_gaps if forward else numpy.flip(direction_gaps, axis)
+        return gaps.reshape(len(self), self.columns * self.rows, MOVES_PER_PIECE)
+
+    def movable(self, gaps):
+        """ Where a piece with the gaps can slide: something stops it, but not right away """
+        spans = numpy.array([self.columns if OFFSETS[d][0] else self.rows for d in DIRECTIONS])
+        return (gaps > 0) & (gaps < spans)
+
+    def destinations(self):
+        """ Integer array of shape (N, cells, 4) with the cell where a piece in the cell stops when it slides in each
+        direction, or NO_DESTINATION if nothing stops it or it is blocked right away. Computed for every cell,
+        whether or not there is a piece in it """
+        gaps = self.gaps()
+        steps = numpy.array(get_geometry(self.columns, self.rows).steps)
+        cells = numpy.arange(self.columns * self.rows)[:, None]
+        return numpy.where(self.movable(gaps), cells + steps * gaps, NO_DESTINATION)
+
+    def legal_moves(self):
+        """ Boolean array of shape (N, cells, 4), set where a penguin or bear in the cell can slide in the direction """
+        return self.movable(self.gaps()) & (self.penguins | self.bears)[:, :, None]
+
+    def successors(self) -> tuple['PositionBatch', object, object, object]:
+        """ The positions after every legal move of every position, and for each of them the index of the position
+        it was made in and the cell and direction of the move, as integer arrays.
+        Successors of the same position are consecutive, in order of cell and direction """
+        positions, cells = numpy.nonzero(self.penguins | self.bears)
+        piece_gaps = self.gaps()[positions, cells]
+        pieces, directions = numpy.nonzero(self.movable(piece_gaps))
+        parents = positions[pieces]
+        cells = cells[pieces]
+        steps = numpy.array(get_geometry(self.columns, self.rows).steps)
+        targets = cells + steps[directions] * piece_gaps[pieces, directions]
+        moves = numpy.arange(len(parents))
+        water = self.water[parents]
+        penguins = self.penguins[parents]
+        bears = self.bears[parents]
+        moved_penguins = penguins[moves, cells]
+        penguins[moves, cells] = False
+        bears[moves, cells] = False
+        # the target is empty, and a penguin that stops on water dives
+        penguins[moves, targets] = moved_penguins & ~water[moves, targets]
+        bears[moves, targets] = ~moved_penguins
+        return PositionBatch(self.columns, self.rows, water, penguins, bears), parents, cells, directions
+
+    def row_keys(self, tags):
+        """ A key per position, tagged with an integer, which sorts and compares as a whole """
+        tagged = numpy.concatenate([numpy.asarray(tags, dtype="<i8")[:, None].view(numpy.uint8),
+                                    numpy.packbits(self.penguins, axis=1), numpy.packbits(self.bears, axis=1)], axis=1)
+        tagged = numpy.ascontiguousarray(tagged)
+        return tagged.view(numpy.dtype((numpy.void, tagged.shape[1]))).ravel()
+
+
+def shortest_solution_lengths(positions: list[Position], max_depth: int | None = None) -> list[int | None]:
+    """ The length of the shortest solution of every position, or None if it has none of at most max_depth moves.
+    The positions of every board size are searched together, see search_batch() """
+    lengths = [None] * len(positions)
+    by_size = {}
+    for index, position in enumerate(positions):
+        by_size.setdefault((position.columns, position.rows), []).append(index)
+    for indices in by_size.values():
+        batch = PositionBatch.from_positions([positions[index] for index in indices])
+        for index, length in zip(indices, search_batch(batch, max_depth)):
+            lengths[index] = length
+    return lengths
+
+
+def search_batch(batch: PositionBatch, max_depth: int | None = None) -> list[int | None]:
+    """ The length of the shortest solution of every position of the batch, or None if it has none of at most
+    max_depth moves. A breadth-first search of all the positions at once: each layer is a single batch, with the
+    positions reached by a move from the layer before that weren't reached before from the same position """
+    won = batch.is_won()
+    lengths = [0 if position_won else None for position_won in won.tolist()]
+    solved = won.copy()
+    # the position of the batch every position of the frontier was reached from
+    roots = numpy.flatnonzero(~won)
+    frontier = batch.select(roots)
+    seen = frontier.row_keys(roots)
+    depth = 0
+    while len(frontier) and (max_depth is None or depth < max_depth):
+        depth += 1
+        children, parents, _, _ = frontier.successors()
+        child_roots = roots[parents]
+        for root in numpy.unique(child_roots[children.is_won()]).tolist():
+            lengths[root] = depth
+            solved[root] = True
+        keys = children.row_keys(child_roots)
+        _, first = numpy.unique(keys, return_index=True)
+        new = first[~solved[child_roots[first]] & ~numpy.isin(keys[first], seen)]
+        frontier = children.select(new)
+        roots = child_roots[new]
+        seen = numpy.concatenate([seen, keys[new]])
+    return lengths
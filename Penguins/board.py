@@ -1,11 +1,9 @@
 from collections import Counter
 from dataclasses import dataclass
 
-import pygame
-
-from Penguins.constants import SQUARE_SIZE, BLACK, LIGHT_BLUE
-from Penguins.direction import Direction
+from Penguins.direction import DIRECTIONS, Direction
 from Penguins.entity import Entity, EntityClass
+from Penguins.geometry import get_geometry
 
 
 @dataclass
@@ -24,6 +22,7 @@ class Board:
     def __init__(self, columns: int, rows: int):
         self.columns = columns
         self.rows = rows
+        self.geometry = get_geometry(columns, rows)
         self.entities: list[Entity] = []
         self.next_index_to_use_for_entity = dict()
         for ec in EntityClass:
@@ -86,32 +85,32 @@ class Board:
                 answer.append(e)
         return answer
 
+    def get_blocker_cells(self) -> set[int]:
+        return {self.geometry.cell(e.col, e.row) for e in self.entities if e.entity_class != EntityClass.WATER}
+
+    def slide_destination(self, col, row, direction: Direction) -> Location | None:
+        """ Where an entity in the given location stops when sliding in the given direction.
+        None if it can't move, either because there is nothing to stop it or because it is blocked right away """
+        blockers = self.get_blocker_cells()
+        cell = self.geometry.cell(col, row)
+        previous = cell
+        for c in self.geometry.rays[cell][DIRECTIONS.index(direction)]:
+            if c in blockers:
+                if previous == cell:
+                    return None
+                col, row = self.geometry.locations[previous]
+                return Location(col=col, row=row)
+            previous = c
+        return None
+
     def apply_move(self, entity: Entity, direction: Direction) -> Location:
-        col, row = entity.col, entity.row
-        orig_loc = Location(col=col, row=row)
-        if direction == Direction.RIGHT:
-            while not self.there_is_a_blocker_entity_in(col + 1, row):
-                col += 1
-        if direction == Direction.LEFT:
-            while not self.there_is_a_blocker_entity_in(col - 1, row):
-                col -= 1
-        if direction == Direction.DOWN:
-            while not self.there_is_a_blocker_entity_in(col, row + 1):
-                row += 1
-        if direction == Direction.UP:
-            while not self.there_is_a_blocker_entity_in(col, row - 1):
-                row -= 1
-        self.move_entity(entity, col, row)
+        orig_loc = Location(col=entity.col, row=entity.row)
+        destination = self.slide_destination(entity.col, entity.row, direction)
+        if destination is None:
+            raise ValueError(f"{entity.name} can't move {direction.name}")
+        self.move_entity(entity, destination.col, destination.row)
         return orig_loc
 
-    def draw(self, win):
-        pygame.draw.rect(win, LIGHT_BLUE, (0, 0, self.columns * SQUARE_SIZE, self.rows * SQUARE_SIZE))
-        for row in range(self.rows):
-            for col in range(self.columns):
-                pygame.draw.rect(win, BLACK, (row*SQUARE_SIZE, col*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE), 1)
-        for e in self.entities:
-            e.draw(win)
-
     def get_all_entities_of_class(self, entity_class: EntityClass):
         return [e for e in self.entities if e.entity_class == entity_class]
 
@@ -1,8 +1,8 @@
-import pygame
-
 WIDTH, HEIGHT = 500, 600
+# boards are scaled to fit in the top BOARD_SIZE x BOARD_SIZE pixels of the window, the buttons are below
+BOARD_SIZE = WIDTH
+# size of a new board, unless another one is given on the command line
 ROWS, COLS = 5, 5
-SQUARE_SIZE = WIDTH//COLS
 
 # rgb
 GREY = (128, 128, 128)
@@ -5,4 +5,7 @@ class Direction(Enum):
     LEFT = auto()
     UP = auto()
     RIGHT = auto()
-    DOWN = auto()
\ No newline at end of file
+    DOWN = auto()
+
+
+DIRECTIONS = tuple(Direction)
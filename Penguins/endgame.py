@@ -0,0 +1,271 @@
+""" Endgame table: the exact number of moves left to win from every position with few pieces.
+
+    python -m Penguins.endgame 5x5 -o endgame-5x5.bin --max-pieces 4
+"""
+import argparse
+import mmap
+import struct
+import sys
+import time
+import zlib
+from itertools import combinations
+from math import comb
+
+from Penguins.geometry import get_geometry
+from Penguins.position import Position
+
+MAGIC = b"PENGEGTB"
+FORMAT_VERSION = 1
+# magic, version, columns, rows, max_pieces, number of water layouts and CRC32 of the rest of the file
+HEADER = struct.Struct("<8sIHHHHI")
+# water mask and offset of the data of a water layout
+SECTION = struct.Struct("<QQ")
+# masks are stored in 64 bits
+MAX_CELLS = 64
+UNSOLVABLE_BYTE = 255
+# distance of the positions that have no solution
+UNSOLVABLE = -1
+
+
+def materials(max_pieces: int) -> list[tuple[int, int]]:
+    """ The (penguins, bears) counts held by a table of up to max_pieces pieces. Positions without penguins are won,
+    and without bears aren't solvable, so neither is stored """
+    return [(penguins, bears) for penguins in range(1, max_pieces) for bears in range(1, max_pieces - penguins + 1)]
+
+
+def material_sizes(cell_count: int, water: int, max_pieces: int) -> dict[tuple[int, int], int]:
+    """ The number of positions of each material of a water layout """
+    free = cell_count - water.bit_count()
+    return {(penguins, bears): comb(free, penguins) * comb(cell_count - penguins, bears)
+            for penguins, bears in materials(max_pieces)}
+
+
+def combination_rank(mask: int, index_of) -> int:
+    """ Rank of the set of cells in the combinatorial number system, once each cell is mapped by index_of() """
+    rank = 0
+    k = 0
+    while mask:
+        cell = (mask & -mask).bit_length() - 1
+        mask &= mask - 1
+        k += 1
+        rank += comb(index_of(cell), k)
+    return rank
+
+
+class EndgameSection:
+    """ The positions of a single water layout of an EndgameTable """
+
+    def __init__(self, data, columns: int, rows: int, water: int, offset: int, max_pieces: int):
+        self.data = data
+        self.water = water
+        self.max_pieces = max_pieces
+        cell_count = columns * rows
+        self.cell_count = cell_count
+        self.offsets = {}
+        for material, size in material_sizes(cell_count, water, max_pieces).items():
+            self.offsets[material] = offset
+            offset += size
+        self.end = offset
+        # index of every cell among the ones that aren't water
+        self.free_index = [cell - (water & ((1 << cell) - 1)).bit_count() for cell in range(cell_count)]
+
+    def index(self, penguins: int, bears: int) -> int | None:
+        """ Where the position is in the data, or None if it has too many pieces """
+        penguin_count = penguins.bit_count()
+        bear_count = bears.bit_count()
+        offset = self.offsets.get((penguin_count, bear_count))
+        if offset is None:
+            return None
+        bear_rank = combination_rank(bears, lambda cell: cell - (penguins & ((1 << cell) - 1)).bit_count())
+        penguin_rank = combination_rank(penguins, self.free_index.__getitem__)
+        return offset + penguin_rank * comb(self.cell_count - penguin_count, bear_count) + bear_rank
+
+    def distance(self, penguins: int, bears: int) -> int | None:
+        """ Moves left to win from the position, UNSOLVABLE if it has no solution,
+        or None if it isn't in the table. Won positions are 0 moves away """
+        if not penguins:
+            return 0
+        if penguins.bit_count() + bears.bit_count() > self.max_pieces:
+            return None
+        if not bears:
+            return UNSOLVABLE
+        index = self.index(penguins, bears)
+        if index is None:
+            return None
+        value = self.data[index]
+        return UNSOLVABLE if value == UNSOLVABLE_BYTE else value
+
+
+class EndgameTable:
+    """ A table written by write_table(), read through mmap. Raises ValueError if the file isn't a table of this
+    version, or if verify and its checksum doesn't match """
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is empty, not an endgame table")
+        try:
+            self.read_header(verify)
+        except ValueError:
+            self.close()
+            raise
+
+    def read_header(self, verify: bool):
+        if len(self.data) < HEADER.size or self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not an endgame table")
+        _, version, self.columns, self.rows, self.max_pieces, section_count, checksum = HEADER.unpack_from(self.data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is an endgame table of version {version}, expected {FORMAT_VERSION}")
+        if verify:
+            with memoryview(self.data) as view:
+                if zlib.crc32(view[HEADER.size:]) != checksum:
+                    raise ValueError(f"{self.path} is corrupt, its checksum doesn't match")
+        self.sections = {}
+        for i in range(section_count):
+            water, offset = SECTION.unpack_from(self.data, HEADER.size + i * SECTION.size)
+            section = EndgameSection(self.data, self.columns, self.rows, water, offset, self.max_pieces)
+            if section.end > len(self.data):
+                raise ValueError(f"{self.path} is truncated")
+            self.sections[water] = section
+
+    def __reduce__(self):
+        # the workers of a parallel search map the file again, without checking what this process already checked
+        return EndgameTable, (self.path, False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def section_for(self, position: Position) -> EndgameSection | None:
+        """ The section holding the positions of the board, or None if the table can't hold any of them:
+        it's for another size or other waters, or the bears alone are too many """
+        if (position.columns, position.rows) != (self.columns, self.rows):
+            return None
+        if len(position.pieces) - position.penguin_count >= self.max_pieces:
+            return None
+        return self.sections.get(position.water)
+
+
+def build_section(columns: int, rows: int, water: int, max_pieces: int) -> bytearray:
+    """ The data of a water layout, see the module documentation.
+    The positions of every material are listed from the ones with a penguin less, which are a dive away, and from one
+    another, in order of their moves left. The positions that are never listed have no solution """
+    cell_count = columns * rows
+    sizes = material_sizes(cell_count, water, max_pieces)
+    data = bytearray([UNSOLVABLE_BYTE]) * sum(sizes.values())
+    section = EndgameSection(data, columns, rows, water, 0, max_pieces)
+    for bear_count in range(1, max_pieces):
+        # won positions: the bears anywhere, since they may stand on water
+        distances = {(0, sum(1 << cell for cell in bears)): 0 for bears in combinations(range(cell_count), bear_count)}
+        for penguin_count in range(1, max_pieces - bear_count + 1):
+            position = Position(columns, rows, water, [], penguin_count)
+            material_distances, by_distance = material_distances_from(position, distances)
+            if by_distance and len(by_distance) > UNSOLVABLE_BYTE:
+                raise ValueError(f"Positions of {columns}x{rows} boards take more than {UNSOLVABLE_BYTE - 1} moves")
+            for (penguins, bears), distance in material_distances.items():
+                data[section.index(penguins, bears)] = distance
+            distances = material_distances
+    return data
+
+
+def material_distances_from(position: Position, distances: dict) -> tuple[dict, list[list]]:
+    """ The moves left of the positions with the penguins of the position, and these positions listed by moves left,
+    from the moves left of the positions with a penguin less """
+    material_distances = {}
+    by_distance = []
+    for key, distance in distances.items():
+        reach_predecessors(position, key, distance, material_distances, by_distance)  # the penguin dived
+    distance = 0
+    while distance < len(by_distance):
+        for key in by_distance[distance]:
+            # skips the positions reached in fewer moves after they were listed
+            if material_distances[key] == distance:
+                reach_predecessors(position, key, distance, material_distances, by_distance)
+        distance += 1
+    return material_distances, by_distance
+
+
+def reach_predecessors(position: Position, key: tuple[int, int], distance: int, distances: dict, by_distance: list):
+    for predecessor in position.predecessors(*key):
+        if predecessor[0].bit_count() == position.penguin_count:
+            reach(predecessor, distance + 1, distances, by_distance)
+
+
+def reach(key: tuple[int, int], distance: int, distances: dict, by_distance: list[list]):
+    if distances.get(key, distance + 1) <= distance:
+        return
+    distances[key] = distance
+    while len(by_distance) <= distance:
+        by_distance.append([])
+    by_distance[distance].append(key)
+
+
+def write_table(path: str, columns: int, rows: int, max_pieces: int, waters, progress=None):
+    """ Builds the table of the boards of the given size with each of the water masks, and writes it to path.
+    progress is called with every water mask before its positions are built """
+    if columns * rows > MAX_CELLS:
+        raise ValueError(f"Endgame tables hold boards of up to {MAX_CELLS} cells, not {columns}x{rows}")
+    if max_pieces < 2:
+        raise ValueError("Endgame tables need at least a penguin and a bear")
+    waters = list(waters)
+    sections = []
+    offset = HEADER.size + SECTION.size * len(waters)
+    for water in waters:
+        if progress is not None:
+            progress(water)
+        data = build_section(columns, rows, water, max_pieces)
+        sections.append((water, offset, data))
+        offset += len(data)
+    body = b"".join(SECTION.pack(water, offset) for water, offset, _ in sections)
+    checksum = zlib.crc32(body)
+    for _, _, data in sections:
+        checksum = zlib.crc32(data, checksum)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, columns, rows, max_pieces, len(sections), checksum))
+        file.write(body)
+        for _, _, data in sections:
+            file.write(data)
+
+
+def parse_water(text: str, columns: int, rows: int) -> int:
+    """ Water mask of cells given as 'col,row;col,row' """
+    geometry = get_geometry(columns, rows)
+    water = 0
+    for cell in text.split(";"):
+        col, row = (int(value) for value in cell.split(","))
+        if not (0 <= col < columns and 0 <= row < rows):
+            raise ValueError(f"Water {col},{row} is outside of the {columns}x{rows} board")
+        water |= 1 << geometry.cell(col, row)
+    return water
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Penguins.endgame", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("size", help="board size, columns x rows, e.g. 5x5")
+    parser.add_argument("-o", "--output", required=True, help="file to write the table to")
+    parser.add_argument("--max-pieces", type=int, default=4, help="most penguins and bears together (default: 4)")
+    parser.add_argument("--water", action="append", default=None,
+                        help="cells of a water layout, col,row;col,row... (default: every single water)")
+    args = parser.parse_args(argv)
+    columns, rows = (int(value) for value in args.size.lower().split("x"))
+    if args.water:
+        waters = [parse_water(text, columns, rows) for text in args.water]
+    else:
+        waters = [1 << cell for cell in range(columns * rows)]
+    start = time.perf_counter()
+    write_table(args.output, columns, rows, args.max_pieces, waters,
+                progress=lambda water: print(f"water {water:#x}", file=sys.stderr, flush=True))
+    print(f"{len(waters)} water layouts in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,84 @@
-from dataclasses import dataclass
-from Penguins.board import Board
+import queue
+import threading
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from Penguins.board import Board, Location
 from Penguins.entity import Entity, EntityClass
-from Penguins.direction import Direction
-import copy
+from Penguins.direction import DIRECTIONS, Direction
+from Penguins.heuristics import Heuristic
+from Penguins.position import Position, decode_move, pieces_of
+from Penguins.search import ENGINES, Search
+from Penguins.solved_positions import SolvedPositions
+from Penguins.stats import SearchStats
+
+if TYPE_CHECKING:  # sqlite is only loaded by those who use a cache
+    from Penguins.endgame import EndgameTable
+    from Penguins.solution_cache import SolutionCache
 
 
 @dataclass
 class Move:
     direction: Direction
     entity: Entity
-    original_location = None
+    original_location: Location | None = field(default=None, compare=False)
 
     def __repr__(self):
         return f"Move {self.entity.name} {self.direction.name}"
 
 
+@dataclass
+class Progress:
+    """ Event of Game.solve_iter(), reported every few thousand expanded positions """
+    expanded_positions: int
+    depth: int
+
+
+@dataclass
+class ImprovedSolution:
+    """ Event of Game.solve_iter(), reported when a solution shorter than the ones before is found """
+    solution: list[Move]
+
+
+@dataclass
+class SearchFinished:
+    """ Last event of Game.solve_iter(), with the shortest solution, or an empty list if there is none """
+    solution: list[Move]
+
+
+@dataclass
+class SolutionCount:
+    """ Result of Game.count_shortest_solutions(): the length of the shortest solutions and how many there are.
+    A count of 0 means there is no solution """
+    length: int
+    count: int
+
+    @property
+    def unique(self) -> bool:
+        return self.count == 1
+
+
 class Game:
-    def __init__(self, board: Board):
+    def __init__(self, board: Board, cache: 'SolutionCache | None' = None, endgame: 'EndgameTable | None' = None,
+                 solved_positions: SolvedPositions | None = None):
         self.board = board
-        self.seen_configuration = []
-        self.search_tree_level = 0
+        self.cache = cache
+        self.endgame = endgame
+        # kept between searches if given, so solving again from a position on a solution found before is a lookup.
+        # Learning what a search reached costs time and memory that a board solved once never gets back
+        self.solved_positions = solved_positions
         self.current_path = []
         self.shortest_solution = []
+        self.stats = SearchStats()
 
     def is_won(self) -> bool:
         penguins = self.board.get_all_entities_of_class(EntityClass.PENGUIN)
         return len(penguins) == 0
 
     def entity_move_is_legal(self, entity: Entity, direction) -> bool:
-        entity_location = self.board.get_entity_location(entity)
-        if entity_location is None:
-            return False
-        if direction == Direction.LEFT:
-            x = entity_location.col - 1
-            y = entity_location.row
-            while self.board.location_is_inside_the_board(x, y):
-                if self.board.there_is_a_blocker_entity_in(x, y):
-                    return x < entity_location.col - 1  # false if there is an immediate blocking neighbour, true if the blocker is farther
-                x -= 1
-            return False
-        if direction == Direction.RIGHT:
-            x = entity_location.col + 1
-            y = entity_location.row
-            while self.board.location_is_inside_the_board(x, y):
-                if self.board.there_is_a_blocker_entity_in(x, y):
-                    return x > entity_location.col + 1
-                x += 1
-            return False
-        if direction == Direction.DOWN:
-            x = entity_location.col
-            y = entity_location.row + 1
-            while self.board.location_is_inside_the_board(x, y):
-                if self.board.there_is_a_blocker_entity_in(x, y):
-                    return y > entity_location.row + 1
-                y += 1
-            return False
-        if direction == Direction.UP:
-            x = entity_location.col
-            y = entity_location.row - 1
-            while self.board.location_is_inside_the_board(x, y):
-                if self.board.there_is_a_blocker_entity_in(x, y):
-                    return y < entity_location.row - 1
-                y -= 1
+        if self.board.get_entity_location(entity) is None:
             return False
+        return self.board.slide_destination(entity.col, entity.row, direction) is not None
 
     def get_all_possible_moves(self) -> list[Move]:
         possible_moves = []
@@ -79,36 +95,139 @@ class Game:
                 possible_moves.append(Move(entity=entity, direction=d))
         return possible_moves
 
-    def solve(self):
-        self.current_path = []
-        self.shortest_solution = []
-        self.recursive_solve()
+    def solve(self, engine: str = "dfs", max_depth: int | None = None, symmetry: bool = False,
+              heuristic: Heuristic | None = None, timeout: float | None = None, workers: int | None = None,
+              profiler: AbstractContextManager | None = None, memory_limit: int | None = None) -> list[Move]:
+        """ Finds the shortest solution with the search engine, one of ENGINES, up to max_depth moves for all but dfs.
+        The other arguments are those of Search, and workers runs it on that many processes, see parallel_search().
+        The solution cache, the endgame table and the positions solved before are looked up first """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown solver engine '{engine}', expected one of {ENGINES}")
+        self.stats = SearchStats()
+        with self.stats.phase("cache lookup"):
+            solution = self.cached_solution(max_depth)
+        if solution is not None:
+            return self.shortest_solution
+        if workers is not None and memory_limit is not None:
+            raise ValueError("Parallel searches can't search within a memory limit")
+        position = Position.from_board(self.board)
+        search = None
+        with self.stats.phase("search"), profiler or nullcontext():
+            if workers is not None:
+                from Penguins.parallel_search import parallel_search  # multiprocessing is only loaded by parallel searches
+                solution = parallel_search(position, engine, max_depth, symmetry, heuristic, timeout, workers or None,
+                                           stats=self.stats, endgame=self.endgame)
+            else:
+                search = Search(position, max_depth, symmetry, heuristic, timeout, memory_limit, self.endgame,
+                                self.solved_positions)
+                search.stats = self.stats
+                solution = search.run(engine)
+        with self.stats.phase("solution"):
+            return self.solved(solution, max_depth, search)
+
+    def solve_iter(self, engine: str = "dfs", max_depth: int | None = None, symmetry: bool = False,
+                   heuristic: Heuristic | None = None, timeout: float | None = None, memory_limit: int | None = None):
+        """ Generator version of solve(), yielding Progress, ImprovedSolution and finally SearchFinished.
+        The search runs on a thread that only advances while the generator is iterated. Closing it cancels the search """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown solver engine '{engine}', expected one of {ENGINES}")
+        if self.cached_solution(max_depth) is not None:
+            yield SearchFinished(self.shortest_solution)
+            return
+        search = Search(Position.from_board(self.board), max_depth, symmetry, heuristic, timeout, memory_limit,
+                        self.endgame, self.solved_positions)
+        self.stats = search.stats
+        # events are passed one at a time, as (kind, value) pairs, so the search doesn't run ahead of the consumer
+        events = queue.Queue(maxsize=1)
+        search.on_progress = lambda expanded_positions, depth: events.put(("progress", (expanded_positions, depth)))
+        search.on_solution = lambda solution: events.put(("solution", solution))
+
+        def run():
+            try:
+                events.put(("finished", search.run(engine)))
+            except Exception as e:
+                events.put(("error", e))
+
+        thread = threading.Thread(target=run, name="Penguins search", daemon=True)
+        thread.start()
+        try:
+            while True:
+                kind, value = events.get()
+                if kind == "finished":
+                    thread.join()
+                    yield SearchFinished(self.solved(value, max_depth, search))
+                    return
+                yield self.search_event(kind, value)
+        finally:
+            search.cancel()
+            while thread.is_alive():
+                # unblock the search, which then stops at its next check
+                try:
+                    events.get(timeout=0.01)
+                except queue.Empty:
+                    pass
+
+    def search_event(self, kind: str, value) -> Progress | ImprovedSolution:
+        """ The event of solve_iter() for what its search passed but the end, raising the errors it passed """
+        if kind == "progress":
+            return Progress(*value)
+        if kind == "solution":
+            return ImprovedSolution(self.moves_of(value))
+        raise value
+
+    def count_shortest_solutions(self, max_depth: int | None = None, timeout: float | None = None) -> SolutionCount:
+        """ Counts the shortest solutions without listing them: a breadth-first search adds up the number of shortest
+        paths to every position, from the ones a move before it. Solutions are move sequences, so the same moves in
+        another order count as another solution. What the search did is kept in the game's stats """
+        search = Search(Position.from_board(self.board), max_depth, timeout=timeout)
+        self.stats = search.stats
+        with self.stats.phase("search"):
+            return SolutionCount(*search.count_shortest_solutions())
+
+    def shortest_solutions(self, max_depth: int | None = None, timeout: float | None = None):
+        """ Lazily generates every shortest solution, as lists of Moves. The search runs before the first one,
+        then each solution is only listed when it is asked for """
+        search = Search(Position.from_board(self.board), max_depth, timeout=timeout)
+        self.stats = search.stats
+        for solution in search.shortest_solutions():
+            yield self.moves_of(solution)
+
+    def cached_solution(self, max_depth: int | None) -> list[int] | None:
+        """ The solution from the cache, if there is one that isn't longer than max_depth.
+        Also kept as the game's shortest solution """
+        if self.cache is None:
+            return None
+        solution = self.cache.get(self.board)
+        if solution is None or (max_depth is not None and len(solution) > max_depth):
+            return None
+        self.shortest_solution = self.moves_of(solution)
+        return solution
+
+    def solved(self, solution: list[int], max_depth: int | None, search: Search | None = None) -> list[Move]:
+        """ Keeps the solution found by a search in the cache, in the solved positions if the game keeps them,
+        and as the game's shortest solution """
+        if self.cache is not None and (solution or max_depth is None):
+            self.cache.put(self.board, solution)
+        if self.solved_positions is not None:
+            self.learn(solution, max_depth, search.reached() if search is not None else None)
+        self.shortest_solution = self.moves_of(solution)
         return self.shortest_solution
 
-    def recursive_solve(self):
-        possible_moves = self.get_all_possible_moves()
-        # print(f"[{self.search_tree_level}] {possible_moves}")
-        for m in possible_moves:
-            self.perform_move(m)
-            if any([self.board == x for x in self.seen_configuration]):
-                # already examined this board setup, so no point of further examinations of this move
-                # print("Already seen this board")
-                self.revert_move(m)
-                continue
-            # print(board_before_move)
-            # print(f"[{self.search_tree_level}] applied {m}")
-            # print(self.board)
-            self.seen_configuration.append(copy.deepcopy(self.board))
-            if self.is_won():
-                self.shortest_solution = self.current_path.copy()
-            else:
-                # no point of going down this branch if it's already longer than the currently found solution
-                if not self.shortest_solution or self.search_tree_level < len(self.shortest_solution) - 1:
-                    self.search_tree_level += 1
-                    self.recursive_solve()
-                    self.search_tree_level -= 1
-            self.revert_move(m)
-            # print(f"[{self.search_tree_level}] Backtracking {m}")
+    def learn(self, solution: list[int], max_depth: int | None, reached: dict | None):
+        """ Keeps the solution in the solved positions, with the positions its search reached, see Search.reached() """
+        if solution:
+            self.solved_positions.learn(Position.from_board(self.board), solution, reached)
+        elif max_depth is None and not self.is_won():
+            self.solved_positions.learn_unsolvable(Position.from_board(self.board), reached)
+
+    def moves_of(self, solution: list[int]) -> list[Move]:
+        """ Translates moves encoded by the solver to Move objects of the board entities """
+        pieces = pieces_of(self.board)
+        moves = []
+        for move in solution:
+            piece, direction = decode_move(move)
+            moves.append(Move(direction=DIRECTIONS[direction], entity=pieces[piece]))
+        return moves
 
     def perform_move(self, move: Move):
         move.original_location = self.board.apply_move(move.entity, move.direction)
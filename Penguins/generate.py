@@ -0,0 +1,239 @@
+""" Generates puzzles whose shortest solution has a length in the requested range, on several processes.
+
+    python -m Penguins.generate -o puzzles.jsonl --count 100 --size 5x5 --length 6-9 --unique --workers 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+from Penguins.analysis import get_analysis
+from Penguins.heuristics import LineOfSight
+from Penguins.position import Position
+from Penguins.search import Search, SolveTimeout
+from Penguins.serialization import board_from_text, masks_to_text
+from Penguins.solution_cache import canonical_form
+
+METHODS = ("backward", "random")
+# boards tried by a worker before it sends back the puzzles it found, so the output streams and the count isn't overshot
+BATCH_SIZE = 20
+# positions a backward walk from a winning position may go through
+BACKWARD_WALK_BUDGET = 200
+
+
+@dataclass(frozen=True)
+class PuzzleSpec:
+    """ What the generated puzzles look like. penguins, bears and lengths are the ranges of their counts """
+    columns: int = 5
+    rows: int = 5
+    penguins: range = range(1, 4)
+    bears: range = range(2, 7)
+    waters: int = 1
+    lengths: range = range(4, 8)
+    unique: bool = False
+    method: str = "backward"
+    # seconds to spend on solving a board before giving up on it
+    timeout: float = 5.0
+
+
+def random_position(rng: random.Random, spec: PuzzleSpec) -> Position:
+    """ Penguins, bears and waters on distinct random cells """
+    penguins, bears = rng.choice(spec.penguins), rng.choice(spec.bears)
+    cells = rng.sample(range(spec.columns * spec.rows), spec.waters + penguins + bears)
+    water = sum(1 << cell for cell in cells[:spec.waters])
+    return Position(spec.columns, spec.rows, water, cells[spec.waters:], penguins)
+
+
+def walk_back_order(rng: random.Random, position: Position, penguins: int, bears: int, missing: int, moves_left: int,
+                    first: bool) -> list[tuple[int, int]]:
+    """ The predecessors of a position in the order the backward walk tries them: the ones a penguin undived from
+    first with the odds of the missing penguins in the moves left, and only them for the first move taken back """
+    undives, slides = [], []
+    for predecessor in position.predecessors(penguins, bears):
+        (undives if predecessor[0].bit_count() > penguins.bit_count() else slides).append(predecessor)
+    rng.shuffle(undives)
+    rng.shuffle(slides)
+    if first:
+        return undives
+    if missing and rng.random() * moves_left < missing:
+        return undives + slides
+    return slides + undives
+
+
+def backward_position(rng: random.Random, spec: PuzzleSpec) -> Position | None:
+    """ A position that is a few random moves before a winning one, or None if they couldn't bring every penguin back.
+    It takes at least the shortest length requested, and at most twice the longest, but its solution may be shorter.
+    The last move of a solution is a dive, and the other dives are spread over the moves taken back """
+    penguin_count, bear_count = rng.choice(spec.penguins), rng.choice(spec.bears)
+    cell_count = spec.columns * spec.rows
+    water = sum(1 << cell for cell in rng.sample(range(cell_count), spec.waters))
+    dives = get_analysis(spec.columns, spec.rows, water).dives
+    if not dives:
+        return None
+    # a bear stands behind a water, for the last penguin to dive
+    _, bears = rng.choice(dives)
+    free = [cell for cell in range(cell_count) if not (water | bears) >> cell & 1]
+    bears |= sum(1 << cell for cell in rng.sample(free, bear_count - 1))
+    position = Position(spec.columns, spec.rows, water, [], penguin_count)
+    moves = max(penguin_count, rng.randint(spec.lengths.start, 2 * spec.lengths[-1]))
+    # many positions have no predecessor, so the walk backtracks from them, up to a number of positions
+    budget = [BACKWARD_WALK_BUDGET]
+
+    def walk(penguins: int, bears: int, taken_back: int) -> tuple[int, int] | None:
+        missing = penguin_count - penguins.bit_count()
+        if taken_back == moves:
+            return None if missing else (penguins, bears)
+        budget[0] -= 1
+        if budget[0] < 0:
+            return None
+        for predecessor in walk_back_order(rng, position, penguins, bears, missing, moves - taken_back, taken_back == 0):
+            found = walk(*predecessor, taken_back + 1)
+            if found is not None:
+                return found
+        # a dead end is as good, once it took enough moves back
+        return None if missing or taken_back < spec.lengths.start else (penguins, bears)
+
+    found = walk(0, bears, 0)
+    if found is None:
+        return None
+    penguins, bears = found
+    return Position.from_masks(spec.columns, spec.rows, water, penguins, bears)
+
+
+def count_solutions_of_length(position: Position, length: int, limit: int) -> int:
+    """ The number of solutions of the given length, which is the length of the shortest one, counting up to limit.
+    Only follows the moves that may still win within the length, so it is faster than count_shortest_solutions() """
+    heuristic = LineOfSight()
+    # key: solutions from the position in the moves left, for the positions whose count is complete
+    counted = {}
+
+    def count(moves_left: int) -> int:
+        if position.is_won():
+            return 1
+        if heuristic(position) > moves_left:
+            return 0
+        key = (position.key(), moves_left)
+        if key in counted:
+            return counted[key]
+        total = 0
+        for move in position.moves():
+            position.make(move)
+            total += count(moves_left - 1)
+            position.unmake()
+            if total >= limit:
+                return total
+        counted[key] = total
+        return total
+
+    return count(length)
+
+
+def puzzle_of(position: Position, spec: PuzzleSpec) -> dict | None:
+    """ The output entry of the position, without the id, or None if it isn't a puzzle of the spec """
+    if get_analysis(position.columns, position.rows, position.water).is_dead(position):
+        return None
+    try:
+        solution = Search(position, max_depth=spec.lengths[-1], timeout=spec.timeout).run("idastar")
+    except SolveTimeout:
+        return None
+    if len(solution) not in spec.lengths:
+        return None
+    if spec.unique and count_solutions_of_length(position, len(solution), limit=2) > 1:
+        return None
+    return {"board": masks_to_text(position.columns, position.rows, position.water, position.penguins, position.bears),
+            "length": len(solution), "size": f"{position.columns}x{position.rows}",
+            "penguins": position.penguin_count, "bears": len(position.pieces) - position.penguin_count}
+
+
+def generate_batch(spec: PuzzleSpec, seed: str, attempts: int = BATCH_SIZE) -> tuple[list[dict], int]:
+    """ The puzzles found among the given number of boards, generated from the seed, and the number of boards """
+    rng = random.Random(seed)
+    puzzles = []
+    for _ in range(attempts):
+        if spec.method == "backward":
+            position = backward_position(rng, spec)
+        else:
+            position = random_position(rng, spec)
+        if position is not None:
+            puzzle = puzzle_of(position, spec)
+            if puzzle is not None:
+                puzzles.append(puzzle)
+    return puzzles, attempts
+
+
+def generate(spec: PuzzleSpec, count: int, output, workers: int, seed: int = 0) -> dict:
+    """ Writes count puzzles of the spec to output, one JSON object per line, as the workers find them.
+    Returns the counts of the puzzles written, the boards tried and the duplicates skipped """
+    counts = {"puzzles": 0, "boards": 0, "duplicates": 0}
+    seen = set()
+    batches = iter(range(sys.maxsize))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(generate_batch, spec, f"{seed}-{next(batches)}") for _ in range(workers * 2)}
+        while counts["puzzles"] < count:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                puzzles, attempts = future.result()
+                counts["boards"] += attempts
+                for puzzle in puzzles:
+                    form, _ = canonical_form(Position.from_board(board_from_text(puzzle["board"])))
+                    if form in seen:
+                        counts["duplicates"] += 1
+                    elif counts["puzzles"] < count:
+                        seen.add(form)
+                        counts["puzzles"] += 1
+                        output.write(json.dumps({"id": str(counts["puzzles"])} | puzzle) + "\n")
+                output.flush()
+                pending.add(executor.submit(generate_batch, spec, f"{seed}-{next(batches)}"))
+        for future in pending:
+            future.cancel()
+    return counts
+
+
+def parse_range(text: str) -> range:
+    """ 'low-high' or a single number, both ends included """
+    low, _, high = text.partition("-")
+    return range(int(low), int(high or low) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Penguins.generate", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", default="-", help="file to write the puzzles to, - for stdout (default)")
+    parser.add_argument("--count", type=int, default=10, help="number of puzzles (default: 10)")
+    parser.add_argument("--size", default="5x5", help="board size, columns x rows (default: 5x5)")
+    parser.add_argument("--length", type=parse_range, default=range(4, 8),
+                        help="shortest solution lengths, e.g. 6-9 (default: 4-7)")
+    parser.add_argument("--penguins", type=parse_range, default=range(1, 4), help="penguin counts (default: 1-3)")
+    parser.add_argument("--bears", type=parse_range, default=range(2, 7), help="bear counts (default: 2-6)")
+    parser.add_argument("--waters", type=int, default=1, help="number of waters (default: 1)")
+    parser.add_argument("--unique", action="store_true", help="only keep boards with a single shortest solution")
+    parser.add_argument("--method", choices=METHODS, default="backward")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to spend on solving a board (default: 5)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    columns, rows = (int(value) for value in args.size.lower().split("x"))
+    if args.waters + args.penguins[-1] + args.bears[-1] > columns * rows:
+        parser.error(f"{args.size} boards don't have room for that many pieces")
+    if not args.length or args.length.start < 1:
+        parser.error("Solution lengths must be at least 1")
+    spec = PuzzleSpec(columns, rows, args.penguins, args.bears, args.waters, args.length, args.unique, args.method,
+                      args.timeout)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    try:
+        counts = generate(spec, args.count, output, args.workers, args.seed)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    seconds = time.perf_counter() - start
+    print(f"{counts['puzzles']} puzzles from {counts['boards']} boards ({counts['duplicates']} duplicates) "
+          f"in {seconds:.1f} s: {counts['puzzles'] / seconds / args.workers:.2f} puzzles/s per worker", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
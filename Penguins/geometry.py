@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+from Penguins.direction import DIRECTIONS, Direction
+
+# (col, row) offset of one step in each direction
+OFFSETS = {Direction.LEFT: (-1, 0), Direction.UP: (0, -1), Direction.RIGHT: (1, 0), Direction.DOWN: (0, 1)}
+# index of the opposite of DIRECTIONS[i]
+OPPOSITE = tuple(DIRECTIONS.index(next(e for e in DIRECTIONS if OFFSETS[e] == (-OFFSETS[d][0], -OFFSETS[d][1])))
+                 for d in DIRECTIONS)
+
+
+class Geometry:
+    """ Precomputed tables of a columns x rows board. Cells are numbered row * columns + col.
+    rays[cell][i] are the cells seen from cell when looking in DIRECTIONS[i], nearest first,
+    and ray_masks[cell][i] has a bit for each of them """
+
+    def __init__(self, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+        self.cell_count = columns * rows
+        self.locations = tuple((cell % columns, cell // columns) for cell in range(self.cell_count))
+        self.steps = tuple(OFFSETS[d][0] + OFFSETS[d][1] * columns for d in DIRECTIONS)
+        rays = []
+        for col, row in self.locations:
+            cell_rays = []
+            for d in DIRECTIONS:
+                ray = []
+                x, y = col + OFFSETS[d][0], row + OFFSETS[d][1]
+                while 0 <= x < columns and 0 <= y < rows:
+                    ray.append(self.cell(x, y))
+                    x, y = x + OFFSETS[d][0], y + OFFSETS[d][1]
+                cell_rays.append(tuple(ray))
+            rays.append(tuple(cell_rays))
+        self.rays = tuple(rays)
+        self.ray_masks = tuple(tuple(sum(1 << c for c in ray) for ray in cell_rays) for cell_rays in self.rays)
+
+    def cell(self, col: int, row: int) -> int:
+        return row * self.columns + col
+
+
+@lru_cache(maxsize=None)
+def get_geometry(columns: int, rows: int) -> Geometry:
+    """ The tables are built once per board size and shared by every board of that size """
+    return Geometry(columns, rows)
@@ -0,0 +1,46 @@
+from typing import Protocol
+
+from Penguins.position import Position
+
+
+class Heuristic(Protocol):
+    """ Estimates the number of moves needed to win from a position.
+    To keep the solution the shortest one it must be admissible, i.e. never more than the actual number.
+    The A* engine also expects it to be consistent: a single move never lowers the estimate by more than one """
+
+    def __call__(self, position: Position) -> int:
+        ...
+
+
+def remaining_penguins(position: Position) -> int:
+    """ Every move dives at most one penguin """
+    return position.penguins.bit_count()
+
+
+class LineOfSight:
+    """ Every penguin needs a move to dive, and one more move of its own if it can't dive with its next move.
+    A penguin can only dive with its next move if it is in line with a water which has a cell behind it,
+    where a blocker may stop it """
+
+    def __init__(self):
+        self.diving_lines = dict()
+
+    def __call__(self, position: Position) -> int:
+        diving_lines = self.get_diving_lines(position)
+        return position.penguins.bit_count() + (position.penguins & ~diving_lines).bit_count()
+
+    def get_diving_lines(self, position: Position) -> int:
+        """ Mask of the cells from which a penguin may dive with a single move """
+        key = (position.columns, position.rows, position.water)
+        if key not in self.diving_lines:
+            mask = 0
+            for cell in range(position.columns * position.rows):
+                for direction, ray in enumerate(position.rays[cell]):
+                    water_cells = ray & position.water
+                    while water_cells:
+                        water_cell = (water_cells & -water_cells).bit_length() - 1
+                        if position.rays[water_cell][direction]:
+                            mask |= 1 << cell
+                        water_cells &= water_cells - 1
+            self.diving_lines[key] = mask
+        return self.diving_lines[key]
@@ -0,0 +1,140 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Penguins.endgame import EndgameTable
+from Penguins.heuristics import Heuristic
+from Penguins.position import Position
+from Penguins.search import Search
+from Penguins.stats import SearchStats
+from Penguins.symmetry import CanonicalKey
+from Penguins.transposition_table import TranspositionTable
+
+PARALLEL_ENGINES = ("dfs", "iddfs", "idastar")
+DEFAULT_SPLIT_DEPTH = 2
+# length of the shortest solution before any is found, the largest value of a C int
+NO_SOLUTION = 2 ** 31 - 1
+
+# length of the shortest solution found by any worker, shared by the worker processes. Set by init_worker()
+best_length = None
+
+
+def init_worker(shared_best_length):
+    global best_length
+    best_length = shared_best_length
+
+
+class ClaimedPositionsTable(TranspositionTable):
+    """ Transposition table that always holds the positions reached while splitting the search tree.
+    Those are the roots of subtrees or were fully expanded into them, so no other subtree searches them again """
+
+    def __init__(self, claimed: dict):
+        super().__init__()
+        self.claimed = claimed
+        self.clear()
+
+    def clear(self):
+        self.best_depth = dict(self.claimed)
+
+
+class SubtreeSearch(Search):
+    """ Search of the subtree below a few moves made on the position.
+    Prunes the positions that can't lead to a solution shorter than the shortest one found by any worker """
+
+    def __init__(self, position: Position, claimed: dict, **kwargs):
+        super().__init__(position, **kwargs)
+        self.transposition_table = ClaimedPositionsTable(claimed)
+
+    def within_depth_limit(self, depth: int) -> bool:
+        if depth + self.estimate(self.position) >= best_length.value:
+            return False
+        return super().within_depth_limit(depth)
+
+    def found_solution(self, solution: list[int]):
+        super().found_solution(solution)
+        with best_length.get_lock():
+            if len(solution) < best_length.value:
+                best_length.value = len(solution)
+
+
+def search_subtree(position: Position, prefix: list[int], claimed: dict, engine: str, symmetry: bool,
+                   heuristic: Heuristic | None, deadline: float | None,
+                   endgame: EndgameTable | None = None) -> tuple[list[int], SearchStats]:
+    """ Shortest solution starting with the prefix moves, or an empty list if it isn't shorter than the best one,
+    and the stats of the search """
+    for move in prefix:
+        position.make(move)
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    search = SubtreeSearch(position, claimed, symmetry=symmetry, heuristic=heuristic, timeout=timeout, endgame=endgame)
+    return search.run(engine), search.stats
+
+
+def split(position: Position, split_depth: int, symmetry: bool) -> tuple[list[list[int]], dict, list[int] | None]:
+    """ The move sequences leading to the distinct positions split_depth moves away, the keys of all the positions
+    reached on the way with their depth, and a shortest solution if there is one within split_depth moves """
+    initial_snapshot = position.snapshot()
+    key = CanonicalKey(position) if symmetry else position.key
+    seen = {key(): 0}
+    prefixes = [[]]
+    try:
+        for depth in range(1, split_depth + 1):
+            next_prefixes = []
+            for prefix in prefixes:
+                position.restore(initial_snapshot)
+                for move in prefix:
+                    position.make(move)
+                for move in position.moves():
+                    position.make(move)
+                    if key() not in seen:
+                        seen[key()] = depth
+                        if position.is_won():
+                            return [], seen, position.path()
+                        next_prefixes.append(position.path())
+                    position.unmake()
+            prefixes = next_prefixes
+        return prefixes, seen, None
+    finally:
+        position.restore(initial_snapshot)
+
+
+def search_subtrees(workers: int | None, best_length: int, subtrees: list[tuple]) -> list[tuple[list[int], SearchStats]]:
+    """ The results of search_subtree with each of the arguments, on worker processes sharing the best length """
+    shared_best_length = multiprocessing.Value('i', best_length)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(shared_best_length,)) as executor:
+        futures = [executor.submit(search_subtree, *arguments) for arguments in subtrees]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def parallel_search(position: Position, engine: str = "idastar", max_depth: int | None = None, symmetry: bool = False,
+                    heuristic: Heuristic | None = None, timeout: float | None = None, workers: int | None = None,
+                    split_depth: int = DEFAULT_SPLIT_DEPTH, stats: SearchStats | None = None,
+                    endgame: EndgameTable | None = None) -> list[int]:
+    """ Searches for the shortest solution on worker processes, each searching the subtree of a position split_depth
+    plies deep with the engine. The workers share the length of the shortest solution found so far.
+    The heuristic must be picklable, and the counts of all the workers are added to stats, if given """
+    if engine not in PARALLEL_ENGINES:
+        raise ValueError(f"Engine '{engine}' can't run in parallel, expected one of {PARALLEL_ENGINES}")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    # like on a single process, dfs ignores max_depth
+    if engine == "dfs":
+        max_depth = None
+    if position.is_won():
+        return []
+    prefixes, claimed, solution = split(position, split_depth, symmetry)
+    if solution is None:
+        best_length = NO_SOLUTION if max_depth is None else max_depth + 1
+        results = search_subtrees(workers, best_length, [
+            (position, prefix, claimed, engine, symmetry, heuristic, deadline, endgame) for prefix in prefixes])
+        for _, subtree_stats in results:
+            if stats is not None:
+                stats.merge(subtree_stats)
+        # ties go to the first subtree, in the order the moves are generated
+        solution = min((s for s, _ in results if s), key=len, default=[])
+    if max_depth is not None and len(solution) > max_depth:
+        return []
+    return solution
@@ -0,0 +1,269 @@
+from Penguins.board import Board
+from Penguins.direction import DIRECTIONS
+from Penguins.entity import Entity, EntityClass
+from Penguins.geometry import OPPOSITE, get_geometry
+
+MOVES_PER_PIECE = len(DIRECTIONS)
+UNDO_STACK_SIZE = 64
+
+
+def encode_move(piece: int, direction: int) -> int:
+    """ Moves are small ints, piece * 4 + direction index """
+    return piece * MOVES_PER_PIECE + direction
+
+
+def decode_move(move: int) -> tuple[int, int]:
+    """ The (piece, direction index) of an encoded move """
+    return divmod(move, MOVES_PER_PIECE)
+
+
+def pieces_of(board: Board) -> list[Entity]:
+    """ The entities that can move, penguins first. This is the order of Position.pieces """
+    return board.get_all_entities_of_class(EntityClass.PENGUIN) + board.get_all_entities_of_class(EntityClass.BEAR)
+
+
+def cells_of(mask: int) -> list[int]:
+    """ The cells of the bits of the mask, in order """
+    cells = []
+    while mask:
+        cells.append((mask & -mask).bit_length() - 1)
+        mask &= mask - 1
+    return cells
+
+
+class Position:
+    """ Compact solver-side view of a board: cells are numbered row * columns + col, and water, penguins and bears
+    are bitmasks over them. pieces has the cell of every piece, None for a penguin that dived """
+
+    __slots__ = ('columns', 'rows', 'water', 'pieces', 'penguin_count', 'penguins', 'bears', 'rays', 'steps',
+                 'ply', 'move_stack', 'undo_stack')
+
+    def __init__(self, columns: int, rows: int, water: int, pieces: list, penguin_count: int):
+        self.columns = columns
+        self.rows = rows
+        self.water = water
+        self.penguin_count = penguin_count
+        geometry = get_geometry(columns, rows)
+        self.rays = geometry.ray_masks
+        self.steps = geometry.steps
+        self.pieces = []
+        self.penguins = 0
+        self.bears = 0
+        # moves made so far and the cells their pieces came from, preallocated so make() doesn't allocate
+        self.ply = 0
+        self.move_stack = [0] * UNDO_STACK_SIZE
+        self.undo_stack = [0] * UNDO_STACK_SIZE
+        self.restore(pieces)
+
+    @classmethod
+    def from_board(cls, board: Board) -> 'Position':
+        water = 0
+        for e in board.get_all_entities_of_class(EntityClass.WATER):
+            water |= 1 << (e.row * board.columns + e.col)
+        pieces = [e.row * board.columns + e.col for e in pieces_of(board)]
+        penguin_count = len(board.get_all_entities_of_class(EntityClass.PENGUIN))
+        return cls(board.columns, board.rows, water, pieces, penguin_count)
+
+    @classmethod
+    def from_masks(cls, columns: int, rows: int, water: int, penguins: int, bears: int) -> 'Position':
+        """ The position of the masks, without a Board. Its pieces are the penguins, then the bears, each in cell order """
+        return cls(columns, rows, water, cells_of(penguins) + cells_of(bears), penguins.bit_count())
+
+    def __repr__(self):
+        s = ""
+        for row in range(self.rows):
+            for col in range(self.columns):
+                bit = 1 << (row * self.columns + col)
+                if self.penguins & bit:
+                    s += "P"
+                elif self.bears & bit:
+                    s += "B"
+                elif self.water & bit:
+                    s += "W"
+                else:
+                    s += "."
+            s += "\n"
+        return s
+
+    def key(self) -> tuple[int, int]:
+        """ Hashable key of the position. Water never moves, so only penguins and bears are part of it """
+        return self.penguins, self.bears
+
+    def snapshot(self) -> tuple:
+        return tuple(self.pieces)
+
+    def restore(self, pieces):
+        self.ply = 0
+        self.pieces = list(pieces)
+        self.penguins = 0
+        self.bears = 0
+        for piece, cell in enumerate(self.pieces):
+            if cell is None:
+                continue
+            if piece < self.penguin_count:
+                self.penguins |= 1 << cell
+            else:
+                self.bears |= 1 << cell
+
+    def piece_at(self, cell: int) -> int | None:
+        """ Index of the penguin or bear in the cell, or None if it is empty """
+        return self.pieces.index(cell) if cell in self.pieces else None
+
+    def is_won(self) -> bool:
+        return self.penguins == 0
+
+    def destination(self, piece: int, direction: int):
+        """ The cell a piece slides to in DIRECTIONS[direction], or None if the move is illegal """
+        cell = self.pieces[piece]
+        if cell is None:
+            return None
+        hits = self.rays[cell][direction] & (self.penguins | self.bears)
+        if not hits:
+            return None
+        step = self.steps[direction]
+        if step > 0:
+            blocker = (hits & -hits).bit_length() - 1  # nearest blocker is the lowest bit
+        else:
+            blocker = hits.bit_length() - 1  # nearest blocker is the highest bit
+        destination = blocker - step
+        return destination if destination != cell else None
+
+    def moves(self):
+        """ Lazily generates the legal moves, encoded with encode_move().
+        The position must be back in the same state (e.g. by unmake()) before asking for the next move """
+        occupied = self.penguins | self.bears
+        rays = self.rays
+        steps = self.steps
+        for piece, cell in enumerate(self.pieces):
+            if cell is None:
+                continue
+            cell_rays = rays[cell]
+            for direction in range(MOVES_PER_PIECE):
+                hits = cell_rays[direction] & occupied
+                if not hits:
+                    continue
+                step = steps[direction]
+                blocker = (hits & -hits).bit_length() - 1 if step > 0 else hits.bit_length() - 1
+                if blocker - step != cell:
+                    yield piece * MOVES_PER_PIECE + direction
+
+    def ordered_moves(self, diving_lines: int) -> list[int]:
+        """ The legal moves, most promising first: penguins that dive, penguins that stop on diving_lines,
+        from where they may dive with their next move, then the other penguin moves and the bear moves """
+        occupied = self.penguins | self.bears
+        water = self.water
+        rays = self.rays
+        steps = self.steps
+        pieces = self.pieces
+        dives = []
+        toward_water = []
+        others = []
+        for piece in range(self.penguin_count):
+            cell = pieces[piece]
+            if cell is None:
+                continue
+            cell_rays = rays[cell]
+            for direction in range(MOVES_PER_PIECE):
+                hits = cell_rays[direction] & occupied
+                if not hits:
+                    continue
+                step = steps[direction]
+                destination = ((hits & -hits).bit_length() - 1 if step > 0 else hits.bit_length() - 1) - step
+                if destination == cell:
+                    continue
+                if water >> destination & 1:
+                    dives.append(piece * MOVES_PER_PIECE + direction)
+                elif diving_lines >> destination & 1:
+                    toward_water.append(piece * MOVES_PER_PIECE + direction)
+                else:
+                    others.append(piece * MOVES_PER_PIECE + direction)
+        return dives + toward_water + others + self.bear_moves()
+
+    def bear_moves(self) -> list[int]:
+        """ The legal moves of the bears, which never dive """
+        occupied = self.penguins | self.bears
+        rays = self.rays
+        steps = self.steps
+        pieces = self.pieces
+        moves = []
+        for piece in range(self.penguin_count, len(pieces)):
+            cell = pieces[piece]
+            cell_rays = rays[cell]
+            for direction in range(MOVES_PER_PIECE):
+                hits = cell_rays[direction] & occupied
+                if not hits:
+                    continue
+                step = steps[direction]
+                blocker = (hits & -hits).bit_length() - 1 if step > 0 else hits.bit_length() - 1
+                if blocker - step != cell:
+                    moves.append(piece * MOVES_PER_PIECE + direction)
+        return moves
+
+    def predecessors(self, penguins: int, bears: int):
+        """ Lazily generates the (penguins, bears) masks of the positions of this board one move before the given ones,
+        including those where one of the penguins that dived was still on the board """
+        geometry = get_geometry(self.columns, self.rows)
+        water = self.water
+        occupied = penguins | bears
+        # cells where a piece may have ended its move: the pieces, and the empty waters if a penguin dived
+        ends = occupied | (water & ~occupied if penguins.bit_count() < self.penguin_count else 0)
+        while ends:
+            cell = (ends & -ends).bit_length() - 1
+            ends &= ends - 1
+            bit = 1 << cell
+            cell_rays = geometry.rays[cell]
+            for direction in range(MOVES_PER_PIECE):
+                behind = cell_rays[direction]
+                if not behind or not occupied >> behind[0] & 1:
+                    continue
+                for origin in cell_rays[OPPOSITE[direction]]:
+                    origin_bit = 1 << origin
+                    if occupied & origin_bit:
+                        break
+                    if bears & bit:
+                        yield penguins, bears ^ bit | origin_bit
+                    elif water & origin_bit:
+                        continue
+                    elif penguins & bit:
+                        yield penguins ^ bit | origin_bit, bears
+                    else:
+                        yield penguins | origin_bit, bears  # the penguin dived into the water
+
+    def make(self, move: int):
+        """ Applies a legal move, keeping what is needed to unmake it """
+        piece, direction = decode_move(move)
+        original_cell = self.pieces[piece]
+        destination = self.destination(piece, direction)
+        if self.ply == len(self.move_stack):
+            self.move_stack.extend([0] * len(self.move_stack))
+            self.undo_stack.extend([0] * len(self.undo_stack))
+        self.move_stack[self.ply] = move
+        self.undo_stack[self.ply] = original_cell
+        self.ply += 1
+        if piece < self.penguin_count:
+            self.penguins ^= 1 << original_cell
+            if self.water >> destination & 1:
+                destination = None  # the penguin dives
+            else:
+                self.penguins |= 1 << destination
+        else:
+            self.bears ^= (1 << original_cell) | (1 << destination)
+        self.pieces[piece] = destination
+
+    def unmake(self):
+        """ Reverts the last move made """
+        self.ply -= 1
+        piece = self.move_stack[self.ply] // MOVES_PER_PIECE
+        original_cell = self.undo_stack[self.ply]
+        cell = self.pieces[piece]
+        if piece < self.penguin_count:
+            if cell is not None:
+                self.penguins ^= 1 << cell
+            self.penguins |= 1 << original_cell
+        else:
+            self.bears ^= (1 << cell) | (1 << original_cell)
+        self.pieces[piece] = original_cell
+
+    def path(self) -> list[int]:
+        """ The moves made since the last restore() """
+        return self.move_stack[:self.ply]
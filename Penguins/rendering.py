@@ -0,0 +1,46 @@
+""" Drawing of boards with pygame. The model and the solver don't depend on it, so they can run headless """
+import pygame
+
+from Penguins.board import Board
+from Penguins.constants import BOARD_SIZE, BLACK, WHITE, BLUE, GREY, LIGHT_BLUE
+from Penguins.entity import Entity, EntityClass
+
+# padding between an entity and the border of its square, as a fraction of the square
+ENTITY_PADDING = 0.2
+ENTITY_OUTLINE = 2
+
+
+def square_size(board: Board) -> int:
+    """ Side of a square in pixels, so the whole board fits in BOARD_SIZE x BOARD_SIZE """
+    return BOARD_SIZE // max(board.columns, board.rows)
+
+
+def entity_center(entity: Entity, square: int) -> tuple[int, int]:
+    """ Pixel position of the center of the entity's square """
+    return square * entity.col + square // 2, square * entity.row + square // 2
+
+
+def get_color_by_entity_class(entity_class: EntityClass) -> tuple[int, int, int]:
+    if entity_class == EntityClass.WATER:
+        return BLUE
+    if entity_class == EntityClass.BEAR:
+        return WHITE
+    if entity_class == EntityClass.PENGUIN:
+        return BLACK
+
+
+def draw_entity(win, entity: Entity, square: int):
+    color = get_color_by_entity_class(entity.entity_class)
+    radius = int(square * (1 - ENTITY_PADDING)) // 2
+    pygame.draw.circle(win, GREY, entity_center(entity, square), radius + ENTITY_OUTLINE)
+    pygame.draw.circle(win, color, entity_center(entity, square), radius)
+
+
+def draw_board(win, board: Board):
+    square = square_size(board)
+    pygame.draw.rect(win, LIGHT_BLUE, (0, 0, board.columns * square, board.rows * square))
+    for row in range(board.rows):
+        for col in range(board.columns):
+            pygame.draw.rect(win, BLACK, (col * square, row * square, square, square), 1)
+    for e in board.entities:
+        draw_entity(win, e, square)
@@ -0,0 +1,703 @@
+import heapq
+import time
+from itertools import combinations, count
+from math import comb
+
+from Penguins.analysis import get_analysis
+from Penguins.endgame import UNSOLVABLE, EndgameTable
+from Penguins.heuristics import Heuristic, LineOfSight
+from Penguins.position import Position, decode_move, encode_move
+from Penguins.solved_positions import SolvedPositions
+from Penguins.stats import SearchStats
+from Penguins.symmetry import CanonicalKey
+from Penguins.transposition_table import BoundedTranspositionTable, TranspositionTable
+
+# dfs keeps improving the first solution it finds, the others stop at a shortest one, bidirectional searches from
+# both ends
+ENGINES = ("dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional")
+# engines that can search within a memory limit. They forget positions when it's reached, which only costs time
+BOUNDED_MEMORY_ENGINES = ("iddfs", "idastar")
+# how many positions are expanded between checks of the time limit, cancellation and progress reports
+CHECK_INTERVAL = 1024
+
+
+class SolveTimeout(Exception):
+    """ The search ran past its time limit """
+
+
+class SolveCancelled(Exception):
+    """ The search was cancelled by Search.cancel() """
+
+
+class Search:
+    """ Searches for the shortest solution of a position, as a list of moves encoded by encode_move().
+    Reached positions are kept in a transposition table, and the positions of the endgame table and the positions
+    solved before aren't searched. on_progress and on_solution report how the search goes """
+
+    def __init__(self, position: Position, max_depth: int | None = None, symmetry: bool = False,
+                 heuristic: Heuristic | None = None, timeout: float | None = None, memory_limit: int | None = None,
+                 endgame: EndgameTable | None = None, solved: SolvedPositions | None = None):
+        self.position = position
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.stats = SearchStats()
+        self.cancelled = False
+        self.on_progress = None
+        self.on_solution = None
+        self.max_depth = max_depth
+        self.heuristic = heuristic if heuristic is not None else LineOfSight()
+        self.key = CanonicalKey(position) if symmetry else position.key
+        self.memory_limit = memory_limit
+        if memory_limit is None:
+            self.transposition_table = TranspositionTable()
+        else:
+            self.transposition_table = BoundedTranspositionTable(memory_limit, position.columns * position.rows)
+        # the positions on the way from the root to the one being expanded, which a bounded table may have forgotten.
+        # The search doesn't go back to them, so its paths never repeat a position, and a depth limit past the number
+        # of reachable positions prunes nothing: without them, cycles through forgotten positions always reach the
+        # limit, and iterative deepening never ends on a board without a solution
+        self.path_keys = None if memory_limit is None else set()
+        self.shortest_solution = []
+        # positions whose moves made + estimate of moves left exceed the depth limit are not expanded
+        self.depth_limit = None
+        self.next_depth_limit = None
+        self.estimate = self.heuristic
+        analysis = get_analysis(position.columns, position.rows, position.water)
+        self.diving_lines = analysis.diving_lines
+        # cells the pieces may ever be on: the ones a piece can slide to, and the ones they start on
+        self.reachable = analysis.reachable | position.penguins | position.bears
+        # None for the boards whose positions can't be proven dead, which are most of them
+        self.is_dead = analysis.is_dead if analysis.may_be_dead(position) else None
+        # None if there is no table or it holds none of the positions of this board, and nothing was solved before
+        self.endgame = endgame.section_for(position) if endgame is not None else None
+        # fewest moves left of the positions reached by the searches before, by key, and a solution found before
+        self.lower_bounds = None
+        self.known_solution = None
+        if solved is not None:
+            self.endgame = solved.section_for(position, self.endgame)
+            self.lower_bounds = solved.lower_bounds_for(position)
+            self.known_solution = solved.solution_for(position)
+            if self.known_solution is not None and max_depth is not None and len(self.known_solution) > max_depth:
+                self.known_solution = None
+        # the positions the search reached by key, with the fewest moves from the position, for the engines that don't
+        # keep them in the transposition table, or the parent of each, which breadth-first search keeps anyway
+        self.depths = None
+        self.parents = None
+
+    def run(self, engine: str) -> list[int]:
+        """ Runs the engine with the given name, one of ENGINES """
+        if self.memory_limit is not None and engine not in BOUNDED_MEMORY_ENGINES:
+            raise ValueError(f"Engine '{engine}' can't search within a memory limit, only {BOUNDED_MEMORY_ENGINES} can")
+        if self.is_dead is not None and self.is_dead(self.position):
+            self.stats.dead_position_prunes += 1
+            return self.shortest_solution
+        distance = self.endgame.distance(*self.position.key()) if self.endgame is not None else None
+        if distance is not None:
+            self.stats.endgame_hits += 1
+            if distance != UNSOLVABLE and (self.max_depth is None or engine == "dfs"
+                                           or self.position.ply + distance <= self.max_depth):
+                self.found_solution(self.position.path() + self.endgame_line())
+            return self.shortest_solution
+        engines = {"dfs": self.depth_first, "bfs": self.breadth_first, "iddfs": self.iterative_deepening,
+                   "astar": self.a_star, "idastar": self.iterative_deepening_a_star,
+                   "bidirectional": self.bidirectional}
+        return engines[engine]()
+
+    def depth_first(self) -> list[int]:
+        """ Traverses the whole depth-first search tree, keeping the shortest solution found """
+        self.transposition_table.clear()
+        self.transposition_table.record(self.key(), self.position.ply)
+        if self.known_solution is not None:
+            self.found_solution(self.position.path() + self.known_solution)
+        self.recursive_solve()
+        return self.shortest_solution
+
+    def iterative_deepening(self) -> list[int]:
+        # same as IDA* with an estimate of a single move left
+        return self.deepen(lambda position: 1)
+
+    def iterative_deepening_a_star(self) -> list[int]:
+        """ Iterative deepening, where each iteration prunes the positions whose moves made + estimated moves left
+        exceed a threshold. Uses as little memory as iddfs while expanding far fewer positions """
+        return self.deepen(self.heuristic)
+
+    def deepen(self, estimate: Heuristic) -> list[int]:
+        if self.position.is_won():
+            return self.shortest_solution
+        self.estimate = estimate
+        # depths count the moves already made on the position, so the search may start from a midgame position
+        self.depth_limit = self.position.ply + estimate(self.position)
+        with self.stats.phase("deepening"):
+            while self.max_depth is None or self.depth_limit <= self.max_depth:
+                if self.known_solution is not None and self.position.ply + len(self.known_solution) <= self.depth_limit:
+                    # no solution is within a lower limit, so the one found before is a shortest one
+                    self.found_solution(self.position.path() + self.known_solution)
+                    break
+                self.next_depth_limit = None
+                self.transposition_table.clear()
+                self.transposition_table.record(self.key(), self.position.ply)
+                if self.path_keys is not None:
+                    self.path_keys = {self.key()}
+                self.stats.iterations += 1
+                # every lower limit failed, so the first solution found within this limit is a shortest one
+                if self.recursive_solve() or self.next_depth_limit is None:
+                    break
+                self.depth_limit = self.next_depth_limit
+        self.depth_limit = None
+        return self.shortest_solution
+
+    def breadth_first(self) -> list[int]:
+        """ Expands the positions level by level, so the first winning position found is reached by a shortest path """
+        position = self.position
+        if position.is_won():
+            return self.shortest_solution
+        endgame = self.endgame
+        initial_snapshot = position.snapshot()
+        parents = {self.key(): None}
+        self.parents = parents
+        level = [initial_snapshot]
+        depth = 0
+        in_endgame = (lambda key: endgame.distance(*position.key()) is not None) if endgame is not None else None
+        # (length, key, snapshot) of the shortest solution through a position of the endgame table
+        endgame_solution = None
+        known_length = len(self.known_solution) if self.known_solution is not None else None
+        while level and (self.max_depth is None or depth < self.max_depth):
+            if endgame_solution is not None and endgame_solution[0] <= depth + 1:
+                break  # no solution through the next level is shorter
+            if known_length is not None and known_length <= depth + 1:
+                break  # nor shorter than the solution found before
+            depth += 1
+            with self.stats.phase(f"level {depth}"):
+                level, stopped, won_key = self.expand_level(level, depth, parents, self.key, in_endgame)
+            if won_key is not None:
+                self.found_solution(self.path_to(won_key, parents))
+                break
+            self.stats.endgame_hits += len(stopped)
+            endgame_solution = self.shortest_endgame_solution(stopped, depth, endgame_solution)
+        if (not self.shortest_solution and endgame_solution is not None
+                and (known_length is None or endgame_solution[0] < known_length)):
+            _, key, snapshot = endgame_solution
+            position.restore(snapshot)
+            self.found_solution(self.path_to(key, parents) + self.endgame_line())
+        if not self.shortest_solution and known_length is not None:
+            self.found_solution(self.known_solution)
+        position.restore(initial_snapshot)
+        return self.shortest_solution
+
+    def expand_level(self, level: list, depth: int, parents: dict, key, stop) -> tuple[list, list, object]:
+        """ Expands the snapshots of a level of a breadth-first search, keeping the (parent key, move) of every new
+        position. stop(key), if given, tells the ones not to search on from, e.g. the ones of the endgame table.
+        Returns the snapshots of the next level, the (key, snapshot) of the stopped positions, and the key of the
+        first won position, where it stops, or None """
+        position = self.position
+        stats = self.stats
+        is_dead = self.is_dead
+        next_level = []
+        stopped = []
+        for snapshot in level:
+            self.expand(depth - 1)
+            position.restore(snapshot)
+            parent_key = key()
+            for move in position.moves():
+                position.make(move)
+                stats.generated_per_ply[depth] += 1
+                child_key = key()
+                if child_key in parents:
+                    stats.transposition_hits += 1
+                else:
+                    parents[child_key] = (parent_key, move)
+                    if position.is_won():
+                        position.unmake()
+                        return next_level, stopped, child_key
+                    if stop is not None and stop(child_key):
+                        stopped.append((child_key, position.snapshot()))
+                    elif is_dead is not None and is_dead(position):
+                        stats.dead_position_prunes += 1
+                    else:
+                        next_level.append(position.snapshot())
+                position.unmake()
+        return next_level, stopped, None
+
+    def shortest_endgame_solution(self, stopped: list, depth: int, shortest: tuple | None) -> tuple | None:
+        """ The (length, key, snapshot) of the shortest solution within max_depth through shortest or through one of
+        the stopped (key, snapshot) positions of the endgame table, which are depth moves deep """
+        position = self.position
+        for key, snapshot in stopped:
+            position.restore(snapshot)
+            distance = self.endgame.distance(*position.key())
+            length = depth + distance
+            if (distance != UNSOLVABLE and (self.max_depth is None or length <= self.max_depth)
+                    and (shortest is None or length < shortest[0])):
+                shortest = (length, key, snapshot)
+        return shortest
+
+    def a_star(self) -> list[int]:
+        """ Always expands the position with the lowest moves made + estimated moves left.
+        With an admissible heuristic the first winning position expanded is reached by a shortest path """
+        position = self.position
+        stats = self.stats
+        endgame = self.endgame
+        initial_snapshot = position.snapshot()
+        root_key = self.key()
+        # parent key of every position. A position reached again by a shorter path may have its pieces in another
+        # order, or be another rotation or reflection of it, so the moves of its children only fit the old path
+        parents = {root_key: None}
+        best_depth = {root_key: 0}
+        self.depths = best_depth
+        tie_breaker = count()
+        # ties are broken in favour of deeper positions, which are closer to a win
+        open_positions = [(self.heuristic(position), 0, next(tie_breaker), initial_snapshot)]
+        while open_positions:
+            estimate, negative_depth, _, snapshot = heapq.heappop(open_positions)
+            if self.known_solution is not None and estimate >= len(self.known_solution):
+                break  # no solution through the positions left is shorter
+            depth = -negative_depth
+            position.restore(snapshot)
+            parent_key = self.key()
+            if best_depth[parent_key] < depth:
+                continue  # a shorter path to this position was found after this one was queued
+            if position.is_won():
+                self.found_solution(self.path_through_keys(self.keys_to(parent_key, parents), initial_snapshot))
+                break
+            if endgame is not None and endgame.distance(*position.key()) is not None:
+                # queued with its exact moves left, so no other solution is shorter
+                if self.max_depth is None or estimate <= self.max_depth:
+                    keys = self.keys_to(parent_key, parents) + self.keys_along(self.endgame_line())
+                    self.found_solution(self.path_through_keys(keys, initial_snapshot))
+                    break
+                stats.depth_limit_prunes += 1
+                continue
+            if self.max_depth is not None and depth >= self.max_depth:
+                stats.depth_limit_prunes += 1
+                continue
+            self.expand(depth)
+            self.queue_children(depth, parent_key, open_positions, tie_breaker, best_depth, parents)
+        if not self.shortest_solution and self.known_solution is not None:
+            self.found_solution(self.known_solution)
+        position.restore(initial_snapshot)
+        return self.shortest_solution
+
+    def queue_children(self, depth: int, parent_key, open_positions: list, tie_breaker, best_depth: dict, parents: dict):
+        """ Queues the children of the current position of a_star() that weren't reached before by a path as short,
+        by their moves made + estimated moves left """
+        position = self.position
+        heuristic = self.heuristic
+        stats = self.stats
+        is_dead = self.is_dead
+        endgame = self.endgame
+        for move in position.moves():
+            position.make(move)
+            stats.generated_per_ply[depth + 1] += 1
+            key = self.key()
+            if is_dead is not None and is_dead(position):
+                stats.dead_position_prunes += 1
+            elif key not in best_depth or depth + 1 < best_depth[key]:
+                moves_left = heuristic(position) if endgame is None else self.endgame_estimate(heuristic)
+                if moves_left is not None:
+                    moves_left = max(moves_left, self.known_lower_bound())
+                    best_depth[key] = depth + 1
+                    parents[key] = parent_key
+                    heapq.heappush(open_positions, (depth + 1 + moves_left, -depth - 1, next(tie_breaker),
+                                                    position.snapshot()))
+            else:
+                stats.transposition_hits += 1
+            position.unmake()
+
+    def bidirectional(self) -> list[int]:
+        """ Breadth-first search forward from the position and backward from every winning position, expanding the
+        smaller frontier a level at a time until they meet. Positions are looked up by their plain key, symmetry is ignored """
+        position = self.position
+        if position.is_won():
+            return self.shortest_solution
+        initial_snapshot = position.snapshot()
+        parents = {position.key(): None}
+        self.parents = parents
+        forward_level = [initial_snapshot]
+        forward_depth = 0
+        bear_count = len(position.pieces) - position.penguin_count
+        goal_count = comb(self.reachable.bit_count(), bear_count)
+        # key: (the next key on the way to a win, moves left), once the backward side is searched
+        backward = None
+        backward_level = []
+        backward_depth = 0
+        # (length, key) of the shortest path through the positions where the sides met
+        meeting = None
+        while meeting is None and forward_level and (backward is None or backward_level):
+            if self.max_depth is not None and forward_depth + backward_depth >= self.max_depth:
+                break
+            if len(forward_level) <= (goal_count if backward is None else len(backward_level)):
+                forward_depth += 1
+                with self.stats.phase(f"forward level {forward_depth}"):
+                    met = backward.__contains__ if backward is not None else None
+                    forward_level, stopped, won_key = self.expand_level(forward_level, forward_depth, parents,
+                                                                        position.key, met)
+                # no path through this level is shorter than a win on it
+                meeting = (forward_depth, won_key) if won_key is not None else min(
+                    ((forward_depth + backward[key][1], key) for key, _ in stopped), default=None)
+            else:
+                if backward is None:
+                    with self.stats.phase("winning positions"):
+                        backward = self.winning_positions(bear_count)
+                        backward_level = list(backward)
+                backward_depth += 1
+                with self.stats.phase(f"backward level {backward_depth}"):
+                    backward_level, meeting = self.expand_backward_level(backward_level, backward_depth, backward,
+                                                                         parents)
+        position.restore(initial_snapshot)
+        if meeting is not None:
+            self.found_solution(self.path_through(meeting[1], parents, backward))
+        return self.shortest_solution
+
+    def winning_positions(self, bear_count: int) -> dict:
+        """ The backward side of bidirectional() before its first level: every arrangement of the bears on the cells
+        they may be on, once all penguins dived """
+        cells = [cell for cell in range(self.position.columns * self.position.rows) if self.reachable >> cell & 1]
+        return {(0, sum(1 << cell for cell in bears)): (None, 0) for bears in combinations(cells, bear_count)}
+
+    def expand_backward_level(self, level: list, depth: int, backward: dict, parents: dict) -> tuple[list, tuple | None]:
+        """ Expands the keys of a level of the backward side of bidirectional(), keeping the (next key, moves left) of
+        every new position. Returns the keys of the next level, and the (length, key) of the shortest path through
+        the positions the forward side reached, or None """
+        position = self.position
+        stats = self.stats
+        reachable = self.reachable
+        next_level = []
+        meeting = None
+        for key in level:
+            self.expand_backward(depth - 1)
+            for predecessor in position.predecessors(*key):
+                if predecessor in backward:
+                    stats.transposition_hits += 1
+                elif (predecessor[0] | predecessor[1]) & ~reachable:
+                    stats.dead_position_prunes += 1  # a piece is back where it can't slide to
+                else:
+                    backward[predecessor] = (key, depth)
+                    if predecessor in parents:
+                        length = len(self.path_to(predecessor, parents)) + depth
+                        meeting = min(meeting or (length, predecessor), (length, predecessor))
+                    else:
+                        next_level.append(predecessor)
+        return next_level, meeting
+
+    def path_through(self, key, parents: dict, backward: dict | None) -> list[int]:
+        """ The moves to the position with the key, followed by the moves from it to a win along the backward side """
+        position = self.position
+        path = self.path_to(key, parents)
+        for move in path:
+            position.make(move)
+        while backward is not None and key in backward and backward[key][0] is not None:
+            key = backward[key][0]
+            for move in list(position.moves()):
+                position.make(move)
+                if position.key() == key:
+                    path.append(move)
+                    break
+                position.unmake()
+        return path
+
+    def count_shortest_solutions(self) -> tuple[int, int]:
+        """ The length of the shortest solutions and how many there are, or (0, 0) if there is none within max_depth.
+        Solutions are move sequences, so two that reach the same positions in another order are both counted """
+        length, count, _, _ = self.shortest_solution_graph(keep_parents=False)
+        return length, count
+
+    def shortest_solutions(self):
+        """ Lazily generates every shortest solution. The positions on the way are searched before the first one """
+        _, _, parents, winning_moves = self.shortest_solution_graph(keep_parents=True)
+        for parent_key, move in winning_moves:
+            for path in self.paths_to(parent_key, parents):
+                yield self.piece_moves(path + [move])
+
+    def piece_moves(self, cell_moves: list[tuple[int, int]]) -> list[int]:
+        """ The moves encoded by encode_move() of a path of (cell, direction) moves from the position """
+        position = self.position
+        moves = []
+        for cell, direction in cell_moves:
+            moves.append(encode_move(position.piece_at(cell), direction))
+            position.make(moves[-1])
+        for _ in moves:
+            position.unmake()
+        return moves
+
+    @classmethod
+    def paths_to(cls, key, parents: dict):
+        """ Lazily generates the shortest paths to the position with the key """
+        if parents[key] is None:
+            yield []
+            return
+        for parent_key, move in parents[key]:
+            for path in cls.paths_to(parent_key, parents):
+                yield path + [move]
+
+    def shortest_solution_graph(self, keep_parents: bool) -> tuple[int, int, dict | None, list]:
+        """ Breadth-first search up to the first level with a winning position, counting the shortest paths to every position.
+        Returns the length of the shortest solutions, their count, and if keep_parents the (parent key, (cell, direction))
+        of every shortest path to each position and of the last move of every shortest solution """
+        position = self.position
+        if position.is_won():
+            return 0, 1, {position.key(): None}, []
+        initial_snapshot = position.snapshot()
+        root_key = position.key()
+        seen = {root_key}
+        parents = {root_key: None} if keep_parents else None
+        # snapshots and shortest path counts of the positions of the level
+        level = {root_key: initial_snapshot}
+        counts = {root_key: 1}
+        depth = 0
+        try:
+            while level and (self.max_depth is None or depth < self.max_depth):
+                depth += 1
+                with self.stats.phase(f"level {depth}"):
+                    level, next_counts, winning_moves = self.count_level(level, counts, depth, seen, parents)
+                if winning_moves:
+                    return depth, sum(counts[parent_key] for parent_key, _ in winning_moves), parents, winning_moves
+                counts = next_counts
+            return 0, 0, parents, []
+        finally:
+            position.restore(initial_snapshot)
+
+    def count_level(self, level: dict, counts: dict, depth: int, seen: set, parents: dict | None) -> tuple[dict, dict, list]:
+        """ Expands a level of shortest_solution_graph(), adding the (parent key, (cell, direction)) of every shortest
+        path to the positions of the next level to parents, if given. Returns the snapshots of the next level, their
+        shortest path counts, and the (parent key, (cell, direction)) of the moves that win """
+        position = self.position
+        stats = self.stats
+        is_dead = self.is_dead
+        next_level = {}
+        next_counts = {}
+        winning_moves = []
+        for parent_key, snapshot in level.items():
+            self.expand(depth - 1)
+            position.restore(snapshot)
+            for move in position.moves():
+                piece, direction = decode_move(move)
+                cell_move = (position.pieces[piece], direction)
+                position.make(move)
+                stats.generated_per_ply[depth] += 1
+                key = position.key()
+                if position.is_won():
+                    winning_moves.append((parent_key, cell_move))
+                elif key in next_level:
+                    next_counts[key] += counts[parent_key]
+                    if parents is not None:
+                        parents[key].append((parent_key, cell_move))
+                elif key in seen:
+                    stats.transposition_hits += 1
+                else:
+                    seen.add(key)
+                    if is_dead is not None and is_dead(position):
+                        stats.dead_position_prunes += 1
+                    else:
+                        next_level[key] = position.snapshot()
+                        next_counts[key] = counts[parent_key]
+                        if parents is not None:
+                            parents[key] = [(parent_key, cell_move)]
+                position.unmake()
+        return next_level, next_counts, winning_moves
+
+    def cancel(self):
+        """ Makes the search raise SolveCancelled. Meant to be called from another thread or a callback """
+        self.cancelled = True
+
+    def expand(self, depth: int):
+        """ Counts an expanded position at the given depth.
+        Every CHECK_INTERVAL positions, gives up if the search was cancelled or ran out of time, or reports progress """
+        stats = self.stats
+        stats.expanded += 1
+        # make room for counting the positions generated from this one
+        while len(stats.expanded_per_ply) <= depth + 1:
+            stats.add_ply()
+        stats.expanded_per_ply[depth] += 1
+        if stats.expanded % CHECK_INTERVAL == 0:
+            self.check(depth)
+
+    def expand_backward(self, moves_left: int):
+        """ Counts a position expanded by searching backward from the winning positions, which is not counted per ply """
+        stats = self.stats
+        stats.expanded += 1
+        stats.expanded_backward += 1
+        if stats.expanded % CHECK_INTERVAL == 0:
+            self.check(moves_left)
+
+    def check(self, depth: int):
+        if self.cancelled:
+            raise SolveCancelled(f"Search cancelled after {self.stats.expanded} positions")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SolveTimeout(f"No solution found within the time limit, after {self.stats.expanded} positions")
+        if self.on_progress is not None:
+            self.on_progress(self.stats.expanded, depth)
+
+    @staticmethod
+    def keys_to(key, parents: dict) -> list:
+        """ The keys of the positions on the way to the one with the key, from the parent key of every position """
+        keys = []
+        while parents[key] is not None:
+            keys.append(key)
+            key = parents[key]
+        keys.reverse()
+        return keys
+
+    def keys_along(self, moves: list[int]) -> list:
+        """ The keys of the positions the moves lead to from the current position, which is left as it was """
+        position = self.position
+        keys = []
+        for move in moves:
+            position.make(move)
+            keys.append(self.key())
+        for _ in moves:
+            position.unmake()
+        return keys
+
+    def path_through_keys(self, keys: list, snapshot) -> list[int]:
+        """ The moves from the snapshot through the positions with the keys in turn, which are left made """
+        position = self.position
+        position.restore(snapshot)
+        for key in keys:
+            for move in list(position.moves()):
+                position.make(move)
+                if self.key() == key:
+                    break
+                position.unmake()
+        return position.path()
+
+    @staticmethod
+    def path_to(key, parents: dict) -> list[int]:
+        path = []
+        while parents[key] is not None:
+            key, move = parents[key]
+            path.append(move)
+        path.reverse()
+        return path
+
+    def recursive_solve(self) -> bool:
+        """ Depth-first search from the current position.
+        Returns True if the search can stop, which happens when a solution is found within a depth limit """
+        position = self.position
+        stats = self.stats
+        self.expand(position.ply)
+        depth = position.ply + 1
+        generated_per_ply = stats.generated_per_ply
+        is_dead = self.is_dead
+        endgame = self.endgame
+        path_keys = self.path_keys
+        # without a depth limit, the sooner a short solution is found the more its length prunes.
+        # Iterations of iterative deepening search all their moves but for the last one, so the order barely matters
+        moves = position.moves() if self.depth_limit is not None else position.ordered_moves(self.diving_lines)
+        for move in moves:
+            position.make(move)
+            generated_per_ply[depth] += 1
+            key = self.key()
+            solved = False
+            if not self.transposition_table.record(key, depth) or path_keys is not None and key in path_keys:
+                stats.transposition_hits += 1
+            elif position.is_won():
+                self.found_solution(position.path())
+                solved = self.depth_limit is not None
+            # no point of going down this branch if it's already longer than the currently found solution
+            elif self.shortest_solution and depth + self.known_lower_bound() >= len(self.shortest_solution):
+                stats.bound_prunes += 1
+            elif endgame is not None and (distance := endgame.distance(*position.key())) is not None:
+                stats.endgame_hits += 1
+                solved = self.reached_endgame(depth, distance)
+            elif is_dead is not None and is_dead(position):
+                stats.dead_position_prunes += 1
+            elif not self.within_depth_limit(depth):
+                stats.depth_limit_prunes += 1
+            else:
+                solved = self.solve_deeper(key)
+            position.unmake()
+            if solved:
+                return True
+        return False
+
+    def solve_deeper(self, key) -> bool:
+        """ recursive_solve() of the current position, keeping its key in path_keys meanwhile if they are kept """
+        if self.path_keys is None:
+            return self.recursive_solve()
+        self.path_keys.add(key)
+        solved = self.recursive_solve()
+        self.path_keys.discard(key)
+        return solved
+
+    def found_solution(self, solution: list[int]):
+        """ Called with every solution shorter than the ones found before """
+        self.shortest_solution = solution
+        if self.on_solution is not None:
+            self.on_solution(solution)
+
+    def reached_endgame(self, depth: int, distance: int) -> bool:
+        """ Takes the moves left of the current position from the endgame table instead of searching it.
+        Returns True if the search can stop, like recursive_solve() """
+        if distance == UNSOLVABLE:
+            return False
+        length = depth + distance
+        if self.depth_limit is not None:
+            if length > self.depth_limit:
+                if self.next_depth_limit is None or length < self.next_depth_limit:
+                    self.next_depth_limit = length
+                return False
+            self.found_solution(self.position.path() + self.endgame_line())
+            return True
+        if not self.shortest_solution or length < len(self.shortest_solution):
+            self.found_solution(self.position.path() + self.endgame_line())
+        return False
+
+    def endgame_estimate(self, heuristic: Heuristic) -> int | None:
+        """ The moves left of the current position: exact if it is in the endgame table, None if the table has it
+        with no solution, or else estimated by the heuristic """
+        distance = self.endgame.distance(*self.position.key())
+        if distance is None:
+            return heuristic(self.position)
+        self.stats.endgame_hits += 1
+        return None if distance == UNSOLVABLE else distance
+
+    def endgame_line(self) -> list[int]:
+        """ The moves from the current position, which is in the endgame table, to a win.
+        Each of them leads to a position a move closer to it """
+        position = self.position
+        endgame = self.endgame
+        line = []
+        distance = endgame.distance(*position.key())
+        while distance:
+            for move in position.moves():
+                position.make(move)
+                if endgame.distance(*position.key()) == distance - 1:
+                    line.append(move)
+                    break
+                position.unmake()
+            distance -= 1
+        for _ in line:
+            position.unmake()
+        return line
+
+    def known_lower_bound(self) -> int:
+        """ The fewest moves left of the current position learned by the searches before, or 0 if none is """
+        if self.lower_bounds is None:
+            return 0
+        return self.lower_bounds.get(self.position.key(), 0)
+
+    def reached(self) -> dict:
+        """ The positions the last search reached, by key, with the fewest moves it took to reach them.
+        Empty if it kept them in a BoundedTranspositionTable, which forgets some """
+        if self.depths is not None:
+            return self.depths
+        if self.parents is not None:
+            # every position is reached after its parent
+            depths = {}
+            for key, parent in self.parents.items():
+                depths[key] = 0 if parent is None else depths[parent[0]] + 1
+            return depths
+        if not isinstance(self.transposition_table, TranspositionTable):
+            return {}
+        return {key: depth - self.position.ply for key, depth in self.transposition_table.best_depth.items()}
+
+    def within_depth_limit(self, depth: int) -> bool:
+        """ Whether the current position may be solved within the depth limit.
+        If not, keeps the lowest limit that would allow it in next_depth_limit """
+        if self.depth_limit is None:
+            return True
+        estimate = depth + max(self.estimate(self.position), self.known_lower_bound())
+        if estimate <= self.depth_limit:
+            return True
+        if self.next_depth_limit is None or estimate < self.next_depth_limit:
+            self.next_depth_limit = estimate
+        return False
@@ -0,0 +1,291 @@
+""" Text and binary forms of boards, and conversion between files of them.
+
+    python -m Penguins.serialization boards.jsonl -o boards.bin
+    python -m Penguins.serialization boards.bin -o boards.txt
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from itertools import chain
+
+from Penguins.board import Board
+from Penguins.entity import EntityClass
+from Penguins.position import Position
+
+BOARD_FILE_MAGIC = b"PENGBRDS"
+BOARD_FILE_VERSION = 1
+# magic, version, columns, rows and number of boards
+BOARD_FILE_HEADER = struct.Struct("<8sIHHQ")
+# struct format of the masks of mask_size() bytes that have one
+STRUCT_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+# the entity classes in a cell, by their character in the text form. X is a bear standing on water
+CELL_CHARS = {".": (), "P": (EntityClass.PENGUIN,), "B": (EntityClass.BEAR,), "W": (EntityClass.WATER,),
+              "X": (EntityClass.BEAR, EntityClass.WATER)}
+CHAR_OF_MASKS = {(False, False, False): ".", (True, False, False): "P", (False, True, False): "B",
+                 (False, False, True): "W", (False, True, True): "X"}
+
+
+def masks_to_text(columns: int, rows: int, water: int, penguins: int, bears: int) -> str:
+    """ Board size and the entity classes in every cell, row by row, e.g. '3x2:P.B/.W.' """
+    grid = []
+    for row in range(rows):
+        line = ""
+        for col in range(columns):
+            cell = row * columns + col
+            line += CHAR_OF_MASKS[(bool(penguins >> cell & 1), bool(bears >> cell & 1), bool(water >> cell & 1))]
+        grid.append(line)
+    return f"{columns}x{rows}:" + "/".join(grid)
+
+
+def board_to_text(board: Board) -> str:
+    position = Position.from_board(board)
+    return masks_to_text(position.columns, position.rows, position.water, position.penguins, position.bears)
+
+
+def masks_from_text(text: str) -> tuple[int, int, int, int, int]:
+    """ The columns, rows and water, penguin and bear masks of a board in the text form of board_to_text(),
+    without building it. Raises ValueError if it is malformed """
+    try:
+        size, grid = text.strip().split(":")
+        columns, rows = (int(x) for x in size.split("x"))
+    except ValueError:
+        raise ValueError(f"Expected a board like '3x2:P.B/.W.', got '{text.strip()}'")
+    lines = grid.split("/")
+    if len(lines) != rows or any(len(line) != columns for line in lines):
+        raise ValueError(f"Board '{text.strip()}' doesn't have {rows} rows of {columns} cells")
+    masks = {entity_class: 0 for entity_class in EntityClass}
+    for cell, char in enumerate("".join(lines)):
+        if char not in CELL_CHARS:
+            raise ValueError(f"Unknown cell '{char}' in board '{text.strip()}'")
+        for entity_class in CELL_CHARS[char]:
+            masks[entity_class] |= 1 << cell
+    return columns, rows, masks[EntityClass.WATER], masks[EntityClass.PENGUIN], masks[EntityClass.BEAR]
+
+
+def masks_to_board(columns: int, rows: int, water: int, penguins: int, bears: int) -> Board:
+    """ The board with entities in the cells of the masks, added cell by cell like board_from_text() does """
+    board = Board(columns=columns, rows=rows)
+    for cell in range(columns * rows):
+        col, row = cell % columns, cell // columns
+        for entity_class, mask in ((EntityClass.PENGUIN, penguins), (EntityClass.BEAR, bears),
+                                   (EntityClass.WATER, water)):
+            if mask >> cell & 1:
+                board.add_new_entity(entity_class, col, row)
+    return board
+
+
+def board_from_text(text: str) -> Board:
+    """ Parses the text form of board_to_text(). Raises ValueError if it is malformed """
+    return masks_to_board(*masks_from_text(text))
+
+
+def position_from_text(text: str) -> Position:
+    """ The position of a board in the text form of board_to_text(), without building the board """
+    return Position.from_masks(*masks_from_text(text))
+
+
+def mask_size(columns: int, rows: int) -> int:
+    """ Bytes taken by a mask of the cells of a board """
+    return (columns * rows + 7) // 8
+
+
+def record_size(columns: int, rows: int) -> int:
+    """ Bytes taken by a board in the binary form, see masks_to_bytes() """
+    return 3 * mask_size(columns, rows)
+
+
+def masks_to_bytes(columns: int, rows: int, water: int, penguins: int, bears: int) -> bytes:
+    """ The binary form of a board: its water, penguin and bear masks, each in mask_size() little-endian bytes.
+    Boards of the same size all take record_size() bytes, and boards with the same entity classes in the same cells
+    have the same bytes, whatever the order of their entities """
+    size = mask_size(columns, rows)
+    return water.to_bytes(size, "little") + penguins.to_bytes(size, "little") + bears.to_bytes(size, "little")
+
+
+def masks_from_bytes(data, columns: int, rows: int, offset: int = 0) -> tuple[int, int, int]:
+    """ The water, penguin and bear masks of the board in the binary form at the offset of data """
+    size = mask_size(columns, rows)
+    return (int.from_bytes(data[offset:offset + size], "little"),
+            int.from_bytes(data[offset + size:offset + 2 * size], "little"),
+            int.from_bytes(data[offset + 2 * size:offset + 3 * size], "little"))
+
+
+def board_to_bytes(board: Board) -> bytes:
+    """ The board size, a byte for the columns and one for the rows, then the binary form of the board """
+    position = Position.from_board(board)
+    if board.columns > 255 or board.rows > 255:
+        raise ValueError(f"Boards of up to 255x255 cells have a binary form, not {board.columns}x{board.rows}")
+    return bytes([board.columns, board.rows]) + masks_to_bytes(board.columns, board.rows, position.water,
+                                                               position.penguins, position.bears)
+
+
+def board_from_bytes(data: bytes) -> Board:
+    """ Parses the form of board_to_bytes(). Raises ValueError if it is malformed """
+    if len(data) < 2 or len(data) != 2 + record_size(data[0], data[1]):
+        raise ValueError(f"Expected the size and masks of a board, got {len(data)} bytes")
+    columns, rows = data[0], data[1]
+    water, penguins, bears = masks_from_bytes(data, columns, rows, offset=2)
+    if (water | penguins | bears) >> (columns * rows) or penguins & (water | bears):
+        raise ValueError(f"Masks of the {columns}x{rows} board have cells outside of it or penguins on other entities")
+    return masks_to_board(columns, rows, water, penguins, bears)
+
+
+def write_boards(path: str, columns: int, rows: int, boards) -> int:
+    """ Writes a board file, see BoardFile, with the boards given as (water, penguins, bears) masks of columns x rows
+    boards, which are written as they are generated. Returns the number of boards """
+    count = 0
+    with open(path, "wb") as file:
+        file.write(BOARD_FILE_HEADER.pack(BOARD_FILE_MAGIC, BOARD_FILE_VERSION, columns, rows, 0))
+        for water, penguins, bears in boards:
+            file.write(masks_to_bytes(columns, rows, water, penguins, bears))
+            count += 1
+        # the count is only known at the end
+        file.seek(0)
+        file.write(BOARD_FILE_HEADER.pack(BOARD_FILE_MAGIC, BOARD_FILE_VERSION, columns, rows, count))
+    return count
+
+
+class BoardFile:
+    """ A file of boards of the same size written by write_boards(), read through mmap, whose boards are only decoded
+    when they are asked for, as masks, positions or text. Raises ValueError if the file isn't a board file of this
+    version, or is truncated """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is empty, not a board file")
+        try:
+            self.read_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def read_header(self):
+        if len(self.data) < BOARD_FILE_HEADER.size or self.data[:len(BOARD_FILE_MAGIC)] != BOARD_FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a board file")
+        _, version, self.columns, self.rows, self.count = BOARD_FILE_HEADER.unpack_from(self.data)
+        if version != BOARD_FILE_VERSION:
+            raise ValueError(f"{self.path} is a board file of version {version}, expected {BOARD_FILE_VERSION}")
+        self.record_size = record_size(self.columns, self.rows)
+        if len(self.data) < BOARD_FILE_HEADER.size + self.count * self.record_size:
+            raise ValueError(f"{self.path} is truncated")
+
+    def __reduce__(self):
+        # unpickled by opening the file again, however many boards it holds
+        return BoardFile, (self.path,)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def masks(self, index: int) -> tuple[int, int, int]:
+        """ The water, penguin and bear masks of the board at the index """
+        if not 0 <= index < self.count:
+            raise IndexError(f"Board {index} of a file of {self.count} boards")
+        return masks_from_bytes(self.data, self.columns, self.rows, BOARD_FILE_HEADER.size + index * self.record_size)
+
+    def __getitem__(self, index: int) -> Position:
+        return Position.from_masks(self.columns, self.rows, *self.masks(index))
+
+    def all_masks(self, start: int = 0, stop: int | None = None):
+        """ Lazily generates the masks of the boards from start to stop, the fastest way to go through the file """
+        stop = self.count if stop is None else min(stop, self.count)
+        size = mask_size(self.columns, self.rows)
+        first = BOARD_FILE_HEADER.size + start * self.record_size
+        end = BOARD_FILE_HEADER.size + stop * self.record_size
+        with memoryview(self.data) as view:
+            if size in STRUCT_CODES:
+                # masks that fit in a machine integer are unpacked by struct, several times faster
+                with view[first:end] as records:
+                    yield from struct.iter_unpack("<" + 3 * STRUCT_CODES[size], records)
+                return
+            from_bytes = int.from_bytes
+            offset = first
+            for _ in range(start, stop):
+                yield (from_bytes(view[offset:offset + size], "little"),
+                       from_bytes(view[offset + size:offset + 2 * size], "little"),
+                       from_bytes(view[offset + 2 * size:offset + self.record_size], "little"))
+                offset += self.record_size
+
+    def __iter__(self):
+        """ Lazily generates the positions of the boards """
+        for masks in self.all_masks():
+            yield Position.from_masks(self.columns, self.rows, *masks)
+
+    def texts(self):
+        """ Lazily generates the text form of the boards """
+        for masks in self.all_masks():
+            yield masks_to_text(self.columns, self.rows, *masks)
+
+    def batch(self, start: int = 0, stop: int | None = None):
+        """ The boards from start to stop as a PositionBatch, decoded at once by NumPy, see Penguins.batch """
+        from Penguins.batch import PositionBatch, numpy, require_numpy  # numpy is only loaded by batches
+        require_numpy()
+        stop = self.count if stop is None else min(stop, self.count)
+        size = mask_size(self.columns, self.rows)
+        records = numpy.frombuffer(self.data, dtype=numpy.uint8, count=(stop - start) * self.record_size,
+                                   offset=BOARD_FILE_HEADER.size + start * self.record_size).reshape(-1, 3, size)
+        water, penguins, bears = (numpy.unpackbits(records[:, plane], axis=1, count=self.columns * self.rows,
+                                                   bitorder="little").astype(bool) for plane in range(3))
+        return PositionBatch(self.columns, self.rows, water, penguins, bears)
+
+
+def is_board_file(path: str) -> bool:
+    """ Whether the file starts like a board file """
+    with open(path, "rb") as file:
+        return file.read(len(BOARD_FILE_MAGIC)) == BOARD_FILE_MAGIC
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Penguins.serialization", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="board file, or file with a board per line in the text form")
+    parser.add_argument("-o", "--output", required=True, help="file to write the converted boards to")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    if is_board_file(args.input):
+        with BoardFile(args.input) as boards, open(args.output, "w") as output:
+            for text in boards.texts():
+                output.write(text + "\n")
+            count = len(boards)
+    else:
+        with open(args.input) as lines:
+            texts = (json.loads(line)["board"] if line.startswith("{") else line
+                     for line in map(str.strip, lines) if line)
+            first = next(texts, None)
+            if first is None:
+                parser.error(f"{args.input} has no boards")
+            try:
+                columns, rows, *_ = masks_from_text(first)
+                boards = (masks_of_size(text, columns, rows) for text in chain([first], texts))
+                count = write_boards(args.output, columns, rows, boards)
+            except ValueError as e:
+                parser.error(str(e))
+    print(f"{count} boards in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+def masks_of_size(text: str, columns: int, rows: int) -> tuple[int, int, int]:
+    """ The water, penguin and bear masks of a board in the text form, which must be columns x rows """
+    board_columns, board_rows, water, penguins, bears = masks_from_text(text)
+    if (board_columns, board_rows) != (columns, rows):
+        raise ValueError(f"A board file holds boards of a single size, got {board_columns}x{board_rows} after "
+                         f"{columns}x{rows}")
+    return water, penguins, bears
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+""" Solves boards for asyncio code, on a process pool, with a small HTTP server in front of it.
+
+    python -m Penguins.service --port 8080 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from Penguins.direction import DIRECTIONS, Direction
+from Penguins.position import Position
+from Penguins.search import ENGINES
+from Penguins.serialization import board_from_text
+from Penguins.solution_cache import canonical_form
+from Penguins.solve import solve_board_text
+from Penguins.symmetry import Symmetry
+
+
+def orient(result: dict, symmetry: Symmetry, columns: int) -> dict:
+    """ Maps the moves of a result for the canonical form of a board back to the board itself """
+    result = dict(result)
+    if "moves" in result:
+        moves = []
+        for col, row, direction_name in result["moves"]:
+            cell = symmetry.cells.index(row * columns + col)
+            direction = symmetry.unmap_direction(DIRECTIONS.index(Direction[direction_name]))
+            moves.append([cell % columns, cell // columns, DIRECTIONS[direction].name])
+        result["moves"] = moves
+    return result
+
+
+class SolverService:
+    """ Solves boards on a pool of worker processes, at most max_searches at once. Concurrent requests for the same
+    board, or for its rotations and reflections, share a single search """
+
+    def __init__(self, workers: int | None = None, max_searches: int | None = None, engine: str = "idastar",
+                 symmetry: bool = False, search_timeout: float | None = None):
+        workers = workers or os.cpu_count()
+        # forked workers would inherit the sockets of the open connections, and keep them open after they're closed
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+        self.search_slots = asyncio.Semaphore(max_searches or workers)
+        self.engine = engine
+        self.symmetry = symmetry
+        self.search_timeout = search_timeout
+        self.searches = dict()
+        self.searches_started = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def solve(self, text: str, timeout: float | None = None) -> dict:
+        """ The result of the board in text form, see Penguins.solve.
+        Raises ValueError if the board is malformed and asyncio.TimeoutError if there is no result within timeout seconds.
+        The search goes on for the other requests of the same board """
+        board = board_from_text(text)
+        form, symmetry = canonical_form(Position.from_board(board))
+        search = self.searches.get(form)
+        if search is None:
+            search = asyncio.ensure_future(self.search(form))
+            self.searches[form] = search
+            search.add_done_callback(lambda _: self.searches.pop(form, None))
+        # shielded, so a request that gives up doesn't cancel the search of the others
+        result = await asyncio.wait_for(asyncio.shield(search), timeout)
+        return orient(result, symmetry, board.columns) | {"board": text}
+
+    async def search(self, form: str) -> dict:
+        async with self.search_slots:
+            self.searches_started += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, solve_board_text, form, self.engine,
+                                              self.search_timeout, self.symmetry)
+
+
+async def handle_http(service: SolverService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """ Serves a single request and closes the connection """
+    status, result = 200, None
+    try:
+        method, path, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+        headers = dict()
+        while (line := (await reader.readline()).decode("latin-1").strip()) != "":
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if method != "POST" or path != "/solve":
+            status, result = 404, {"error": "Expected POST /solve"}
+        else:
+            request = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+            result = await service.solve(request["board"], request.get("timeout"))
+    except (ValueError, KeyError, TypeError) as e:
+        status, result = 400, {"error": str(e)}
+    except asyncio.TimeoutError:
+        status, result = 504, {"error": "No result within the timeout"}
+    body = json.dumps(result).encode()
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 504: "Gateway Timeout"}[status]
+    writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+async def serve(service: SolverService, host: str, port: int) -> asyncio.Server:
+    return await asyncio.start_server(lambda reader, writer: handle_http(service, reader, writer), host, port)
+
+
+async def run_server(args):
+    async with SolverService(args.workers, args.max_searches, args.engine, args.symmetry, args.search_timeout) as service:
+        server = await serve(service, args.host, args.port)
+        print(f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Penguins.service", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--max-searches", type=int, default=None, help="searches running at once (default: workers)")
+    parser.add_argument("--search-timeout", type=float, default=None, help="seconds to spend on each board")
+    parser.add_argument("--engine", choices=ENGINES, default="idastar")
+    parser.add_argument("--symmetry", action="store_true", help="use the symmetry-reduced search")
+    asyncio.run(run_server(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
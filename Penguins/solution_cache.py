@@ -0,0 +1,98 @@
+import json
+import sqlite3
+
+from Penguins.board import Board
+from Penguins.direction import DIRECTIONS, Direction
+from Penguins.position import Position, decode_move, encode_move
+from Penguins.serialization import masks_to_text
+from Penguins.symmetry import Symmetry, get_symmetries
+
+
+def canonical_form(position: Position) -> tuple[str, Symmetry]:
+    """ The encoding shared by the position and all its rotations and reflections,
+    and the symmetry that maps the position to that encoding """
+    forms = []
+    for s in get_symmetries(position.columns, position.rows):
+        masks = (s.apply(position.water), s.apply(position.penguins), s.apply(position.bears))
+        forms.append((masks_to_text(position.columns, position.rows, *masks), s))
+    return min(forms, key=lambda form: form[0])
+
+
+class SolutionCache:
+    """ Shortest solutions of boards that were already solved, kept in an SQLite database.
+    Boards are keyed by their canonical encoding, so a rotated or reflected board is found as well.
+    Holds up to max_entries boards, evicting the least recently used ones. Uses are written on the next put or close """
+
+    def __init__(self, path: str = ":memory:", max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                "(board TEXT PRIMARY KEY, length INTEGER, moves TEXT NOT NULL, last_used INTEGER NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_by_last_used ON solutions (last_used)")
+        self.connection.commit()
+        self.clock = self.connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM solutions").fetchone()[0]
+        # last use of the boards found since the last write, which only the evictions need
+        self.pending_uses = {}
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def close(self):
+        self.write_pending_uses()
+        self.connection.commit()
+        self.connection.close()
+
+    def write_pending_uses(self):
+        self.connection.executemany("UPDATE solutions SET last_used = ? WHERE board = ?",
+                                    [(tick, form) for form, tick in self.pending_uses.items()])
+        self.pending_uses.clear()
+
+    def tick(self) -> int:
+        self.clock += 1
+        return self.clock
+
+    def get(self, board: Board) -> list[int] | None:
+        """ The cached solution, as moves encoded by encode_move() for the pieces of Position.from_board(board).
+        An empty list if the board is known to have no solution, None if it isn't cached """
+        position = Position.from_board(board)
+        form, symmetry = canonical_form(position)
+        entry = self.connection.execute("SELECT length, moves FROM solutions WHERE board = ?", (form,)).fetchone()
+        if entry is None:
+            return None
+        self.pending_uses[form] = self.tick()
+        length, moves = entry
+        if length is None:
+            return []
+        solution = []
+        for col, row, direction_name in json.loads(moves):
+            # stored moves are in the orientation of the canonical form, map them back to this board
+            cell = symmetry.cells.index(row * position.columns + col)
+            direction = symmetry.unmap_direction(DIRECTIONS.index(Direction[direction_name]))
+            piece = position.piece_at(cell)
+            if piece is None or position.destination(piece, direction) is None:
+                return None  # doesn't fit the board, e.g. written by an incompatible version
+            move = encode_move(piece, direction)
+            position.make(move)
+            solution.append(move)
+        return solution if position.is_won() else None
+
+    def put(self, board: Board, solution: list[int]):
+        """ Stores the shortest solution of the board, or an empty list if it has none """
+        position = Position.from_board(board)
+        form, symmetry = canonical_form(position)
+        length = len(solution) if solution or position.is_won() else None
+        moves = []
+        for move in solution:
+            piece, direction = decode_move(move)
+            row, col = divmod(symmetry.cells[position.pieces[piece]], position.columns)
+            moves.append([col, row, DIRECTIONS[symmetry.map_direction(direction)].name])
+            position.make(move)
+        self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                (form, length, json.dumps(moves), self.tick()))
+        self.pending_uses.pop(form, None)
+        self.write_pending_uses()
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute("DELETE FROM solutions WHERE board IN "
+                                    "(SELECT board FROM solutions ORDER BY last_used LIMIT ?)", (excess,))
+        self.connection.commit()
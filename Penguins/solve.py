@@ -0,0 +1,138 @@
+""" Solves a batch of boards on several processes, writing a JSON line per board as soon as it is solved.
+
+    python -m Penguins.solve boards.txt -o solutions.jsonl --workers 8 --timeout 60
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+from Penguins.endgame import EndgameTable
+from Penguins.game import ENGINES, Game
+from Penguins.search import SolveTimeout
+from Penguins.serialization import BoardFile, board_from_text, is_board_file
+
+
+def parse_line(line: str, line_number: int) -> tuple[str, str]:
+    """ The id and the board text of an input line """
+    line = line.strip()
+    if line.startswith("{"):
+        entry = json.loads(line)
+        return str(entry.get("id", line_number)), entry["board"]
+    return str(line_number), line
+
+
+@lru_cache(maxsize=None)
+def open_endgame(path: str) -> EndgameTable:
+    """ The endgame table in the file, mapped once per process. Its checksum was verified by main() """
+    return EndgameTable(path, verify=False)
+
+
+def solve_board_text(text: str, engine: str, timeout: float | None, symmetry: bool, endgame: str | None = None) -> dict:
+    """ Solves a board in text form, with the endgame table in the file if given.
+    Returns the result as written to the output, without the id """
+    result = {"board": text}
+    start = time.perf_counter()
+    try:
+        board = board_from_text(text)
+        game = Game(board, endgame=open_endgame(endgame) if endgame is not None else None)
+        solution = game.solve(engine=engine, symmetry=symmetry, timeout=timeout)
+        if solution or game.is_won():
+            result["status"] = "solved"
+            result["length"] = len(solution)
+            result["moves"] = []
+            for move in solution:
+                location = board.get_entity_location(move.entity)
+                result["moves"].append([location.col, location.row, move.direction.name])
+                board.apply_move(move.entity, move.direction)
+        else:
+            result["status"] = "unsolvable"
+    except SolveTimeout:
+        result["status"] = "timeout"
+    except ValueError as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def solve_line(line: str, line_number: int, engine: str, timeout: float | None, symmetry: bool,
+               endgame: str | None = None) -> dict:
+    try:
+        board_id, text = parse_line(line, line_number)
+    except (ValueError, KeyError) as e:
+        return {"id": str(line_number), "status": "error", "error": str(e), "seconds": 0.0}
+    return {"id": board_id} | solve_board_text(text, engine, timeout, symmetry, endgame)
+
+
+def solve_all(lines, output, workers: int, engine: str, timeout: float | None, symmetry: bool,
+              endgame: str | None = None) -> dict:
+    """ Solves the boards of the input lines and writes the results as they finish. Returns the count of each status """
+    counts = dict()
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            # keep a bounded number of boards in flight, so huge inputs aren't read into memory at once
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_results(done, output, counts)
+            pending.add(executor.submit(solve_line, line, line_number, engine, timeout, symmetry, endgame))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            write_results(done, output, counts)
+    return counts
+
+
+def write_results(futures, output, counts: dict):
+    for future in futures:
+        result = future.result()
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        output.write(json.dumps(result) + "\n")
+    output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Penguins.solve", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="file with a board per line, - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="file to write the results to, - for stdout (default)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes (default: all cores)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds to spend on each board (default: no limit)")
+    parser.add_argument("--engine", choices=ENGINES, default="bfs")
+    parser.add_argument("--symmetry", action="store_true", help="use the symmetry-reduced search")
+    parser.add_argument("--endgame", default=None, help="endgame table file, see Penguins.endgame")
+    args = parser.parse_args(argv)
+    if args.endgame is not None:
+        try:
+            EndgameTable(args.endgame).close()
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    if args.input == "-":
+        source = lines = sys.stdin
+    elif is_board_file(args.input):
+        source = BoardFile(args.input)
+        lines = source.texts()
+    else:
+        source = lines = open(args.input)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    try:
+        counts = solve_all(lines, output, args.workers, args.engine, args.timeout, args.symmetry, args.endgame)
+    finally:
+        if lines is not source:
+            lines.close()  # the boards still being read hold the mapping of the board file
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{sum(counts.values())} boards in {time.perf_counter() - start:.1f} s: {summary}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+from Penguins.endgame import UNSOLVABLE, EndgameSection
+from Penguins.position import Position, decode_move, encode_move
+
+
+class KnownDistances:
+    """ The moves left of the positions of a board, looked up in the positions solved before, then in the endgame
+    table if there is one. Searches probe it like an EndgameSection """
+
+    def __init__(self, known: dict, fallback: EndgameSection | None):
+        self.known = known
+        self.fallback = fallback
+
+    def distance(self, penguins: int, bears: int) -> int | None:
+        """ Moves left to win from the position, UNSOLVABLE if it has no solution, or None if it isn't known """
+        if not penguins:
+            return 0
+        distance = self.known.get((penguins, bears))
+        if distance is None and self.fallback is not None:
+            return self.fallback.distance(penguins, bears)
+        return distance
+
+
+def replay(position: Position, line: list[tuple[int, int, int]]) -> list[int] | None:
+    """ The moves of a line of (cell, direction, destination) slides on the position, which is left as it was,
+    if they win it. None if a slide can't be made or stops elsewhere, i.e. an edited cell gets in its way """
+    moves = []
+    for cell, direction, destination in line:
+        piece = position.piece_at(cell)
+        if piece is None or position.destination(piece, direction) != destination:
+            break
+        moves.append(encode_move(piece, direction))
+        position.make(moves[-1])
+    won = len(moves) == len(line) and position.is_won()
+    for _ in moves:
+        position.unmake()
+    return moves if won else None
+
+
+class SolvedPositions:
+    """ What the searches of a game proved about the positions they reached: the moves left of the positions on their
+    shortest solutions, the fewest moves left of the others, and the solutions, replayed on edited boards.
+    Positions are keyed by their board size, water, penguins and bears, so what is known of them survives edits """
+
+    def __init__(self):
+        # (columns, rows, water): {(penguins, bears): moves left or UNSOLVABLE}
+        self.boards = {}
+        # (columns, rows, water): {(penguins, bears): fewest moves left}
+        self.lower_bounds = {}
+        # (columns, rows): {(water, penguins, bears): shortest solution as (cell, direction, destination) slides}
+        self.solutions = {}
+
+    def __len__(self):
+        return sum(len(known) for known in self.boards.values()) + sum(map(len, self.lower_bounds.values()))
+
+    def known(self, position: Position) -> dict:
+        return self.boards.setdefault((position.columns, position.rows, position.water), {})
+
+    def learn(self, position: Position, solution: list[int], reached: dict | None = None):
+        """ Keeps a shortest solution of the position, which is left as it was.
+        reached has the positions its search reached, by key, with the fewest moves it took to reach them """
+        known = self.known(position)
+        line = []
+        for moves_made, move in enumerate(solution):
+            known[position.key()] = len(solution) - moves_made
+            piece, direction = decode_move(move)
+            line.append((position.pieces[piece], direction, position.destination(piece, direction)))
+            position.make(move)
+        for _ in solution:
+            position.unmake()
+        self.solutions.setdefault((position.columns, position.rows), {})[(position.water, *position.key())] = line
+        lower_bounds = self.lower_bounds.setdefault((position.columns, position.rows, position.water), {})
+        for key, moves_made in (reached or {}).items():
+            # a move is left of any position that isn't won, so only the bounds above 1 tell something
+            if len(solution) - moves_made > max(1, lower_bounds.get(key, 0)) and key not in known:
+                lower_bounds[key] = len(solution) - moves_made
+
+    def learn_unsolvable(self, position: Position, reached: dict | None = None):
+        """ Keeps the position as having no solution, and so every position its search reached """
+        known = self.known(position)
+        known[position.key()] = UNSOLVABLE
+        known.update(dict.fromkeys(reached or {}, UNSOLVABLE))
+
+    def section_for(self, position: Position, fallback: EndgameSection | None = None) -> KnownDistances | None:
+        """ What is known of the positions of the board, or just the fallback if nothing is """
+        known = self.boards.get((position.columns, position.rows, position.water))
+        if not known:
+            return fallback
+        return KnownDistances(known, fallback)
+
+    def lower_bounds_for(self, position: Position) -> dict | None:
+        """ The fewest moves left of the positions of the board, by key, or None if none is known """
+        return self.lower_bounds.get((position.columns, position.rows, position.water)) or None
+
+    def solution_for(self, position: Position) -> list[int] | None:
+        """ The shortest of the solutions found before that still solve the position, e.g. after a bear was added out
+        of their way, which isn't necessarily a shortest one of the position. None if none does """
+        best = None
+        for line in self.solutions.get((position.columns, position.rows), {}).values():
+            if best is None or len(line) < len(best):
+                best = replay(position, line) or best
+        return best
@@ -0,0 +1,80 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SearchStats:
+    """ What a search did, kept in Search.stats and Game.stats.
+    Plies are counted from the position the game was solved from """
+    expanded: int = 0
+    # positions expanded by searching backward from the winning positions, also counted in expanded but not per ply
+    expanded_backward: int = 0
+    # positions reached again at the same depth or deeper, which weren't searched again
+    transposition_hits: int = 0
+    # positions that weren't expanded since they can't lead to a solution shorter than the one already found
+    bound_prunes: int = 0
+    # positions that weren't expanded since they can't be solved within the depth limit of the iteration or max_depth
+    depth_limit_prunes: int = 0
+    # positions that weren't expanded since they were proven to have no solution, see BoardAnalysis.is_dead()
+    dead_position_prunes: int = 0
+    # positions whose moves left were read from the endgame table or the positions solved before instead of searched
+    endgame_hits: int = 0
+    # depth limits searched by iterative deepening, all in the "deepening" phase
+    iterations: int = 0
+    generated_per_ply: list[int] = field(default_factory=lambda: [0])
+    expanded_per_ply: list[int] = field(default_factory=lambda: [0])
+    # wall time of the phases of the search, which may be nested, e.g. the levels of breadth-first search
+    phase_seconds: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def generated(self) -> int:
+        """ Positions reached by a move, including the ones that weren't searched """
+        return sum(self.generated_per_ply)
+
+    @property
+    def max_depth(self) -> int:
+        """ The deepest ply reached """
+        return max((ply for ply, count in enumerate(self.generated_per_ply) if count), default=0)
+
+    def branching_factors(self) -> list[float]:
+        """ Average number of moves of the positions expanded at every ply """
+        return [self.generated_per_ply[ply + 1] / expanded if expanded else 0.0
+                for ply, expanded in enumerate(self.expanded_per_ply[:-1])]
+
+    def add_ply(self):
+        self.generated_per_ply.append(0)
+        self.expanded_per_ply.append(0)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def merge(self, other: 'SearchStats'):
+        """ Adds the counts of another search, e.g. one of a parallel search's workers """
+        self.expanded += other.expanded
+        self.expanded_backward += other.expanded_backward
+        self.transposition_hits += other.transposition_hits
+        self.bound_prunes += other.bound_prunes
+        self.depth_limit_prunes += other.depth_limit_prunes
+        self.dead_position_prunes += other.dead_position_prunes
+        self.endgame_hits += other.endgame_hits
+        self.iterations += other.iterations
+        while len(self.expanded_per_ply) < len(other.expanded_per_ply):
+            self.add_ply()
+        for ply in range(len(other.expanded_per_ply)):
+            self.generated_per_ply[ply] += other.generated_per_ply[ply]
+            self.expanded_per_ply[ply] += other.expanded_per_ply[ply]
+        for name, seconds in other.phase_seconds.items():
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {"generated": self.generated, "expanded": self.expanded, "expanded_backward": self.expanded_backward,
+                "transposition_hits": self.transposition_hits, "bound_prunes": self.bound_prunes,
+                "depth_limit_prunes": self.depth_limit_prunes, "dead_position_prunes": self.dead_position_prunes,
+                "endgame_hits": self.endgame_hits, "iterations": self.iterations, "max_depth": self.max_depth,
+                "branching_factors": self.branching_factors(), "phase_seconds": dict(self.phase_seconds)}
@@ -0,0 +1,90 @@
+from functools import lru_cache
+
+from Penguins.direction import DIRECTIONS
+from Penguins.geometry import OFFSETS, get_geometry
+from Penguins.position import Position
+
+
+class Symmetry:
+    """ A rotation or reflection of a board, as a permutation of its cells and of the directions.
+    Sliding a piece commutes with it, so a position and its image have solutions of the same length """
+
+    def __init__(self, name: str, columns: int, rows: int, transform):
+        self.name = name
+        geometry = get_geometry(columns, rows)
+        self.cells = tuple(geometry.cell(*transform(col, row)) for col, row in geometry.locations)
+        direction_of_offset = {OFFSETS[d]: i for i, d in enumerate(DIRECTIONS)}
+        origin_x, origin_y = transform(0, 0)
+        image_offsets = (transform(*OFFSETS[d]) for d in DIRECTIONS)
+        self.directions = tuple(direction_of_offset[(x - origin_x, y - origin_y)] for x, y in image_offsets)
+        # byte_tables[i][b] is the image of the mask b << (8 * i), so a mask is mapped with one lookup per byte
+        self.byte_tables = []
+        for first_cell in range(0, geometry.cell_count, 8):
+            table = []
+            for b in range(256):
+                mask = 0
+                for bit in range(8):
+                    if b >> bit & 1 and first_cell + bit < geometry.cell_count:
+                        mask |= 1 << self.cells[first_cell + bit]
+                table.append(mask)
+            self.byte_tables.append(tuple(table))
+
+    def __repr__(self):
+        return f"Symmetry({self.name})"
+
+    def apply(self, mask: int) -> int:
+        image = 0
+        for table in self.byte_tables:
+            if not mask:
+                break  # pieces are sparse on large boards, the high bytes are often empty
+            image |= table[mask & 0xFF]
+            mask >>= 8
+        return image
+
+    def map_direction(self, direction: int) -> int:
+        """ The image of DIRECTIONS[direction], as a direction index """
+        return self.directions[direction]
+
+    def unmap_direction(self, direction: int) -> int:
+        """ The direction index whose image is DIRECTIONS[direction] """
+        return self.directions.index(direction)
+
+
+@lru_cache(maxsize=None)
+def get_symmetries(columns: int, rows: int) -> tuple[Symmetry, ...]:
+    """ The rotations and reflections that map a columns x rows board onto itself, identity first.
+    All 8 of the dihedral group for square boards, 4 for other rectangles """
+    last_col, last_row = columns - 1, rows - 1
+    transforms = {
+        "identity": lambda c, r: (c, r),
+        "flip left-right": lambda c, r: (last_col - c, r),
+        "flip up-down": lambda c, r: (c, last_row - r),
+        "rotate 180": lambda c, r: (last_col - c, last_row - r),
+    }
+    if columns == rows:
+        transforms.update({
+            "rotate 90": lambda c, r: (last_row - r, c),
+            "rotate 270": lambda c, r: (r, last_col - c),
+            "transpose": lambda c, r: (r, c),
+            "anti-transpose": lambda c, r: (last_row - r, last_col - c),
+        })
+    return tuple(Symmetry(name, columns, rows, transform) for name, transform in transforms.items())
+
+
+class CanonicalKey:
+    """ Key of a position that is shared by all of its rotations and reflections.
+    Only the symmetries that keep the water in place are used, since water never moves during a search """
+
+    def __init__(self, position: Position):
+        self.position = position
+        self.symmetries = [s for s in get_symmetries(position.columns, position.rows)[1:]
+                           if s.apply(position.water) == position.water]
+
+    def __call__(self) -> tuple[int, int]:
+        penguins, bears = self.position.penguins, self.position.bears
+        key = (penguins, bears)
+        for s in self.symmetries:
+            image = (s.apply(penguins), s.apply(bears))
+            if image < key:
+                key = image
+        return key
@@ -1,9 +1,19 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
 import unittest
 
 from Penguins.board import Board
 from Penguins.entity import EntityClass
 from Penguins.direction import Direction
-from Penguins.game import Game
+from Penguins.endgame import main as endgame_main
+from Penguins.game import Game, ImprovedSolution, Progress, SearchFinished
+from Penguins.generate import main as generate_main
+from Penguins.serialization import board_from_text, board_to_text, main as serialization_main
+from Penguins.service import SolverService, serve
+from Penguins.solve import main as solve_main
 
 
 class EndToEndTests(unittest.TestCase):
@@ -45,6 +55,21 @@ class EndToEndTests(unittest.TestCase):
         self.assertEqual(Direction.RIGHT, solution[1].direction)
         self.assertEqual(p1, solution[1].entity)
 
+    def test_BothSymmetricSolutionsAreCountedAndListed(self):
+        board = board_from_text("3x3:..B/PW./..B")
+        game = Game(board)
+        count = game.count_shortest_solutions()
+        self.assertEqual((2, 2, False), (count.length, count.count, count.unique))
+        solutions = list(game.shortest_solutions())
+        self.assertEqual({Direction.UP, Direction.DOWN}, {solution[0].direction for solution in solutions})
+        for solution in solutions:
+            self.assertEqual(EntityClass.BEAR, solution[0].entity.entity_class)
+            self.assertEqual(Direction.RIGHT, solution[1].direction)
+            self.assertEqual(EntityClass.PENGUIN, solution[1].entity.entity_class)
+        unique = Game(board_from_text("5x5:.P.B./B.B../..W../B...B/.B...")).count_shortest_solutions()
+        self.assertEqual((4, 1, True), (unique.length, unique.count, unique.unique))
+        self.assertEqual(0, Game(board_from_text("5x5:B.P../B..../..B../...W./B..BB")).count_shortest_solutions().count)
+
     def test_FindSolutionWhenManyMovesAreNeeded(self):
         board = Board(5, 5)
         board.add_new_entity(EntityClass.PENGUIN, 0, 2)
@@ -101,3 +126,231 @@ class EndToEndTests(unittest.TestCase):
         solution = game.solve()
         self.assertNotEqual([], solution)
         self.assertEqual(4, len(solution))
+
+    def test_AllEnginesFindTheShortestSolution(self):
+        for engine in ["dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"]:
+            board = Board(5, 5)
+            board.add_new_entity(EntityClass.WATER, 2, 2)
+            board.add_new_entity(EntityClass.PENGUIN, 1, 0)
+            board.add_new_entity(EntityClass.BEAR, 0, 1)
+            board.add_new_entity(EntityClass.BEAR, 0, 3)
+            board.add_new_entity(EntityClass.BEAR, 1, 4)
+            board.add_new_entity(EntityClass.BEAR, 2, 1)
+            board.add_new_entity(EntityClass.BEAR, 3, 0)
+            board.add_new_entity(EntityClass.BEAR, 4, 3)
+            board_before_solve = board_to_text(board)
+            game = Game(board)
+            solution = game.solve(engine=engine)
+            self.assertEqual(4, len(solution), engine)
+            self.assertEqual(board_before_solve, board_to_text(board), engine)
+            for move in solution:
+                self.assertTrue(game.entity_move_is_legal(move.entity, move.direction), engine)
+                board.apply_move(move.entity, move.direction)
+            self.assertTrue(game.is_won(), engine)
+
+    def test_ParallelSearchFindsTheShortestSolution(self):
+        for engine in ["dfs", "iddfs", "idastar"]:
+            for symmetry in [False, True]:
+                board = board_from_text("5x5:.P.B./B.B../..W../B...B/.B...")
+                game = Game(board)
+                solution = game.solve(engine=engine, symmetry=symmetry, workers=2)
+                self.assertEqual(4, len(solution), engine)
+                for move in solution:
+                    self.assertTrue(game.entity_move_is_legal(move.entity, move.direction), engine)
+                    board.apply_move(move.entity, move.direction)
+                self.assertTrue(game.is_won(), engine)
+
+    def test_SolveIterReportsImprovingSolutionsAndFinishesWithTheShortest(self):
+        board = board_from_text("5x5:P.B../B..../P.W../B..B./B....")
+        game = Game(board)
+        events = list(game.solve_iter(engine="dfs"))
+        self.assertIsInstance(events[-1], SearchFinished)
+        self.assertEqual(9, len(events[-1].solution))
+        self.assertEqual(events[-1].solution, game.shortest_solution)
+        lengths = [len(e.solution) for e in events if isinstance(e, ImprovedSolution)]
+        self.assertEqual(9, lengths[-1])
+        self.assertEqual(sorted(lengths, reverse=True), lengths)
+        self.assertTrue(any(isinstance(e, Progress) for e in events))
+
+    def test_ClosingSolveIterCancelsTheSearch(self):
+        board = board_from_text("5x5:B.P../B..../..B../...W./B..BB")
+        events = Game(board).solve_iter(engine="dfs")
+        self.assertIsInstance(next(events), Progress)
+        events.close()
+        self.assertNotIn("Penguins search", [thread.name for thread in threading.enumerate()])
+
+    def test_EnginesReturnEmptySolutionWhenThereIsNone(self):
+        for engine in ["dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"]:
+            # a penguin can't dive into a water at the edge of the board, since there is nothing to stop it there
+            board = Board(columns=4, rows=1)
+            board.add_new_entity(EntityClass.PENGUIN, 1, 0)
+            board.add_new_entity(EntityClass.BEAR, 3, 0)
+            board.add_new_entity(EntityClass.WATER, 0, 0)
+            game = Game(board)
+            self.assertEqual([], game.solve(engine=engine), engine)
+
+    def test_ParallelSearchReturnsEmptySolutionWhenThereIsNone(self):
+        for engine in ["dfs", "iddfs", "idastar"]:
+            game = Game(board_from_text("4x1:WP.B"))
+            self.assertEqual([], game.solve(engine=engine, workers=2), engine)
+
+    def test_ParallelSearchDoesNotFindSolutionsLongerThanMaxDepth(self):
+        for engine in ["iddfs", "idastar"]:
+            game = Game(board_from_text("5x5:.P.B./B.B../..W../B...B/.B..."))
+            self.assertEqual([], game.solve(engine=engine, max_depth=3, workers=2), engine)
+            self.assertEqual(4, len(game.solve(engine=engine, max_depth=4, workers=2)), engine)
+
+    def test_EnginesDoNotFindSolutionsLongerThanMaxDepth(self):
+        for engine in ["bfs", "iddfs", "astar", "idastar", "bidirectional"]:
+            board = Board(5, 5)
+            board.add_new_entity(EntityClass.WATER, 2, 2)
+            board.add_new_entity(EntityClass.PENGUIN, 1, 0)
+            board.add_new_entity(EntityClass.BEAR, 0, 1)
+            board.add_new_entity(EntityClass.BEAR, 0, 3)
+            board.add_new_entity(EntityClass.BEAR, 1, 4)
+            board.add_new_entity(EntityClass.BEAR, 2, 1)
+            board.add_new_entity(EntityClass.BEAR, 3, 0)
+            board.add_new_entity(EntityClass.BEAR, 4, 3)
+            game = Game(board)
+            self.assertEqual([], game.solve(engine=engine, max_depth=3), engine)
+            self.assertEqual(4, len(game.solve(engine=engine, max_depth=4)), engine)
+
+    def test_SymmetricSearchFindsTheShortestSolution(self):
+        for engine in ["dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"]:
+            board = Board(5, 5)
+            board.add_new_entity(EntityClass.WATER, 2, 2)
+            # symmetric under a 180 degrees rotation
+            board.add_new_entity(EntityClass.PENGUIN, 3, 0)
+            board.add_new_entity(EntityClass.PENGUIN, 1, 4)
+            board.add_new_entity(EntityClass.BEAR, 3, 3)
+            board.add_new_entity(EntityClass.BEAR, 1, 1)
+            board.add_new_entity(EntityClass.BEAR, 4, 3)
+            board.add_new_entity(EntityClass.BEAR, 0, 1)
+            game = Game(board)
+            expected_length = len(game.solve(engine="bfs"))
+            solution = game.solve(engine=engine, symmetry=True)
+            self.assertEqual(expected_length, len(solution), engine)
+            for move in solution:
+                self.assertTrue(game.entity_move_is_legal(move.entity, move.direction), engine)
+                board.apply_move(move.entity, move.direction)
+            self.assertTrue(game.is_won(), engine)
+
+    def test_BatchSolveWritesAResultForEveryBoard(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path, output_path = os.path.join(directory, "boards.txt"), os.path.join(directory, "solutions.jsonl")
+            with open(input_path, "w") as f:
+                f.write("3x1:PWB\n")
+                f.write(json.dumps({"id": "two-moves", "board": "3x3:..B/PW./..B"}) + "\n")
+                f.write("4x1:WP.B\n")
+                f.write("\n")
+                f.write("5x5:B.P../B..../..B../...W./B..BB\n")
+                f.write("3x1:PW\n")
+            solve_main([input_path, "-o", output_path, "--workers", "2", "--timeout", "0"])
+            with open(output_path) as f:
+                results = {r["id"]: r for r in map(json.loads, f)}
+        self.assertEqual({"1", "two-moves", "3", "5", "6"}, set(results))
+        self.assertEqual(["solved", 1, [[0, 0, "RIGHT"]]], [results["1"][k] for k in ("status", "length", "moves")])
+        self.assertEqual("unsolvable", results["3"]["status"])
+        self.assertEqual("timeout", results["5"]["status"])
+        self.assertEqual("error", results["6"]["status"])
+        # the moves are replayed from the entity locations on a fresh board
+        solved = results["two-moves"]
+        self.assertEqual("solved", solved["status"])
+        board = board_from_text(solved["board"])
+        game = Game(board)
+        for col, row, direction in solved["moves"]:
+            entity = next(e for e in board.get_entities_in_location(col, row) if e.entity_class != EntityClass.WATER)
+            self.assertTrue(game.entity_move_is_legal(entity, Direction[direction]))
+            board.apply_move(entity, Direction[direction])
+        self.assertTrue(game.is_won())
+
+    def test_BatchSolveLooksUpTheEndgameTableBuiltForTheBoardSize(self):
+        with tempfile.TemporaryDirectory() as directory:
+            table_path = os.path.join(directory, "endgame-4x4.bin")
+            input_path, output_path = os.path.join(directory, "boards.txt"), os.path.join(directory, "solutions.jsonl")
+            endgame_main(["4x4", "-o", table_path, "--max-pieces", "4", "--water", "1,1", "--water", "2,1"])
+            with open(input_path, "w") as f:
+                f.write("4x4:.B../.W../.P../P.PB\n")
+                f.write("4x4:..P./PP.B/..W./..B.\n")
+            solve_main([input_path, "-o", output_path, "--workers", "2", "--engine", "idastar", "--endgame", table_path])
+            with open(output_path) as f:
+                results = {r["id"]: r for r in map(json.loads, f)}
+        self.assertEqual([6, 5], [results[board_id]["length"] for board_id in ("1", "2")])
+
+    def test_BatchSolveReadsTheBoardsOfABoardFile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            text_path, board_path = os.path.join(directory, "boards.txt"), os.path.join(directory, "boards.bin")
+            output_path = os.path.join(directory, "solutions.jsonl")
+            with open(text_path, "w") as f:
+                f.write("5x5:.P.B./B.B../..W../B...B/.B...\n")
+                f.write('{"id": "x", "board": "5x5:P.B../B..../P.W../B..B./B...."}\n')
+            serialization_main([text_path, "-o", board_path])
+            solve_main([board_path, "-o", output_path, "--workers", "2"])
+            with open(output_path) as f:
+                results = {r["id"]: r for r in map(json.loads, f)}
+        self.assertEqual([4, 9], [results[board_id]["length"] for board_id in ("1", "2")])
+
+    def test_GeneratedPuzzlesHaveASingleShortestSolutionOfTheRequestedLength(self):
+        for method in ["backward", "random"]:
+            with tempfile.TemporaryDirectory() as directory:
+                output_path = os.path.join(directory, "puzzles.jsonl")
+                generate_main(["-o", output_path, "--count", "5", "--length", "4-6", "--unique", "--method", method,
+                               "--workers", "2", "--seed", "21"])
+                with open(output_path) as f:
+                    puzzles = [json.loads(line) for line in f]
+            self.assertEqual(["1", "2", "3", "4", "5"], [puzzle["id"] for puzzle in puzzles])
+            for puzzle in puzzles:
+                solution = Game(board_from_text(puzzle["board"])).solve(engine="bfs")
+                self.assertEqual(puzzle["length"], len(solution), msg=puzzle["board"])
+                self.assertIn(len(solution), range(4, 7))
+
+
+class SolverServiceTests(unittest.IsolatedAsyncioTestCase):
+    def assertSolves(self, result: dict):
+        self.assertEqual("solved", result["status"])
+        board = board_from_text(result["board"])
+        game = Game(board)
+        for col, row, direction in result["moves"]:
+            entity = next(e for e in board.get_entities_in_location(col, row) if e.entity_class != EntityClass.WATER)
+            self.assertTrue(game.entity_move_is_legal(entity, Direction[direction]))
+            board.apply_move(entity, Direction[direction])
+        self.assertTrue(game.is_won())
+
+    async def test_ConcurrentRequestsForTheSameBoardShareASearch(self):
+        async with SolverService(workers=2) as service:
+            # the same board, and the board flipped left-right
+            boards = ["5x5:P.B../B..../P.W../B..B./B...."] * 3 + ["5x5:..B.P/....B/..W.P/.B..B/....B"] * 2
+            results = await asyncio.gather(*(service.solve(board) for board in boards))
+        self.assertEqual(1, service.searches_started)
+        for board, result in zip(boards, results):
+            self.assertEqual(board, result["board"])
+            self.assertEqual(9, result["length"])
+            self.assertSolves(result)
+
+    async def test_RequestGivesUpAfterItsTimeout(self):
+        async with SolverService(workers=1, engine="iddfs", search_timeout=1) as service:
+            with self.assertRaises(asyncio.TimeoutError):
+                await service.solve("5x5:B.P../B..../..B../...W./B..BB", timeout=0.01)
+
+    async def test_MalformedBoardRaises(self):
+        async with SolverService(workers=1) as service:
+            with self.assertRaises(ValueError):
+                await service.solve("5x5:P")
+
+    async def test_HttpServerSolvesPostedBoards(self):
+        async with SolverService(workers=1) as service:
+            server = await serve(service, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                responses = []
+                for body in [{"board": "3x3:..B/PW./..B"}, {"board": "bad"}]:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    data = json.dumps(body).encode()
+                    writer.write(f"POST /solve HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                    await writer.drain()
+                    responses.append((await reader.read()).decode())
+                    writer.close()
+        status_line, _, body = responses[0].partition("\r\n")
+        self.assertEqual("HTTP/1.1 200 OK", status_line)
+        self.assertSolves(json.loads(body.split("\r\n\r\n", 1)[1]))
+        self.assertTrue(responses[1].startswith("HTTP/1.1 400 Bad Request"))
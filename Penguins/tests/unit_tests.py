@@ -1,8 +1,35 @@
+import cProfile
+import importlib
+import importlib.util
+import os
+import pickle
+import pstats
+import random
+import subprocess
+import sys
+import tempfile
 import unittest
+from Penguins import batch
+from Penguins.analysis import get_analysis
+from Penguins.batch import PositionBatch, shortest_solution_lengths
 from Penguins.board import Board, Location
+from Penguins.endgame import FORMAT_VERSION, HEADER, UNSOLVABLE, EndgameTable, write_table
 from Penguins.entity import EntityClass
 from Penguins.game import Game, Move
-from Penguins.direction import Direction
+from Penguins.generate import PuzzleSpec, backward_position, count_solutions_of_length, puzzle_of
+from Penguins.direction import DIRECTIONS, Direction
+from Penguins.geometry import get_geometry
+from Penguins.position import Position, decode_move, encode_move, pieces_of
+from Penguins.constants import BLACK, BOARD_SIZE, LIGHT_BLUE, WHITE
+from Penguins.heuristics import LineOfSight, remaining_penguins
+from Penguins.search import Search, SolveCancelled, SolveTimeout
+from Penguins.serialization import (BoardFile, board_from_bytes, board_from_text, board_to_bytes, board_to_text,
+                                    is_board_file, masks_to_text, position_from_text, record_size, write_boards)
+from Penguins.solution_cache import SolutionCache
+from Penguins.solved_positions import SolvedPositions
+from Penguins.stats import SearchStats
+from Penguins.symmetry import CanonicalKey, get_symmetries
+from Penguins.transposition_table import BoundedTranspositionTable, TranspositionTable
 
 
 class BoardTests(unittest.TestCase):
@@ -93,6 +120,13 @@ class BoardTests(unittest.TestCase):
         self.assertEqual(2, loc.col)
         self.assertEqual(0, loc.row)
 
+    def test_ApplyingAMoveWithNothingToStopTheEntityRaises(self):
+        board = Board(columns=3, rows=1)
+        p1 = board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        with self.assertRaises(ValueError):
+            board.apply_move(p1, Direction.RIGHT)
+        self.assertEqual(Location(0, 0), board.get_entity_location(p1))
+
     def test_RevertMoveEntityMultipleSteps(self):
         board = Board(columns=4, rows=1)
         p1 = board.add_new_entity(EntityClass.PENGUIN, 0, 0)
@@ -104,7 +138,871 @@ class BoardTests(unittest.TestCase):
         self.assertEqual(0, loc.row)
 
 
+def create_random_board(rng: random.Random, columns: int = 5, rows: int = 5) -> Board:
+    board = Board(columns=columns, rows=rows)
+    cells = rng.sample([(col, row) for col in range(columns) for row in range(rows)], rng.randint(2, min(9, columns * rows)))
+    board.add_new_entity(EntityClass.WATER, *cells[0])
+    board.add_new_entity(EntityClass.PENGUIN, *cells[1])
+    for col, row in cells[2:]:
+        board.add_new_entity(rng.choice([EntityClass.PENGUIN, EntityClass.BEAR]), col, row)
+    return board
+
+
+class GeometryTests(unittest.TestCase):
+    def test_RaysListTheCellsInEachDirectionNearestFirst(self):
+        geometry = get_geometry(columns=3, rows=2)
+        cell = geometry.cell(col=1, row=1)
+        self.assertEqual(4, cell)
+        self.assertEqual((3,), geometry.rays[cell][DIRECTIONS.index(Direction.LEFT)])
+        self.assertEqual((1,), geometry.rays[cell][DIRECTIONS.index(Direction.UP)])
+        self.assertEqual((5,), geometry.rays[cell][DIRECTIONS.index(Direction.RIGHT)])
+        self.assertEqual((), geometry.rays[cell][DIRECTIONS.index(Direction.DOWN)])
+        self.assertEqual((1, 0), geometry.rays[geometry.cell(col=2, row=0)][DIRECTIONS.index(Direction.LEFT)])
+        self.assertEqual(0b11, geometry.ray_masks[2][DIRECTIONS.index(Direction.LEFT)])
+
+    def test_BoardsOfTheSameSizeShareTheGeometry(self):
+        self.assertIs(Board(columns=5, rows=5).geometry, Board(columns=5, rows=5).geometry)
+        self.assertIsNot(Board(columns=5, rows=5).geometry, Board(columns=5, rows=4).geometry)
+
+
+class PositionTests(unittest.TestCase):
+    def test_FromBoardSetsCellMasks(self):
+        board = Board(columns=3, rows=2)
+        board.add_new_entity(EntityClass.PENGUIN, 1, 0)
+        board.add_new_entity(EntityClass.BEAR, 0, 1)
+        board.add_new_entity(EntityClass.WATER, 2, 1)
+        position = Position.from_board(board)
+        self.assertEqual(1 << 1, position.penguins)
+        self.assertEqual(1 << 3, position.bears)
+        self.assertEqual(1 << 5, position.water)
+        self.assertEqual([1, 3], position.pieces)
+
+    def test_OrderedMovesAreTheLegalMovesWithDivesFirst(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            position = Position.from_board(create_random_board(rng, columns=rng.randint(3, 6), rows=rng.randint(1, 6)))
+            diving_lines = get_analysis(position.columns, position.rows, position.water).diving_lines
+            self.assertEqual(sorted(position.moves()), sorted(position.ordered_moves(diving_lines)))
+        position = Position.from_board(board_from_text("4x2:B.../PW.B"))
+        self.assertEqual(encode_move(0, DIRECTIONS.index(Direction.RIGHT)), position.ordered_moves(0)[0])
+
+    def test_PredecessorsAreThePositionsOneMoveBefore(self):
+        rng = random.Random(19)
+        for _ in range(100):
+            position = Position.from_board(create_random_board(rng, columns=rng.randint(2, 5), rows=rng.randint(2, 5)))
+            key = position.key()
+            successors = set()
+            for move in list(position.moves()):
+                position.make(move)
+                successors.add(position.key())
+                self.assertIn(key, set(position.predecessors(*position.key())))
+                position.unmake()
+            for penguins, bears in position.predecessors(*key):
+                cells = [cell for cell in range(position.columns * position.rows) if penguins >> cell & 1]
+                pieces = cells + [None] * (position.penguin_count - len(cells))
+                pieces += [cell for cell in range(position.columns * position.rows) if bears >> cell & 1]
+                predecessor = Position(position.columns, position.rows, position.water, pieces, position.penguin_count)
+                keys = set()
+                for move in list(predecessor.moves()):
+                    predecessor.make(move)
+                    keys.add(predecessor.key())
+                    predecessor.unmake()
+                self.assertIn(key, keys)
+
+    def test_PositionMovesMatchTheBoardMoves(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            board = create_random_board(rng, columns=rng.randint(3, 6), rows=rng.randint(1, 6))
+            game = Game(board)
+            position = Position.from_board(board)
+            for piece, entity in enumerate(pieces_of(board)):
+                for d, direction in enumerate(DIRECTIONS):
+                    legal = game.entity_move_is_legal(entity, direction)
+                    self.assertEqual(legal, encode_move(piece, d) in list(position.moves()))
+                    if not legal:
+                        continue
+                    original_location = board.apply_move(entity, direction)
+                    position.make(encode_move(piece, d))
+                    self.assertEqual(Position.from_board(board).key(), position.key())
+                    entity.move(col=original_location.col, row=original_location.row)
+                    if entity not in board.entities:
+                        board.entities.append(entity)
+                    position.unmake()
+                    self.assertEqual(Position.from_board(board).key(), position.key())
+
+    def test_PenguinDivesIntoWaterAndComesBackOnUnmake(self):
+        board = Board(columns=3, rows=1)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        board.add_new_entity(EntityClass.WATER, 1, 0)
+        board.add_new_entity(EntityClass.BEAR, 2, 0)
+        position = Position.from_board(board)
+        position.make(encode_move(0, DIRECTIONS.index(Direction.RIGHT)))
+        self.assertTrue(position.is_won())
+        self.assertIsNone(position.pieces[0])
+        position.unmake()
+        self.assertEqual((1, 1 << 2), position.key())
+
+    def test_MovesAreEncodedAsSmallInts(self):
+        self.assertEqual(4 * 3 + 2, encode_move(3, 2))
+        self.assertEqual((3, 2), decode_move(encode_move(3, 2)))
+
+    def test_PathIsTheMovesMadeSoFar(self):
+        board = Board(columns=5, rows=1)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        board.add_new_entity(EntityClass.BEAR, 2, 0)
+        board.add_new_entity(EntityClass.BEAR, 4, 0)
+        position = Position.from_board(board)
+        right, left = encode_move(0, DIRECTIONS.index(Direction.RIGHT)), encode_move(2, DIRECTIONS.index(Direction.LEFT))
+        position.make(right)
+        position.make(left)
+        self.assertEqual([right, left], position.path())
+        position.unmake()
+        self.assertEqual([right], position.path())
+
+    def test_UndoStackGrowsBeyondItsInitialSize(self):
+        board = Board(columns=5, rows=1)
+        board.add_new_entity(EntityClass.PENGUIN, 2, 0)
+        board.add_new_entity(EntityClass.BEAR, 0, 0)
+        board.add_new_entity(EntityClass.BEAR, 4, 0)
+        position = Position.from_board(board)
+        initial_key = position.key()
+        for _ in range(100):
+            position.make(next(position.moves()))
+        for _ in range(100):
+            position.unmake()
+        self.assertEqual(initial_key, position.key())
+
+
+class SymmetryTests(unittest.TestCase):
+    def test_SquareBoardsHaveEightSymmetriesAndRectanglesFour(self):
+        self.assertEqual(8, len(get_symmetries(5, 5)))
+        self.assertEqual(4, len(get_symmetries(5, 3)))
+
+    def test_RotationMapsCellsAndDirections(self):
+        rotation = next(s for s in get_symmetries(3, 3) if s.name == "rotate 90")
+        self.assertEqual(1 << 2, rotation.apply(1 << 0))  # top left corner goes to top right corner
+        self.assertEqual(DIRECTIONS.index(Direction.RIGHT), rotation.map_direction(DIRECTIONS.index(Direction.UP)))
+        self.assertEqual(DIRECTIONS.index(Direction.UP), rotation.unmap_direction(DIRECTIONS.index(Direction.RIGHT)))
+
+    def test_MappedPositionHasTheSameMovesInMappedDirections(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            board = create_random_board(rng)
+            position = Position.from_board(board)
+            for s in get_symmetries(5, 5):
+                image = Position(5, 5, s.apply(position.water), [s.cells[c] for c in position.pieces], position.penguin_count)
+                moves = set()
+                for move in position.moves():
+                    piece, direction = decode_move(move)
+                    moves.add(encode_move(piece, s.map_direction(direction)))
+                self.assertEqual(moves, set(image.moves()), s)
+
+    def test_RotatedPositionsHaveTheSameCanonicalKey(self):
+        board1 = Board(columns=3, rows=3)
+        board1.add_new_entity(EntityClass.WATER, 1, 1)
+        board1.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        board1.add_new_entity(EntityClass.BEAR, 2, 0)
+        board2 = Board(columns=3, rows=3)
+        board2.add_new_entity(EntityClass.WATER, 1, 1)
+        board2.add_new_entity(EntityClass.PENGUIN, 2, 0)
+        board2.add_new_entity(EntityClass.BEAR, 2, 2)
+        self.assertNotEqual(Position.from_board(board1).key(), Position.from_board(board2).key())
+        self.assertEqual(CanonicalKey(Position.from_board(board1))(), CanonicalKey(Position.from_board(board2))())
+
+    def test_SymmetriesThatMoveTheWaterAreNotUsed(self):
+        board = Board(columns=3, rows=3)
+        board.add_new_entity(EntityClass.WATER, 0, 1)
+        canonical_key = CanonicalKey(Position.from_board(board))
+        self.assertEqual(["flip up-down"], [s.name for s in canonical_key.symmetries])
+
+    def test_SymmetricSearchVisitsFewerPositions(self):
+        board = Board(5, 5)
+        board.add_new_entity(EntityClass.WATER, 2, 2)
+        board.add_new_entity(EntityClass.PENGUIN, 3, 0)
+        board.add_new_entity(EntityClass.PENGUIN, 1, 4)
+        board.add_new_entity(EntityClass.BEAR, 3, 3)
+        board.add_new_entity(EntityClass.BEAR, 1, 1)
+        board.add_new_entity(EntityClass.BEAR, 4, 3)
+        board.add_new_entity(EntityClass.BEAR, 0, 1)
+        plain = Search(Position.from_board(board))
+        symmetric = Search(Position.from_board(board), symmetry=True)
+        self.assertEqual(len(plain.depth_first()), len(symmetric.depth_first()))
+        self.assertLess(len(symmetric.transposition_table), len(plain.transposition_table))
+
+
+class HeuristicsTests(unittest.TestCase):
+    def test_RemainingPenguinsCountsThePenguinsOnTheBoard(self):
+        board = Board(columns=3, rows=3)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        board.add_new_entity(EntityClass.PENGUIN, 2, 2)
+        board.add_new_entity(EntityClass.BEAR, 1, 0)
+        self.assertEqual(2, remaining_penguins(Position.from_board(board)))
+
+    def test_PenguinOutOfLineWithWaterNeedsTwoMoves(self):
+        board = Board(columns=3, rows=3)
+        board.add_new_entity(EntityClass.WATER, 1, 1)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        self.assertEqual(2, LineOfSight()(Position.from_board(board)))
+
+    def test_PenguinInLineWithWaterNeedsOneMove(self):
+        board = Board(columns=3, rows=3)
+        board.add_new_entity(EntityClass.WATER, 1, 1)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 1)
+        self.assertEqual(1, LineOfSight()(Position.from_board(board)))
+
+    def test_WaterAtTheEdgeCantBeReachedAlongTheEdgeDirection(self):
+        # nothing can stop a penguin at a water in the corner
+        board = Board(columns=3, rows=3)
+        board.add_new_entity(EntityClass.WATER, 0, 0)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 2)
+        self.assertEqual(2, LineOfSight()(Position.from_board(board)))
+
+    def test_HeuristicsNeverOverestimate(self):
+        rng = random.Random(11)
+        for _ in range(30):
+            board = create_random_board(rng, columns=4, rows=4)
+            position = Position.from_board(board)
+            solution = Search(position).breadth_first()
+            if solution:
+                self.assertLessEqual(remaining_penguins(position), len(solution))
+                self.assertLessEqual(LineOfSight()(position), len(solution))
+
+
+class SolutionCacheTests(unittest.TestCase):
+    @staticmethod
+    def create_board(flipped=False) -> Board:
+        board = Board(columns=4, rows=1)
+        board.add_new_entity(EntityClass.PENGUIN, 3 if flipped else 0, 0)
+        board.add_new_entity(EntityClass.WATER, 2 if flipped else 1, 0)
+        board.add_new_entity(EntityClass.BEAR, 1 if flipped else 2, 0)
+        return board
+
+    def test_BoardThatWasNotStoredIsNotFound(self):
+        cache = SolutionCache()
+        self.assertIsNone(cache.get(self.create_board()))
+
+    def test_StoredSolutionIsFound(self):
+        cache = SolutionCache()
+        board = self.create_board()
+        solution = [encode_move(0, DIRECTIONS.index(Direction.RIGHT))]
+        cache.put(board, solution)
+        self.assertEqual(solution, cache.get(board))
+
+    def test_StoredSolutionIsFoundForAReflectedBoard(self):
+        cache = SolutionCache()
+        cache.put(self.create_board(), [encode_move(0, DIRECTIONS.index(Direction.RIGHT))])
+        self.assertEqual([encode_move(0, DIRECTIONS.index(Direction.LEFT))], cache.get(self.create_board(flipped=True)))
+
+    def test_BoardWithoutSolutionIsStoredAsEmpty(self):
+        cache = SolutionCache()
+        board = Board(columns=3, rows=1)
+        board.add_new_entity(EntityClass.PENGUIN, 1, 0)
+        board.add_new_entity(EntityClass.WATER, 0, 0)
+        cache.put(board, [])
+        self.assertEqual([], cache.get(board))
+
+    def test_LeastRecentlyUsedBoardIsEvicted(self):
+        cache = SolutionCache(max_entries=2)
+        boards = []
+        for col in range(3):
+            board = Board(columns=5, rows=1)
+            board.add_new_entity(EntityClass.PENGUIN, col, 0)
+            cache.put(board, [])
+            boards.append(board)
+            if col == 1:
+                cache.get(boards[0])
+        self.assertEqual(2, len(cache))
+        self.assertIsNotNone(cache.get(boards[0]))
+        self.assertIsNone(cache.get(boards[1]))
+        self.assertIsNotNone(cache.get(boards[2]))
+
+    def test_BoardsUsedBeforeTheCacheWasClosedAreKept(self):
+        boards = []
+        for col in range(3):
+            board = Board(columns=5, rows=1)
+            board.add_new_entity(EntityClass.PENGUIN, col, 0)
+            boards.append(board)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            cache = SolutionCache(path, max_entries=2)
+            cache.put(boards[0], [])
+            cache.put(boards[1], [])
+            cache.get(boards[0])
+            cache.close()
+            cache = SolutionCache(path, max_entries=2)
+            cache.put(boards[2], [])
+            self.assertIsNotNone(cache.get(boards[0]))
+            self.assertIsNone(cache.get(boards[1]))
+            cache.close()
+
+    def test_GameUsesTheCachedSolution(self):
+        cache = SolutionCache()
+        board = self.create_board()
+        cache.put(board, [])  # pretend the board has no solution, to see the cache is used
+        game = Game(board, cache=cache)
+        self.assertEqual([], game.solve())
+
+    def test_GameStoresItsSolutionInTheCache(self):
+        cache = SolutionCache()
+        board = self.create_board()
+        Game(board, cache=cache).solve()
+        self.assertEqual([encode_move(0, DIRECTIONS.index(Direction.RIGHT))], cache.get(board))
+
+
+class SolvedPositionsTests(unittest.TestCase):
+    def test_PositionsAlongASolutionAreLearnedWithTheirMovesLeft(self):
+        position = Position.from_board(board_from_text("5x5:.P.B./B.B../..W../B...B/.B..."))
+        key = position.key()
+        solution = Search(position).run("bfs")
+        solved_positions = SolvedPositions()
+        solved_positions.learn(position, solution)
+        self.assertEqual(key, position.key())
+        known = solved_positions.section_for(position)
+        for moves_made, move in enumerate(solution):
+            self.assertEqual(len(solution) - moves_made, known.distance(*position.key()))
+            position.make(move)
+        self.assertEqual(0, known.distance(*position.key()))
+        self.assertIsNone(solved_positions.section_for(Position.from_board(board_from_text("3x1:PWB"))))
+
+    def test_PositionsTheSearchReachedAreLearnedWithTheirFewestMovesLeft(self):
+        position = Position.from_board(board_from_text("5x5:.P.B./B.B../..W../B...B/.B..."))
+        search = Search(position)
+        solution = search.run("bfs")
+        solved_positions = SolvedPositions()
+        solved_positions.learn(position, solution, search.reached())
+        lower_bounds = solved_positions.lower_bounds_for(position)
+        self.assertGreater(len(lower_bounds), 0)
+        for (penguins, bears), moves_left in lower_bounds.items():
+            text = masks_to_text(position.columns, position.rows, position.water, penguins, bears)
+            reached_solution = Search(Position.from_board(board_from_text(text))).run("bfs")
+            if reached_solution:  # the others have no solution at all
+                self.assertGreaterEqual(len(reached_solution), moves_left)
+
+    def test_SolvingAgainAfterAMoveOfTheSolutionIsALookup(self):
+        game = Game(board_from_text("5x5:P.B../B..../P.W../B..B./B...."), solved_positions=SolvedPositions())
+        solution = game.solve(engine="bfs")
+        game.perform_move(solution[0])
+        for engine in ("dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"):
+            with self.subTest(engine=engine):
+                self.assertEqual(len(solution) - 1, len(game.solve(engine=engine)))
+                self.assertEqual(0, game.stats.expanded)
+                self.assertEqual(1, game.stats.endgame_hits)
+
+    def test_EditedBoardIsSolvedAgainToItsShortestSolution(self):
+        text = "5x5:.P.B./B.B../..W../B...B/.B..."
+        game = Game(board_from_text(text), solved_positions=SolvedPositions())
+        game.solve(engine="bfs")
+        game.board.add_new_entity(EntityClass.PENGUIN, 4, 0)
+        expected = Search(Position.from_board(game.board)).run("bfs")
+        for engine in ("dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"):
+            with self.subTest(engine=engine):
+                self.assertEqual(len(expected), len(game.solve(engine=engine)))
+
+    def test_GameLearnsNothingUnlessItKeepsSolvedPositions(self):
+        game = Game(board_from_text("5x5:P.B../B..../P.W../B..B./B...."))
+        solution = game.solve(engine="bfs")
+        self.assertIsNone(game.solved_positions)
+        game.perform_move(solution[0])
+        self.assertEqual(len(solution) - 1, len(game.solve(engine="bfs")))
+        self.assertGreater(game.stats.expanded, 0)
+
+    def test_UnsolvableBoardIsLearned(self):
+        game = Game(board_from_text("3x1:PW."), solved_positions=SolvedPositions())
+        self.assertEqual([], game.solve(engine="bfs"))
+        self.assertEqual(1, len(game.solved_positions))
+        self.assertEqual([], game.solve(engine="iddfs"))
+        self.assertEqual(0, game.stats.expanded)
+
+    def test_EveryPositionReachedFromAnUnsolvableBoardIsLearned(self):
+        game = Game(board_from_text("5x4:.WP../.B..B/BB.B./PW..P"), solved_positions=SolvedPositions())
+        self.assertEqual([], game.solve(engine="bfs"))
+        game.perform_move(game.get_all_possible_moves()[0])
+        self.assertEqual([], game.solve(engine="dfs"))
+        self.assertEqual(0, game.stats.expanded)
+
+    def test_EditedBoardIsSolvedWithFewerExpansionsThanAFreshGame(self):
+        text = "5x5:.P.B./B.B../..W../B...B/.B..."
+        for engine in ("dfs", "bfs", "iddfs", "astar", "idastar"):
+            with self.subTest(engine=engine):
+                game = Game(board_from_text(text), solved_positions=SolvedPositions())
+                game.solve(engine=engine)
+                game.board.add_new_entity(EntityClass.BEAR, 0, 0)
+                fresh = Game(board_from_text(text))
+                fresh.board.add_new_entity(EntityClass.BEAR, 0, 0)
+                self.assertEqual(len(fresh.solve(engine=engine)), len(game.solve(engine=engine)))
+                self.assertLess(game.stats.expanded, fresh.stats.expanded)
+
+
+class TranspositionTableTests(unittest.TestCase):
+    def test_NewPositionShouldBeExplored(self):
+        table = TranspositionTable()
+        self.assertTrue(table.record("a", 3))
+        self.assertIn("a", table)
+
+    def test_PositionReachedAgainAtSameOrDeeperLevelShouldNotBeExplored(self):
+        table = TranspositionTable()
+        table.record("a", 3)
+        self.assertFalse(table.record("a", 3))
+        self.assertFalse(table.record("a", 4))
+
+    def test_PositionReachedAgainByShorterPathShouldBeExplored(self):
+        table = TranspositionTable()
+        table.record("a", 3)
+        self.assertTrue(table.record("a", 2))
+        self.assertFalse(table.record("a", 3))
+
+
+class BoundedTranspositionTableTests(unittest.TestCase):
+    def test_PositionReachedAgainAtSameOrDeeperLevelShouldNotBeExplored(self):
+        table = BoundedTranspositionTable(1000, 25)
+        self.assertTrue(table.record((1, 2), 3))
+        self.assertIn((1, 2), table)
+        self.assertFalse(table.record((1, 2), 3))
+        self.assertFalse(table.record((1, 2), 4))
+        self.assertTrue(table.record((1, 2), 2))
+
+    def test_TableStaysWithinItsMemoryLimit(self):
+        table = BoundedTranspositionTable(1000, 25)
+        for penguins in range(1000):
+            table.record((penguins, 0), penguins % 7)
+        self.assertLessEqual(table.memory_bytes, 1000)
+        self.assertEqual(table.size, len(table))
+        self.assertGreater(table.dropped + table.replaced, 0)
+
+    def test_FullTableKeepsTheShallowerPositions(self):
+        table = BoundedTranspositionTable(BoundedTranspositionTable.PROBES * 10, 25)
+        for penguins in range(table.PROBES):
+            table.record((penguins, 0), 5)
+        self.assertTrue(table.record((table.PROBES, 0), 1))
+        self.assertEqual(1, table.replaced)
+        self.assertIn((table.PROBES, 0), table)
+        self.assertTrue(table.record((table.PROBES + 1, 0), 9))
+        self.assertNotIn((table.PROBES + 1, 0), table)
+
+    def test_KeysOfLargeBoardsTakeSeveralWords(self):
+        table = BoundedTranspositionTable(10000, 100)
+        table.record((1 << 99, 1), 0)
+        self.assertIn((1 << 99, 1), table)
+        self.assertNotIn((1, 1 << 99), table)
+
+    def test_ClearEmptiesTheTable(self):
+        table = BoundedTranspositionTable(1000, 25)
+        table.record((1, 2), 3)
+        table.clear()
+        self.assertEqual(0, len(table))
+        self.assertTrue(table.record((1, 2), 3))
+
+    def test_TooSmallMemoryLimitRaises(self):
+        with self.assertRaises(ValueError):
+            BoundedTranspositionTable(10, 25)
+
+
+class BoardAnalysisTests(unittest.TestCase):
+    @staticmethod
+    def is_dead(text: str) -> bool:
+        position = Position.from_board(board_from_text(text))
+        return get_analysis(position.columns, position.rows, position.water).is_dead(position)
+
+    def test_PositionWithoutBearsIsDead(self):
+        self.assertTrue(self.is_dead("4x1:P.WP"))
+
+    def test_PositionWhereNoPenguinCanGetToADiveIsDead(self):
+        self.assertTrue(self.is_dead("3x3:W../.B./P.B"))
+        self.assertTrue(self.is_dead("3x3:.W./.B./P.B"))
+        self.assertFalse(self.is_dead("3x3:.../BW./P.B"))
+
+    def test_PenguinAndBearAloneAreDeadUnlessThePenguinDivesRightAway(self):
+        self.assertFalse(self.is_dead("4x1:P.WB"))
+        self.assertTrue(self.is_dead("4x1:PW.B"))
+
+    def test_DeadPositionsHaveNoSolution(self):
+        rng = random.Random(18)
+        for _ in range(300):
+            board = create_random_board(rng, columns=rng.randint(2, 4), rows=rng.randint(1, 4))
+            if self.is_dead(board_to_text(board)):
+                search = Search(Position.from_board(board))
+                search.is_dead = None
+                self.assertEqual([], search.breadth_first(), msg=board_to_text(board))
+
+    def test_SearchStopsAtADeadBoard(self):
+        game = Game(board_from_text("3x3:W../.B./P.B"))
+        self.assertEqual([], game.solve(engine="bfs"))
+        self.assertEqual(0, game.stats.expanded)
+        self.assertEqual(1, game.stats.dead_position_prunes)
+
+
+class EndgameTableTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "endgame-4x4.bin")
+        write_table(cls.path, 4, 4, 4, [1 << cell for cell in range(16)])
+        cls.table = EndgameTable(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table.close()
+        cls.directory.cleanup()
+
+    @staticmethod
+    def random_boards(seed: int, penguins: int, bears: int):
+        rng = random.Random(seed)
+        while True:
+            board = create_random_board(rng, columns=4, rows=4)
+            if (len(board.get_all_entities_of_class(EntityClass.PENGUIN)) == penguins
+                    and len(board.get_all_entities_of_class(EntityClass.BEAR)) == bears):
+                yield board
+
+    def test_DistancesAreTheLengthsOfTheShortestSolutions(self):
+        boards = self.random_boards(20, penguins=2, bears=2)
+        for _ in range(200):
+            position = Position.from_board(next(boards))
+            solution = Search(position).run("bfs")
+            distance = self.table.section_for(position).distance(position.penguins, position.bears)
+            self.assertEqual(len(solution) if solution else UNSOLVABLE, distance, msg=repr(position))
+
+    def test_TableHoldsNoPositionsWithMorePiecesOrOfOtherBoards(self):
+        for text in ["5x5:P.B../...../..W../...../.....", "4x4:P.BB/BWB./..../....", "4x4:P.B./.WW./..../...."]:
+            self.assertIsNone(self.table.section_for(Position.from_board(board_from_text(text))), msg=text)
+        position = Position.from_board(board_from_text("4x4:P.BP/PW../P.../...."))
+        self.assertIsNone(self.table.section_for(position).distance(*position.key()))
+
+    def test_EnginesStopAtThePositionsOfTheTableAndFindTheShortestSolution(self):
+        for text, length in [("4x4:..B./PPWB/..../..P.", 3), ("4x4:.B../.W../.P../P.PB", 6), ("4x4:..P./PP.B/..W./..B.", 5),
+                             ("4x4:...P/BW.P/...P/...B", 6), ("4x4:.P../B.PP/.W../.B..", 5)]:
+            for engine in ["dfs", "bfs", "iddfs", "astar", "idastar"]:
+                board = board_from_text(text)
+                game = Game(board, endgame=self.table)
+                solution = game.solve(engine=engine)
+                self.assertEqual(length, len(solution), msg=f"{engine} {text}")
+                self.assertGreater(game.stats.endgame_hits, 0, msg=engine)
+                for move in solution:
+                    self.assertTrue(game.entity_move_is_legal(move.entity, move.direction), msg=engine)
+                    board.apply_move(move.entity, move.direction)
+                self.assertTrue(game.is_won(), msg=engine)
+
+    def test_TableIsPickledAsItsPath(self):
+        copy = pickle.loads(pickle.dumps(self.table))
+        self.assertEqual(self.path, copy.path)
+        self.assertEqual(self.table.sections.keys(), copy.sections.keys())
+        copy.close()
+
+    def test_TableOfAnotherVersionOrWithABadChecksumIsRejected(self):
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        path = os.path.join(self.directory.name, "changed.bin")
+        for offset, value in [(8, FORMAT_VERSION + 1), (HEADER.size + 100, data[HEADER.size + 100] ^ 1), (0, 0)]:
+            changed = bytearray(data)
+            changed[offset] = value
+            with open(path, "wb") as f:
+                f.write(changed)
+            with self.assertRaises(ValueError):
+                EndgameTable(path)
+
+
+class GenerateTests(unittest.TestCase):
+    def test_BoardsMadeBackwardFromAWinningPositionAreSolvable(self):
+        rng = random.Random(21)
+        spec = PuzzleSpec(penguins=range(2, 3), bears=range(3, 4), lengths=range(3, 6))
+        made = 0
+        for _ in range(50):
+            position = backward_position(rng, spec)
+            if position is None:
+                continue
+            made += 1
+            self.assertEqual((2, 3), (position.penguins.bit_count(), position.bears.bit_count()))
+            self.assertTrue(Search(position).run("bfs"), msg=repr(position))
+        self.assertGreater(made, 10)
+
+    def test_ShortestSolutionsAreCountedUpToTheLimit(self):
+        # the penguin dives left or right, between two waters with a bear behind each
+        position = Position.from_board(board_from_text("5x1:BWPWB"))
+        self.assertEqual(2, count_solutions_of_length(position, 1, limit=5))
+        self.assertEqual(1, count_solutions_of_length(position, 1, limit=1))
+        position = Position.from_board(board_from_text("5x5:P.B../B..../P.W../B..B./B...."))
+        self.assertEqual(0, count_solutions_of_length(position, 8, limit=2))
+
+    def test_PuzzlesHaveTheirShortestSolutionLengthInTheRange(self):
+        spec = PuzzleSpec(lengths=range(9, 10))
+        puzzle = puzzle_of(Position.from_board(board_from_text("5x5:P.B../B..../P.W../B..B./B....")), spec)
+        self.assertEqual({"board": "5x5:P.B../B..../P.W../B..B./B....", "length": 9, "size": "5x5", "penguins": 2,
+                          "bears": 5}, puzzle)
+        self.assertIsNone(puzzle_of(Position.from_board(board_from_text("5x5:.P.B./B.B../..W../B...B/.B...")), spec))
+
+
+@unittest.skipIf(batch.numpy is None, "batches need numpy")
+class PositionBatchTests(unittest.TestCase):
+    BOARDS = ["5x5:P.B../B..../P.W../B..B./B....", "5x5:.P.B./B.B../..W../B...B/.B...", "3x3:..B/PW./..B", "5x1:BWPWB",
+              "1x5:./P/W/B/.", "4x3:B..P/..W./.X.B"]
+
+    def test_MovesAndTheirPositionsAreTheOnesOfTheBoards(self):
+        rng = random.Random(5)
+        batches = [[text] for text in self.BOARDS] + [[board_to_text(create_random_board(rng)) for _ in range(30)]]
+        for texts in batches:
+            position_batch = PositionBatch.from_boards([board_from_text(text) for text in texts])
+            successors, parents, cells, directions = position_batch.successors()
+            found = [set() for _ in texts]
+            for parent, cell, direction, key in zip(parents.tolist(), cells.tolist(), directions.tolist(), successors.keys()):
+                found[parent].add((cell, direction, key))
+            for text, moves in zip(texts, found):
+                board = board_from_text(text)
+                expected = set()
+                for move in Game(board).get_all_possible_moves():
+                    cell = move.entity.row * board.columns + move.entity.col
+                    original_location = board.apply_move(move.entity, move.direction)
+                    expected.add((cell, DIRECTIONS.index(move.direction), Position.from_board(board).key()))
+                    move.entity.move(col=original_location.col, row=original_location.row)
+                    if move.entity not in board.entities:  # dived penguin
+                        board.entities.append(move.entity)
+                self.assertEqual(expected, moves, msg=text)
+
+    def test_BatchedSearchFindsTheShortestSolutionOfEveryPosition(self):
+        positions = [Position.from_board(board_from_text(text)) for text in self.BOARDS + ["3x1:PW."]]
+        self.assertEqual([9, 4, 2, 1, 1, 4, None], shortest_solution_lengths(positions))
+        self.assertEqual([None, 4, 2, 1, 1, 4, None], shortest_solution_lengths(positions, max_depth=5))
+
+    def test_BatchHoldsASingleBoardSize(self):
+        with self.assertRaises(ValueError):
+            PositionBatch.from_boards([board_from_text("3x1:PWB"), board_from_text("1x3:P/W/B")])
+
+
+class SearchStatsTests(unittest.TestCase):
+    def test_DepthFirstSearchCountsItsWork(self):
+        game = Game(board_from_text("5x5:P.B../B..../P.W../B..B./B...."))
+        solution = game.solve(engine="dfs")
+        stats = game.stats
+        self.assertEqual(stats.expanded, sum(stats.expanded_per_ply))
+        self.assertGreater(stats.generated, stats.expanded)
+        self.assertGreater(stats.transposition_hits, 0)
+        self.assertGreater(stats.bound_prunes, 0)
+        self.assertGreaterEqual(stats.max_depth, len(solution))
+        self.assertEqual(stats.generated_per_ply[1], stats.branching_factors()[0])
+        self.assertIn("search", stats.phase_seconds)
+
+    def test_IterativeDeepeningCountsEveryIteration(self):
+        game = Game(board_from_text("5x5:P.B../B..../P.W../B..B./B...."))
+        game.solve(engine="iddfs")
+        self.assertGreater(game.stats.depth_limit_prunes, 0)
+        self.assertEqual(9, game.stats.iterations)
+        self.assertIn("deepening", game.stats.phase_seconds)
+
+    def test_MergeAddsTheCounts(self):
+        stats = SearchStats(expanded=1, expanded_per_ply=[1, 0], generated_per_ply=[0, 2])
+        stats.merge(SearchStats(expanded=2, expanded_per_ply=[0, 2, 0], generated_per_ply=[0, 0, 3]))
+        self.assertEqual(3, stats.expanded)
+        self.assertEqual([1, 2, 0], stats.expanded_per_ply)
+        self.assertEqual([0, 2, 3], stats.generated_per_ply)
+        self.assertEqual([2.0, 1.5], stats.branching_factors())
+
+    def test_ProfilerIsEnteredAroundTheSearch(self):
+        profiler = cProfile.Profile()
+        Game(board_from_text("5x5:P.B../B..../P.W../B..B./B....")).solve(engine="idastar", profiler=profiler)
+        functions = [function for _, _, function in pstats.Stats(profiler).stats]
+        self.assertIn("recursive_solve", functions)
+
+
+class SerializationTests(unittest.TestCase):
+    def test_BoardIsWrittenRowByRow(self):
+        board = Board(columns=3, rows=2)
+        board.add_new_entity(EntityClass.PENGUIN, 0, 0)
+        board.add_new_entity(EntityClass.BEAR, 2, 0)
+        board.add_new_entity(EntityClass.WATER, 1, 1)
+        self.assertEqual("3x2:P.B/.W.", board_to_text(board))
+
+    def test_BoardIsReadBack(self):
+        rng = random.Random(10)
+        for _ in range(20):
+            board = create_random_board(rng, columns=rng.randint(1, 6), rows=rng.randint(1, 6))
+            self.assertEqual(board_to_text(board), board_to_text(board_from_text(board_to_text(board))))
+
+    def test_BearOnWaterIsReadBack(self):
+        board = board_from_text("2x1:XP")
+        self.assertEqual([EntityClass.BEAR, EntityClass.WATER], [e.entity_class for e in board.get_entities_in_location(0, 0)])
+        self.assertEqual("2x1:XP", board_to_text(board))
+
+    def test_MalformedBoardRaises(self):
+        for text in ["", "3x2", "3:P.B/.W.", "3x2:P.B", "3x2:P.B/.W", "3x2:P.B/.Q."]:
+            with self.assertRaises(ValueError, msg=text):
+                board_from_text(text)
+
+    def test_BoardIsReadBackFromItsBinaryFormOfAFixedWidth(self):
+        rng = random.Random(11)
+        for _ in range(20):
+            board = create_random_board(rng, columns=rng.randint(1, 6), rows=rng.randint(2, 6))
+            data = board_to_bytes(board)
+            self.assertEqual(2 + record_size(board.columns, board.rows), len(data))
+            self.assertEqual(board_to_text(board), board_to_text(board_from_bytes(data)))
+        self.assertEqual("2x1:XP", board_to_text(board_from_bytes(board_to_bytes(board_from_text("2x1:XP")))))
+
+    def test_BinaryFormDoesNotDependOnTheOrderOfTheEntities(self):
+        board = board_from_text("3x2:P.B/PW.")
+        board.entities.reverse()
+        self.assertEqual(board_to_bytes(board_from_text("3x2:P.B/PW.")), board_to_bytes(board))
+
+    def test_MalformedBinaryFormRaises(self):
+        data = board_to_bytes(board_from_text("3x2:P.B/.W."))
+        for malformed in [b"", data[:-1], data + b"\0", data[:2] + b"\x40" + data[3:], data[:3] + b"\x11" + data[4:]]:
+            with self.assertRaises(ValueError, msg=malformed):
+                board_from_bytes(malformed)
+
+    def test_BoardFileGivesBackItsBoardsLazilyAsPositions(self):
+        texts = ["3x2:P.B/.W.", "3x2:XP./..B", "3x2:PPB/BWB"]
+        positions = [position_from_text(text) for text in texts]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "boards.bin")
+            count = write_boards(path, 3, 2, ((p.water, p.penguins, p.bears) for p in positions))
+            self.assertEqual(3, count)
+            self.assertTrue(is_board_file(path))
+            with BoardFile(path) as boards:
+                self.assertEqual(3, len(boards))
+                self.assertEqual([p.key() for p in positions], [p.key() for p in boards])
+                self.assertEqual(texts, list(boards.texts()))
+                self.assertEqual((positions[2].water, positions[2].penguins, positions[2].bears), boards.masks(2))
+                self.assertEqual(2, boards[2].penguin_count)
+                self.assertEqual([(p.water, p.penguins, p.bears) for p in positions[1:]], list(boards.all_masks(1)))
+                with self.assertRaises(IndexError):
+                    boards.masks(3)
+                copy = pickle.loads(pickle.dumps(boards))
+                self.assertEqual(texts, list(copy.texts()))
+                copy.close()
+                if batch.numpy is not None:
+                    self.assertEqual([p.key() for p in positions[1:]], boards.batch(1).keys())
+
+    def test_BoardFileOfAnotherVersionOrTruncatedIsRejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "boards.bin")
+            write_boards(path, 9, 9, [(1, 2, 4)] * 10)
+            with open(path, "rb") as f:
+                data = f.read()
+            for changed in [data[:8] + b"\x02" + data[9:], data[:-1], b"PENG", b""]:
+                with open(path, "wb") as f:
+                    f.write(changed)
+                with self.assertRaises(ValueError):
+                    BoardFile(path)
+
+
+class SearchTests(unittest.TestCase):
+    def test_SearchRaisesWhenItRunsOutOfTime(self):
+        board = board_from_text("5x5:B.P../B..../..B../...W./B..BB")
+        for engine in ["dfs", "bfs", "iddfs", "astar", "idastar", "bidirectional"]:
+            with self.assertRaises(SolveTimeout, msg=engine):
+                Game(board).solve(engine=engine, timeout=0)
+
+    def test_SearchReportsProgress(self):
+        board = board_from_text("5x5:B.P../B..../..B../...W./B..BB")
+        search = Search(Position.from_board(board))
+        progress = []
+        search.on_progress = lambda expanded_positions, depth: progress.append(expanded_positions)
+        search.breadth_first()
+        self.assertGreater(len(progress), 0)
+        self.assertEqual(sorted(progress), progress)
+
+    def test_CancelledSearchRaises(self):
+        board = board_from_text("5x5:B.P../B..../..B../...W./B..BB")
+        search = Search(Position.from_board(board))
+        search.on_progress = lambda expanded_positions, depth: search.cancel()
+        with self.assertRaises(SolveCancelled):
+            search.depth_first()
+
+    def test_SearchWithinMemoryLimitFindsTheShortestSolution(self):
+        board = board_from_text("5x5:.P.B./B.B../..W../B...B/.B...")
+        for engine in ["iddfs", "idastar"]:
+            for symmetry in [False, True]:
+                game = Game(board)
+                self.assertEqual(4, len(game.solve(engine=engine, symmetry=symmetry, memory_limit=200)), msg=engine)
+
+    def test_SearchWithinMemoryLimitEndsOnABoardWithoutSolution(self):
+        # more positions are reachable than the table holds, so it forgets some of them
+        board = board_from_text("5x4:.WP../.B..B/BB.B./PW..P")
+        for engine in ["iddfs", "idastar"]:
+            search = Search(Position.from_board(board), timeout=10, memory_limit=4000)
+            self.assertEqual([], search.run(engine), msg=engine)
+            self.assertGreater(search.transposition_table.dropped, 0, msg=engine)
+
+    def test_SearchWithinMemoryLimitRaisesForEnginesThatCantBoundIt(self):
+        board = board_from_text("5x5:P.B../B..../P.W../B..B./B....")
+        for engine in ["dfs", "bfs", "astar"]:
+            with self.assertRaises(ValueError, msg=engine):
+                Game(board).solve(engine=engine, memory_limit=10000)
+
+    def test_AStarSolutionHoldsWhenAPositionIsReachedAgainByAShorterPath(self):
+        # the position after the longer moves is reached again after the shorter ones, with its penguins in another
+        # order. The estimates expand it and its children first, then the shorter path, then the win
+        board = board_from_text("4x4:.PBB/PWBB/B.../..B.")
+        longer, shorter, win = [16, 11, 18], [19, 11], [6, 8, 3]
+
+        def snapshots(moves):
+            position = Position.from_board(board)
+            for move in moves:
+                position.make(move)
+                yield position.snapshot()
+        estimates = dict.fromkeys(snapshots(longer + win), 0)
+        estimates.update(dict.fromkeys(snapshots(shorter[:-1]), len(longer)))
+        position = Position.from_board(board)
+        solution = Search(position, heuristic=lambda p: estimates.get(p.snapshot(), 100)).run("astar")
+        for move in solution:
+            self.assertIn(move, list(position.moves()))
+            position.make(move)
+        self.assertTrue(position.is_won())
+
+    def test_BidirectionalSearchFindsTheShortestSolution(self):
+        rng = random.Random(19)
+        expanded_backward = 0
+        for _ in range(100):
+            board = create_random_board(rng, columns=rng.randint(3, 5), rows=rng.randint(2, 5))
+            expected = Game(board).solve(engine="bfs")
+            game = Game(board)
+            solution = game.solve(engine="bidirectional")
+            self.assertEqual(len(expected), len(solution), msg=board_to_text(board))
+            expanded_backward += game.stats.expanded_backward
+            for move in solution:
+                board.apply_move(move.entity, move.direction)
+            self.assertEqual(bool(solution), game.is_won())
+        # the boards with few bears have few winning positions, which are then searched backward
+        self.assertGreater(expanded_backward, 0)
+
+    def test_SearchCountsTheExpandedPositions(self):
+        board = board_from_text("5x5:B.B../B...B/P.W../B..B./....B")
+        search = Search(Position.from_board(board))
+        search.breadth_first()
+        self.assertGreater(search.stats.expanded, 0)
+
+    def test_ShortestSolutionsAreCountedAndListed(self):
+        rng = random.Random(22)
+        for _ in range(100):
+            position = Position.from_board(create_random_board(rng, columns=4, rows=4))
+            length, count = Search(position).count_shortest_solutions()
+            solutions = list(Search(position).shortest_solutions())
+            self.assertEqual(len(Search(position).run("bfs")), length)
+            self.assertEqual(count, len(solutions))
+            self.assertEqual(count, len({tuple(solution) for solution in solutions}))
+            if length:
+                self.assertEqual(count_solutions_of_length(position, length, limit=count + 1), count)
+            for solution in solutions:
+                self.assertEqual(length, len(solution))
+                for move in solution:
+                    self.assertIn(move, list(position.moves()))
+                    position.make(move)
+                self.assertTrue(position.is_won())
+                for _ in solution:
+                    position.unmake()
+
+
 class GameTests(unittest.TestCase):
+    def test_LargeAndRectangularBoardsAreSolved(self):
+        # pieces only stop at other pieces, so a board placed anywhere on a larger empty one keeps its solutions
+        rows = "P.B../B..../P.W../B..B./B....".split("/")
+        for columns, row_count, left, top in [(12, 12, 4, 3), (12, 8, 7, 3), (8, 12, 0, 7)]:
+            lines = ["." * columns] * row_count
+            for row, line in enumerate(rows):
+                lines[top + row] = "." * left + line + "." * (columns - left - len(line))
+            text = f"{columns}x{row_count}:" + "/".join(lines)
+            for engine in ["bfs", "astar", "idastar"]:
+                for symmetry in [False, True]:
+                    solution = Game(board_from_text(text)).solve(engine=engine, symmetry=symmetry)
+                    self.assertEqual(9, len(solution), msg=f"{text} {engine}")
+            self.assertEqual(9, len(Game(board_from_text(text)).solve(engine="idastar", memory_limit=10000)))
+
     def test_GameIsWonWhenThereAreNoPenguinsLeft(self):
         board = Board(columns=1, rows=1)
         board.add_new_entity(EntityClass.WATER, 0, 0)
@@ -218,6 +1116,18 @@ class GameTests(unittest.TestCase):
                 expected_moves += 1
         self.assertEqual(2, expected_moves)
 
+    def test_SolveWithUnknownEngineRaises(self):
+        board = Board(columns=3, rows=1)
+        game = Game(board)
+        with self.assertRaises(ValueError):
+            game.solve(engine="dijkstra")
+
+    def test_ParallelSolveWithBreadthFirstEngineRaises(self):
+        board = board_from_text("3x1:PWB")
+        game = Game(board)
+        with self.assertRaises(ValueError):
+            game.solve(engine="bfs", workers=2)
+
     def test_Move(self):
         board = Board(columns=3, rows=1)
         p1 = board.add_new_entity(EntityClass.PENGUIN, 0, 0)
@@ -250,3 +1160,39 @@ class GameTests(unittest.TestCase):
         self.assertNotIn(p1, game.board.entities)
         game.revert_move(move)
         self.assertIn(p1, game.board.entities)
+
+
+@unittest.skipUnless(importlib.util.find_spec("pygame"), "rendering needs pygame")
+class RenderingTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # pygame is only imported here, so the rest of the tests run headless
+        cls.pygame = importlib.import_module("pygame")
+        cls.rendering = importlib.import_module("Penguins.rendering")
+
+    def test_BoardsAreScaledToFit(self):
+        square_size = self.rendering.square_size
+        self.assertEqual(BOARD_SIZE // 5, square_size(Board(columns=5, rows=5)))
+        self.assertEqual(BOARD_SIZE // 12, square_size(Board(columns=12, rows=8)))
+        self.assertEqual(BOARD_SIZE // 12, square_size(Board(columns=8, rows=12)))
+
+    def test_RectangularBoardIsDrawnWithColumnsAcross(self):
+        board = board_from_text("4x2:..../...B")
+        square = self.rendering.square_size(board)
+        win = self.pygame.Surface((BOARD_SIZE, BOARD_SIZE))
+        win.fill(WHITE)
+        self.rendering.draw_board(win, board)
+        # the border of the square of column 3, row 0, and the inside of it
+        self.assertEqual(BLACK, tuple(win.get_at((3 * square, square // 2)))[:3])
+        self.assertEqual(LIGHT_BLUE, tuple(win.get_at((3 * square + 5, square // 2)))[:3])
+        # below the board, where column 0 of row 3 would be
+        self.assertEqual(WHITE, tuple(win.get_at((0, 3 * square + square // 2)))[:3])
+        # the bear in column 3, row 1
+        self.assertEqual(WHITE, tuple(win.get_at((3 * square + square // 2, square + square // 2)))[:3])
+
+
+class HeadlessTests(unittest.TestCase):
+    def test_SolverDoesNotImportPygame(self):
+        code = "import sys, Penguins.game, Penguins.solution_cache; print('pygame' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual("False", result.stdout.strip())
@@ -0,0 +1,114 @@
+from array import array
+
+
+class TranspositionTable:
+    """ Remembers the positions the search has already reached, and the shallowest depth each was reached at """
+
+    def __init__(self):
+        self.best_depth = dict()
+
+    def __len__(self):
+        return len(self.best_depth)
+
+    def __contains__(self, key) -> bool:
+        return key in self.best_depth
+
+    def clear(self):
+        self.best_depth.clear()
+
+    def record(self, key, depth: int) -> bool:
+        """ Stores the position at the given depth.
+        Returns False if it was already reached at the same depth or shallower, so there is no point exploring it again """
+        best = self.best_depth.get(key)
+        if best is not None and best <= depth:
+            return False
+        self.best_depth[key] = depth
+        return True
+
+
+class BoundedTranspositionTable:
+    """ Transposition table in a fixed amount of memory, packed into 64-bit words of an open addressing table.
+    When the PROBES slots of a key are taken, the deepest position is forgotten, and is only searched again """
+    PROBES = 4
+    # 1 + the deepest depth that's stored, 0 marks an empty slot
+    DEPTH_TYPE = "H"
+    MAX_DEPTH = 2 ** 16 - 2
+
+    def __init__(self, memory_limit: int, cells: int):
+        self.cells = cells
+        self.words = (2 * cells + 63) // 64
+        entry_bytes = 8 * self.words + array(self.DEPTH_TYPE).itemsize
+        self.size = memory_limit // entry_bytes
+        if self.size < self.PROBES:
+            raise ValueError(f"A memory limit of {memory_limit} bytes doesn't hold {self.PROBES} positions, "
+                             f"which take {entry_bytes} bytes each")
+        self.keys = array("Q", [0]) * (self.words * self.size)
+        self.depths = array(self.DEPTH_TYPE, [0]) * self.size
+        self.count = 0
+        # positions that took the slot of a deeper one, and positions that weren't stored for lack of room
+        self.replaced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key) -> bool:
+        return self.find(key)[0] is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.keys.itemsize * len(self.keys) + self.depths.itemsize * len(self.depths)
+
+    def clear(self):
+        if self.count:
+            self.depths = array(self.DEPTH_TYPE, [0]) * self.size
+            self.count = 0
+
+    def pack(self, key: tuple[int, int]) -> list[int]:
+        penguins, bears = key
+        packed = penguins << self.cells | bears
+        return [packed >> (64 * word) & 0xFFFFFFFFFFFFFFFF for word in range(self.words)]
+
+    def find(self, key) -> tuple[int | None, list[int], list[int]]:
+        """ The slot holding the key or None, the packed key, and the slots it may be stored in """
+        words = self.pack(key)
+        keys, depths, size, word_count = self.keys, self.depths, self.size, self.words
+        start = hash(key) % size
+        slots = []
+        for probe in range(self.PROBES):
+            slot = (start + probe) % size
+            if depths[slot] == 0:
+                # slots are only emptied all at once by clear(), so the key isn't further along
+                slots.append(slot)
+                break
+            offset = slot * word_count
+            if keys[offset:offset + word_count].tolist() == words:
+                return slot, words, slots
+            slots.append(slot)
+        return None, words, slots
+
+    def record(self, key, depth: int) -> bool:
+        """ Stores the position at the given depth, if there is room for it.
+        Returns False if it is known to have been reached at the same depth or shallower """
+        slot, words, slots = self.find(key)
+        if slot is not None:
+            if self.depths[slot] <= depth + 1:
+                return False
+            self.depths[slot] = depth + 1
+            return True
+        if depth > self.MAX_DEPTH:
+            self.dropped += 1
+            return True
+        if self.depths[slots[-1]] == 0:
+            slot = slots[-1]
+            self.count += 1
+        else:
+            slot = max(slots, key=self.depths.__getitem__)
+            if self.depths[slot] <= depth + 1:
+                self.dropped += 1
+                return True
+            self.replaced += 1
+        offset = slot * self.words
+        self.keys[offset:offset + self.words] = array("Q", words)
+        self.depths[slot] = depth + 1
+        return True
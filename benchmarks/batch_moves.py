@@ -0,0 +1,86 @@
+""" Compares the throughput of move generation on boards, on positions, and on batches of positions with NumPy.
+
+    python benchmarks/batch_moves.py [--size 5x5] [--boards 10000] [--depth 6]
+
+Makes every legal move of random boards, and reports the positions reached per second by Game.get_all_possible_moves()
+and Board.apply_move(), by Position.moves() and make(), and by PositionBatch.successors() on all the boards at once.
+Then solves the boards up to --depth moves with a breadth-first search of each, and with the batched search of all
+of them, and reports the boards per second of both. Needs NumPy """
+import argparse
+import os
+import random
+import sys
+import time
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from Penguins.batch import PositionBatch, shortest_solution_lengths  # noqa: E402
+from Penguins.game import Game  # noqa: E402
+from Penguins.generate import PuzzleSpec, random_position  # noqa: E402
+from Penguins.search import Search  # noqa: E402
+from Penguins.serialization import board_from_text, masks_to_text  # noqa: E402
+
+
+def board_moves(boards) -> int:
+    reached = 0
+    for board in boards:
+        game = Game(board)
+        for move in game.get_all_possible_moves():
+            original_location = board.apply_move(move.entity, move.direction)
+            move.entity.move(col=original_location.col, row=original_location.row)
+            if move.entity not in board.entities:  # dived penguin
+                board.entities.append(move.entity)
+            reached += 1
+    return reached
+
+
+def position_moves(positions) -> int:
+    reached = 0
+    for position in positions:
+        for move in position.moves():
+            position.make(move)
+            position.unmake()
+            reached += 1
+    return reached
+
+
+def timed(function, *args) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="5x5", help="board size, columns x rows")
+    parser.add_argument("--boards", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=6, help="longest solution searched for")
+    parser.add_argument("--seed", type=int, default=2022)
+    args = parser.parse_args()
+    columns, rows = (int(value) for value in args.size.lower().split("x"))
+    rng = random.Random(args.seed)
+    spec = PuzzleSpec(columns, rows)
+    positions = [random_position(rng, spec) for _ in range(args.boards)]
+    boards = [board_from_text(masks_to_text(p.columns, p.rows, p.water, p.penguins, p.bears)) for p in positions]
+
+    print(f"{'moves of':<28} {'positions':>10} {'seconds':>8} {'positions/s':>12}")
+    reached, seconds = timed(board_moves, boards)
+    print(f"{'Board.apply_move':<28} {reached:>10} {seconds:>8.3f} {reached / seconds:>12.0f}")
+    reached, seconds = timed(position_moves, positions)
+    print(f"{'Position.make':<28} {reached:>10} {seconds:>8.3f} {reached / seconds:>12.0f}")
+    (successors, _, _, _), seconds = timed(lambda: PositionBatch.from_positions(positions).successors())
+    print(f"{'PositionBatch.successors':<28} {len(successors):>10} {seconds:>8.3f} {len(successors) / seconds:>12.0f}")
+
+    start = time.perf_counter()
+    solved = sum(bool(Search(position, max_depth=args.depth).run("bfs")) for position in positions)
+    seconds = time.perf_counter() - start
+    print(f"{'bfs of each board':<28} {solved:>10} solved in {seconds:.3f} s, {len(positions) / seconds:.0f} boards/s")
+    lengths, seconds = timed(shortest_solution_lengths, positions, args.depth)
+    solved = sum(length is not None for length in lengths)
+    print(f"{'batched bfs of all boards':<28} {solved:>10} solved in {seconds:.3f} s, "
+          f"{len(positions) / seconds:.0f} boards/s")
+
+
+if __name__ == '__main__':
+    main()
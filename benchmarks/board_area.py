@@ -0,0 +1,77 @@
+""" Measures how the solver's throughput changes with the area of the board.
+
+    python benchmarks/board_area.py [--sizes 5x5 8x8 12x12 8x12] [--boards 5] [--seconds 1] [--engine idastar]
+
+Searches random boards of every size for a fixed time, or until they are solved, and reports the positions generated
+and expanded per second. Boards have a bear for every 8 cells, so the number of pieces grows with the area as well """
+import argparse
+import os
+import random
+import sys
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from Penguins.board import Board  # noqa: E402
+from Penguins.entity import EntityClass  # noqa: E402
+from Penguins.game import Game  # noqa: E402
+from Penguins.search import ENGINES, SolveTimeout  # noqa: E402
+
+DEFAULT_SIZES = ["5x5", "6x6", "8x8", "10x10", "12x12", "8x12", "12x8"]
+CELLS_PER_BEAR = 8
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    columns, _, rows = text.partition("x")
+    return int(columns), int(rows)
+
+
+def random_board(rng: random.Random, columns: int, rows: int) -> Board:
+    board = Board(columns=columns, rows=rows)
+    penguins = rng.randint(1, 3)
+    bears = max(2, columns * rows // CELLS_PER_BEAR)
+    cells = rng.sample([(col, row) for col in range(columns) for row in range(rows)], 1 + penguins + bears)
+    board.add_new_entity(EntityClass.WATER, *cells[0])
+    for col, row in cells[1:1 + penguins]:
+        board.add_new_entity(EntityClass.PENGUIN, col, row)
+    for col, row in cells[1 + penguins:]:
+        board.add_new_entity(EntityClass.BEAR, col, row)
+    return board
+
+
+def measure(rng: random.Random, columns: int, rows: int, boards: int, seconds: float, engine: str) -> dict:
+    generated = expanded = pieces = 0
+    search_seconds = 0.0
+    for _ in range(boards):
+        board = random_board(rng, columns, rows)
+        game = Game(board)
+        try:
+            game.solve(engine=engine, timeout=seconds)
+        except SolveTimeout:
+            pass
+        generated += game.stats.generated
+        expanded += game.stats.expanded
+        search_seconds += game.stats.phase_seconds["search"]
+        pieces += len(board.entities) - 1
+    return {"area": columns * rows, "pieces": pieces / boards, "generated_per_second": generated / search_seconds,
+            "expanded_per_second": expanded / search_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="board sizes, columns x rows")
+    parser.add_argument("--boards", type=int, default=5, help="boards of every size")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time limit of every search")
+    parser.add_argument("--engine", choices=ENGINES, default="idastar")
+    parser.add_argument("--seed", type=int, default=2022)
+    args = parser.parse_args()
+    print(f"{'size':>6} {'area':>5} {'pieces':>7} {'generated/s':>12} {'expanded/s':>11}")
+    for size in args.sizes:
+        columns, rows = parse_size(size)
+        run = measure(random.Random(f"{args.seed}-{size}"), columns, rows, args.boards, args.seconds, args.engine)
+        print(f"{size:>6} {run['area']:>5} {run['pieces']:>7.1f} {run['generated_per_second']:>12.0f} "
+              f"{run['expanded_per_second']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+""" Measures how long importing the solver takes in a fresh interpreter, and checks it doesn't load pygame.
+
+    python benchmarks/import_time.py [--module Penguins.game] [--runs 10] [--max-ms 100]
+
+Exits with an error if pygame gets imported, or if the median import time is above --max-ms """
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str) -> tuple[float, list[str]]:
+    """ Cumulative import time of the module in microseconds, and the names of all the modules it loaded """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True)
+    imported = []
+    cumulative = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        imported.append(name)
+        if name == module:
+            cumulative = int(cumulative_us)
+    return cumulative, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="Penguins.game")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+    timings = []
+    for _ in range(args.runs):
+        cumulative_us, imported = measure_import(args.module)
+        if any(name == "pygame" or name.startswith("pygame.") for name in imported):
+            sys.exit(f"{args.module} imports pygame")
+        timings.append(cumulative_us / 1000)
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms "
+          f"over {args.runs} runs, {len(imported)} modules loaded")
+    if args.max_ms is not None and median > args.max_ms:
+        sys.exit(f"median import time {median:.1f} ms is above {args.max_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
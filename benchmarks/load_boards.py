@@ -0,0 +1,74 @@
+""" Compares how fast boards are loaded from their text form and from a board file.
+
+    python benchmarks/load_boards.py [--boards 1000000] [--size 5x5]
+
+Writes random boards to a text file and to a board file, then reports the boards per second of reading them back:
+the text form as Board entities and as positions, and the board file as masks, as positions and, with NumPy, as a
+single PositionBatch. Reading as Board entities is only timed on the first 100,000 boards """
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from Penguins.batch import numpy  # noqa: E402
+from Penguins.generate import PuzzleSpec, random_position  # noqa: E402
+from Penguins.position import Position  # noqa: E402
+from Penguins.serialization import (BoardFile, board_from_text, masks_to_text, position_from_text,  # noqa: E402
+                                    write_boards)
+
+BOARDS_READ_AS_ENTITIES = 100_000
+
+
+def report(name: str, count: int, seconds: float):
+    print(f"{name:<28} {count:>10} {seconds:>8.2f} {count / seconds:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boards", type=int, default=1_000_000)
+    parser.add_argument("--size", default="5x5", help="board size, columns x rows")
+    parser.add_argument("--seed", type=int, default=2022)
+    args = parser.parse_args()
+    columns, rows = (int(value) for value in args.size.lower().split("x"))
+    rng = random.Random(args.seed)
+    spec = PuzzleSpec(columns, rows)
+    masks = [(p.water, p.penguins, p.bears) for p in (random_position(rng, spec) for _ in range(args.boards))]
+    with tempfile.TemporaryDirectory() as directory:
+        text_path, board_path = os.path.join(directory, "boards.txt"), os.path.join(directory, "boards.bin")
+        with open(text_path, "w") as f:
+            f.writelines(masks_to_text(columns, rows, *board_masks) + "\n" for board_masks in masks)
+        write_boards(board_path, columns, rows, masks)
+        print(f"text file {os.path.getsize(text_path)} bytes, board file {os.path.getsize(board_path)} bytes")
+        print(f"{'read as':<28} {'boards':>10} {'seconds':>8} {'boards/s':>12}")
+
+        start = time.perf_counter()
+        with open(text_path) as f:
+            count = sum(1 for _, line in zip(range(BOARDS_READ_AS_ENTITIES), f) if board_from_text(line))
+        report("text as Board", count, time.perf_counter() - start)
+        start = time.perf_counter()
+        with open(text_path) as f:
+            count = sum(1 for line in f if position_from_text(line))
+        report("text as Position", count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with BoardFile(board_path) as boards:
+            count = sum(1 for _ in boards.all_masks())
+        report("board file as masks", count, time.perf_counter() - start)
+        start = time.perf_counter()
+        with BoardFile(board_path) as boards:
+            count = sum(1 for position in boards if isinstance(position, Position))
+        report("board file as Position", count, time.perf_counter() - start)
+        if numpy is not None:
+            start = time.perf_counter()
+            with BoardFile(board_path) as boards:
+                count = len(boards.batch())
+            report("board file as PositionBatch", count, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+""" Generates the benchmark corpora: random solvable boards, graded by the length of their shortest solution.
+
+    python benchmarks/make_corpora.py [--seed 2022] [--boards 20]
+
+Writes benchmarks/corpora/<tier>.jsonl, a board per line with its shortest solution length, board size and number
+of penguins and bears. The same seed always gives the same corpora """
+import argparse
+import json
+import os
+import random
+import sys
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from Penguins.board import Board  # noqa: E402
+from Penguins.entity import EntityClass  # noqa: E402
+from Penguins.game import Game  # noqa: E402
+from Penguins.search import SolveTimeout  # noqa: E402
+from Penguins.serialization import board_to_text  # noqa: E402
+
+CORPORA_DIRECTORY = os.path.join(REPOSITORY_ROOT, "benchmarks", "corpora")
+# tier name: board sizes, and the shortest solution lengths it takes
+TIERS = {
+    "small": ([(3, 3), (4, 3), (4, 4)], range(1, 100)),
+    "easy": ([(5, 5)], range(1, 4)),
+    "medium": ([(5, 5)], range(4, 8)),
+    "hard": ([(5, 5)], range(8, 100)),
+}
+
+
+def random_board(rng: random.Random, columns: int, rows: int) -> Board:
+    board = Board(columns=columns, rows=rows)
+    penguins = rng.randint(1, 3)
+    bears = rng.randint(2, max(2, columns * rows // 4))
+    cells = rng.sample([(col, row) for col in range(columns) for row in range(rows)], 1 + penguins + bears)
+    board.add_new_entity(EntityClass.WATER, *cells[0])
+    for col, row in cells[1:1 + penguins]:
+        board.add_new_entity(EntityClass.PENGUIN, col, row)
+    for col, row in cells[1 + penguins:]:
+        board.add_new_entity(EntityClass.BEAR, col, row)
+    return board
+
+
+def make_tier(rng: random.Random, sizes: list[tuple[int, int]], lengths: range, count: int) -> list[dict]:
+    entries = []
+    seen = set()
+    while len(entries) < count:
+        board = random_board(rng, *rng.choice(sizes))
+        text = board_to_text(board)
+        if text in seen:
+            continue
+        seen.add(text)
+        try:
+            solution = Game(board).solve(engine="bfs", max_depth=lengths[-1], timeout=5)
+        except SolveTimeout:
+            continue
+        if len(solution) in lengths:
+            entries.append({"id": f"{len(entries) + 1}", "board": text, "length": len(solution),
+                            "size": f"{board.columns}x{board.rows}",
+                            "penguins": len(board.get_all_entities_of_class(EntityClass.PENGUIN)),
+                            "bears": len(board.get_all_entities_of_class(EntityClass.BEAR))})
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=2022)
+    parser.add_argument("--boards", type=int, default=20, help="boards in every tier")
+    args = parser.parse_args()
+    os.makedirs(CORPORA_DIRECTORY, exist_ok=True)
+    for tier, (sizes, lengths) in TIERS.items():
+        entries = make_tier(random.Random(f"{args.seed}-{tier}"), sizes, lengths, args.boards)
+        with open(os.path.join(CORPORA_DIRECTORY, f"{tier}.jsonl"), "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        print(f"{tier}: {len(entries)} boards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+""" Times the solver configurations on the benchmark corpora, and compares the results with a baseline.
+
+    python benchmarks/solver.py [--corpus easy medium] [--config bfs idastar] [--repeat 5]
+                                [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+
+For every configuration and corpus, records the median and 95th percentile of the solve time per board
+(every board is solved --repeat times, keeping its median), the positions expanded and the peak memory of the
+search, measured by tracemalloc in a separate, last run. Results are written as JSON, and a results file of an earlier run
+can be the baseline of the next one: the run fails if any time, node count or peak memory grew by more than the
+tolerance. Timings only compare on the same machine, so keep a baseline per machine """
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from Penguins.game import Game  # noqa: E402
+from Penguins.heuristics import remaining_penguins  # noqa: E402
+from Penguins.serialization import board_from_text  # noqa: E402
+
+CORPORA_DIRECTORY = os.path.join(REPOSITORY_ROOT, "benchmarks", "corpora")
+# configuration name: arguments of Game.solve
+CONFIGURATIONS = {
+    "dfs": dict(engine="dfs"),
+    "bfs": dict(engine="bfs"),
+    "iddfs": dict(engine="iddfs"),
+    "astar": dict(engine="astar"),
+    "idastar": dict(engine="idastar"),
+    "bidirectional": dict(engine="bidirectional"),
+    "idastar-remaining-penguins": dict(engine="idastar", heuristic=remaining_penguins),
+    "bfs-symmetry": dict(engine="bfs", symmetry=True),
+    "idastar-1mib": dict(engine="idastar", memory_limit=2 ** 20),
+}
+DEFAULT_CONFIGURATIONS = ["bfs", "astar", "idastar"]
+# metrics compared with the baseline, all of them are better when lower
+COMPARED_METRICS = ["median_seconds", "p95_seconds", "expanded", "peak_memory_bytes"]
+# times shorter than this are timer noise, and aren't compared
+MIN_COMPARED_SECONDS = 0.001
+
+
+def load_corpus(name: str) -> list[dict]:
+    with open(os.path.join(CORPORA_DIRECTORY, f"{name}.jsonl")) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """ Nearest-rank percentile """
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def measure(entries: list[dict], arguments: dict, repeat: int) -> dict:
+    seconds = []
+    expanded = 0
+    peak_memory = 0
+    for entry in entries:
+        # timed runs without tracemalloc, which also warm up what's allocated once per board size
+        timings = []
+        for _ in range(repeat):
+            game = Game(board_from_text(entry["board"]))
+            start = time.perf_counter()
+            game.solve(**arguments)
+            timings.append(time.perf_counter() - start)
+        # a last run measures the memory and counts the positions
+        game = Game(board_from_text(entry["board"]))
+        tracemalloc.start()
+        solution = game.solve(**arguments)
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if len(solution) != entry["length"]:
+            raise AssertionError(f"Board {entry['board']} was solved in {len(solution)} moves "
+                                 f"instead of {entry['length']} with {arguments}")
+        expanded += game.stats.expanded
+        seconds.append(statistics.median(timings))
+    return {"boards": len(entries), "median_seconds": statistics.median(seconds),
+            "p95_seconds": percentile(seconds, 0.95), "total_seconds": sum(seconds),
+            "expanded": expanded, "peak_memory_bytes": peak_memory}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """ The metrics that regressed by more than the tolerance """
+    regressions = []
+    for key, result in results["runs"].items():
+        if key not in baseline["runs"]:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = baseline["runs"][key][metric], result[metric]
+            if metric.endswith("_seconds") and after < MIN_COMPARED_SECONDS:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append(f"{key} {metric}: {before:.6g} -> {after:.6g} ({after / before - 1:+.0%})"
+                                   if before else f"{key} {metric}: {before} -> {after:.6g}")
+    return regressions
+
+
+def main():
+    corpora = sorted(name[:-len(".jsonl")] for name in os.listdir(CORPORA_DIRECTORY) if name.endswith(".jsonl"))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="+", default=corpora)
+    parser.add_argument("--config", nargs="+", choices=CONFIGURATIONS, default=DEFAULT_CONFIGURATIONS)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every board")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth of every metric, 0.25 is 25%%")
+    args = parser.parse_args()
+    results = {"python": sys.version.split()[0], "repeat": args.repeat, "runs": dict()}
+    for config in args.config:
+        for corpus in args.corpus:
+            run = measure(load_corpus(corpus), CONFIGURATIONS[config], args.repeat)
+            results["runs"][f"{config}/{corpus}"] = run
+            print(f"{config}/{corpus}: {run['boards']} boards, median {run['median_seconds'] * 1000:.2f} ms, "
+                  f"p95 {run['p95_seconds'] * 1000:.2f} ms, {run['expanded']} positions expanded, "
+                  f"peak memory {run['peak_memory_bytes'] / 1024:.0f} KiB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit("Regressions beyond the tolerance:\n" + "\n".join(regressions))
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,48 @@
+import argparse
+import os
+import time
+
 from Penguins.board import Board
 from Penguins.entity import EntityClass
-from Penguins.game import Game, Move
+from Penguins.game import Game, Move, Progress, SearchFinished
+from Penguins.rendering import draw_board, square_size
+from Penguins.solution_cache import SolutionCache
+from Penguins.solved_positions import SolvedPositions
 import pygame
-from Penguins.constants import WIDTH, HEIGHT, ROWS, COLS, BLACK, SQUARE_SIZE
+from Penguins.constants import WIDTH, HEIGHT, BOARD_SIZE, ROWS, COLS, BLACK
 from button import Button, BUTTON_WIDTH, BUTTON_HEIGHT
 
 VERSION = "1.2.0"
 
 FPS = 60
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Penguins ' + VERSION)
+# part of every frame spent on the search while solving, the rest keeps the window responsive
+SEARCH_SECONDS_PER_FRAME = 0.8 / FPS
+SOLUTION_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".penguins_solutions.sqlite")
 
 
-def mouse_clicked_on_board(x: int, y: int) -> bool:
-    return (0 <= x <= SQUARE_SIZE * COLS) and (0 <= y <= SQUARE_SIZE * ROWS)
+def mouse_clicked_on_board(x: int, y: int, board: Board) -> bool:
+    square = square_size(board)
+    return (0 <= x < square * board.columns) and (0 <= y < square * board.rows)
 
 
 def mouse_not_clicked_on_buttons(x: int, y: int, buttons: list[Button]) -> bool:
     return not any(b.mouse_inside_button() for b in buttons)
 
 
-def mainloop(game: Game):
+def advance_search(search_events, seconds: float) -> SearchFinished | None:
+    """ Lets the search run for about the given time. Returns its last event once it is done """
+    end = time.monotonic() + seconds
+    for event in search_events:
+        if isinstance(event, SearchFinished):
+            return event
+        if isinstance(event, Progress):
+            pygame.display.set_caption(f"Penguins {VERSION} - solving, {event.expanded_positions} positions, "
+                                       f"depth {event.depth}")
+        if time.monotonic() > end:
+            return None
+
+
+def mainloop(win: pygame.Surface, game: Game):
     run = True
     pygame.init()
     clock = pygame.time.Clock()
@@ -28,6 +50,7 @@ def mainloop(game: Game):
     # create the buttons
     buttons = create_buttons()
     solution = None
+    search_events = None
     current_move_index = 0
     allow_click_on_board = True
     col, row = -1, -1
@@ -37,32 +60,30 @@ def mainloop(game: Game):
             some_entity_was_selected = False
             if event.type == pygame.QUIT:
                 run = False
+                if search_events is not None:
+                    search_events.close()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
                 if buttons['Solve'].mouse_inside_button():
                     if game.board.is_legal_setup():
                         allow_click_on_board = False
                         pygame.mouse.set_cursor(pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_WAIT))
-                        solution = game.solve()
-                        pygame.mouse.set_cursor(pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_ARROW))
                         buttons['Solve'].visible = False
-                        if solution:
-                            buttons['Next'].visible = True
-                            print("Solution:")
-                            for move in solution:
-                                print(move)
-                        else:
-                            print("No solution found :(")
-                            buttons['Done'].visible = True
-                if buttons['Next'].mouse_inside_button():
+                        buttons['Next'].visible = False
+                        search_events = game.solve_iter(engine="bfs")
+                elif buttons['Next'].mouse_inside_button():
                     move: Move = solution[current_move_index]
                     board.apply_move(move.entity, move.direction)
                     current_move_index += 1
                     if current_move_index >= len(solution):
                         buttons['Next'].visible = False
+                        buttons['Solve'].visible = False
                         buttons['Done'].visible = True
-                if allow_click_on_board and mouse_clicked_on_board(mouse_x, mouse_y) and mouse_not_clicked_on_buttons(mouse_x, mouse_y, list(buttons.values())):
-                    col, row = calc_location(mouse_x, mouse_y)
+                    else:
+                        # solving again from here looks up the solution found before
+                        buttons['Solve'].visible = True
+                if allow_click_on_board and mouse_clicked_on_board(mouse_x, mouse_y, board) and mouse_not_clicked_on_buttons(mouse_x, mouse_y, list(buttons.values())):
+                    col, row = calc_location(mouse_x, mouse_y, square_size(board))
                     # print(f"{x},{y} -> {col},{row}")
                     entities = board.get_entities_in_location(col=col, row=row)
                     if not entities:
@@ -86,24 +107,54 @@ def mainloop(game: Game):
                     buttons['Water'].visible = False
                     buttons['Penguin'].visible = False
                     buttons['Bear'].visible = False
+                    show_solve_button(buttons)
                 if buttons['Done'].mouse_inside_button():
                     run = False
-        board.draw(WIN)
-        pygame.draw.rect(WIN, BLACK, (0, ROWS * SQUARE_SIZE, WIDTH, SQUARE_SIZE * 2))
+        finished = advance_search(search_events, SEARCH_SECONDS_PER_FRAME) if run and search_events is not None else None
+        if finished is not None:
+            search_events = None
+            solution = finished.solution
+            current_move_index = 0
+            # the board may be edited again, and solved again from there
+            allow_click_on_board = True
+            show_solution(solution, buttons)
+        win.fill(BLACK)
+        draw_board(win, board)
         for b in buttons.values():
-            b.draw(WIN)
+            b.draw(win)
         pygame.display.update()
     pygame.quit()
 
 
-def calc_location(mouse_x, mouse_y):
-    col = mouse_x // SQUARE_SIZE
-    row = mouse_y // SQUARE_SIZE
+def show_solution(solution: list[Move], buttons: dict[str, Button]):
+    """ Back from solving, to stepping through the solution, or to quitting if there is none """
+    pygame.mouse.set_cursor(pygame.cursors.Cursor(pygame.SYSTEM_CURSOR_ARROW))
+    pygame.display.set_caption('Penguins ' + VERSION)
+    if solution:
+        buttons['Next'].visible = True
+        print("Solution:")
+        for move in solution:
+            print(move)
+    else:
+        print("No solution found :(")
+        buttons['Done'].visible = True
+
+
+def show_solve_button(buttons: dict[str, Button]):
+    """ Back to setting up the board, which an edit made the solution shown before wrong for """
+    buttons['Next'].visible = False
+    buttons['Done'].visible = False
+    buttons['Solve'].visible = True
+
+
+def calc_location(mouse_x, mouse_y, square):
+    col = mouse_x // square
+    row = mouse_y // square
     return col, row
 
 
 def create_buttons():
-    button_top = ROWS * SQUARE_SIZE + SQUARE_SIZE / 2 - BUTTON_HEIGHT / 2
+    button_top = (BOARD_SIZE + HEIGHT) / 2 - BUTTON_HEIGHT / 2
     buttons = dict()
     buttons['Solve'] = Button(
         left=WIDTH / 4 - BUTTON_WIDTH / 2,
@@ -143,8 +194,8 @@ def create_buttons():
     return buttons
 
 
-def create_board(sample_board=False):
-    board = Board(rows=ROWS, columns=COLS)
+def create_board(columns=COLS, rows=ROWS, sample_board=False):
+    board = Board(rows=rows, columns=columns)
     if sample_board:
         board.add_new_entity(EntityClass.PENGUIN, 4, 4)
         board.add_new_entity(EntityClass.WATER, 2, 2)
@@ -158,9 +209,20 @@ def create_board(sample_board=False):
 
 
 def main():
-    board = create_board()
-    game = Game(board)
-    mainloop(game)
+    parser = argparse.ArgumentParser(description="Penguins puzzle: place the pieces, then let the solver find the "
+                                                 "shortest solution")
+    parser.add_argument("--columns", type=int, default=COLS)
+    parser.add_argument("--rows", type=int, default=ROWS)
+    args = parser.parse_args()
+    board = create_board(args.columns, args.rows)
+    cache = SolutionCache(SOLUTION_CACHE_PATH)
+    game = Game(board, cache=cache, solved_positions=SolvedPositions())
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Penguins ' + VERSION)
+    try:
+        mainloop(win, game)
+    finally:
+        cache.close()
 
 
 if __name__ == '__main__':